@@ -1,7 +1,10 @@
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify, Response, stream_with_context, send_file
 from functools import wraps
 from datetime import datetime, timedelta
 import os
+import io
+import csv
+import tempfile
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
@@ -10,10 +13,14 @@ import json
 from werkzeug.security import check_password_hash, generate_password_hash
 from config_db import SessionLocal
 from models import User, Department, Doctor, Appointment, HospitalInfo
-from sqlalchemy import exc, cast, String as SQLString, or_, and_
+from services import data_service_db as ds
+from sqlalchemy import exc, cast, String as SQLString, or_, and_, update
 from collections import defaultdict
 import re
 import config
+import profiler
+import sql_stats
+import tenant
 
 
 settings = config.settings
@@ -173,9 +180,7 @@ def admin_dashboard():
         # 🔥 Change 1: Get user data from DB
         user_obj = session_db.query(User).filter(User.id == user_id).first()
         
-        user_data = user_obj.__dict__ if user_obj else {}
-        if "_sa_instance_state" in user_data:
-            del user_data["_sa_instance_state"] 
+        user_data = ds.user_dict(user_obj) if user_obj else {}
     finally:
         next(session_gen, None)
         
@@ -334,17 +339,68 @@ def mark_single_appointment_viewed(appointment_id):
     session_gen = get_db()
     session_db = next(session_gen)
     try:
-        appointment = session_db.query(Appointment).filter(Appointment.id == appointment_id).first()
-        if not appointment:
-            return jsonify({"error": "Appointment not found"}), 404
-        appointment.viewed_by_admin = True
+        updated_count = session_db.query(Appointment).filter(
+            Appointment.id == appointment_id
+        ).update({Appointment.viewed_by_admin: True}, synchronize_session=False)
         session_db.commit()
+        if not updated_count:
+            return jsonify({"error": "Appointment not found"}), 404
         return jsonify({"message": "Appointment marked as viewed"})
     except Exception as e:
         session_db.rollback()
         return jsonify({"error": f"Error: {str(e)}"}), 500
     finally:
         next(session_gen, None)
+
+@admin_bp.route("/api/appointments/bulk_mark_viewed", methods=["POST"])
+@login_required
+def bulk_mark_appointments_viewed():
+    """Mark a set of appointments (by ids and/or filters) as viewed in one UPDATE"""
+    data = request.get_json(silent=True) or {}
+    try:
+        rows = ds.bulk_mark_appointments_viewed(
+            ids=data.get("appointmentIds"),
+            filters=data.get("filters")
+        )
+        return jsonify({
+            "success": True,
+            "updated_count": len(rows),
+            "updated_ids": [r["id"] for r in rows]
+        })
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"success": False, "message": "Error marking appointments as viewed"}), 500
+
+@admin_bp.route("/api/appointments/bulk_status", methods=["POST"])
+@login_required
+def bulk_update_appointment_status():
+    """Transition a set of appointments (by ids and/or filters) to a new status.
+
+    Body: {"newStatus": "visited", "appointmentIds": [1, 2], "filters": {...}}
+    Only appointments whose current status allows the transition are updated;
+    the rest are reported back in "skipped_ids".
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        result = ds.bulk_update_appointment_status(
+            data.get("newStatus"),
+            ids=data.get("appointmentIds"),
+            filters=data.get("filters")
+        )
+        return jsonify({
+            "success": True,
+            "updated_count": len(result["updated"]),
+            "updated_ids": [r["id"] for r in result["updated"]],
+            "skipped_ids": result["skipped"]
+        })
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"success": False, "message": "Error updating appointment status"}), 500
+
 # ------------------ Departments ------------------ #
 @admin_bp.route("/departments", methods=["GET", "POST"])
 @login_required
@@ -373,9 +429,8 @@ def departments():
             # Generate a unique ID (slug)
             dept_id = slugify(name_en)
             
-            # Check if department already exists
-            existing_dept = session_db.query(Department).filter_by(id=dept_id).first()
-            if existing_dept:
+            # Check if department already exists (ids are unique across hospitals)
+            if tenant.id_in_use(session_db, Department, dept_id):
                 flash(f"Department ID '{dept_id}' already exists. Try a more unique name.", "danger")
                 return redirect(url_for("admin_bp.departments"))
                 
@@ -434,6 +489,11 @@ def create_department():
 
         # Generate a simple slug ID
         dept_id = name_en.lower().replace(" ", "_").replace(".", "") 
+
+        # Ids are unique across hospitals, so check every hospital's departments
+        if tenant.id_in_use(session_db, Department, dept_id):
+            flash(f"Department ID '{dept_id}' already exists. Try a more unique name.", "warning")
+            return redirect(url_for("admin_bp.departments"))
         
         new_dept = Department(
             id=dept_id,
@@ -616,8 +676,8 @@ def create_doctor():
         doc_id = 'dr_' + name_en.lower().replace(" ", "_").replace(".", "") 
 
         
-        duplicate = session_db.query(Doctor).filter(Doctor.id == doc_id).first()
-        if duplicate:
+        # Ids are unique across hospitals, so check every hospital's doctors
+        if tenant.id_in_use(session_db, Doctor, doc_id):
             flash(f"Doctor with generated ID '{doc_id}' already exists. Please modify the name.", "warning")
             return redirect(url_for("admin_bp.doctors"))
 
@@ -778,17 +838,24 @@ def get_appointment_details(appointment_id):
         if not appointment:
             return jsonify({"error": "Appointment not found"}), 404
         
-        # Mark as viewed if not already
-        if not appointment.viewed_by_admin:
-            appointment.viewed_by_admin = True
-            session_db.commit()
-        
         # Normalize the appointment data before sending to the UI
         details = normalize_appointment_for_ui(session_db, appointment)
+
+        # Mark as viewed if not already (single UPDATE, no reload of the row)
+        if not appointment.viewed_by_admin:
+            session_db.execute(
+                update(Appointment)
+                .where(Appointment.id == appointment_id, Appointment.viewed_by_admin.isnot(True))
+                .values(viewed_by_admin=True)
+                .execution_options(synchronize_session=False)
+            )
+            session_db.commit()
+            details["viewed_by_admin"] = True
         
         return jsonify({"details": details})
 
     except Exception as e:
+        session_db.rollback()
         traceback.print_exc()
         return jsonify({"error": f"Error fetching details: {str(e)}"}), 500
     finally:
@@ -832,41 +899,153 @@ def get_api_appointments():
     finally:
         next(session_gen, None)
 
+# --- Appointments Export ---
+EXPORT_COLUMNS = [
+    ("id", "ID"),
+    ("date", "Date"),
+    ("time", "Time"),
+    ("patientName", "Patient Name"),
+    ("phoneNumber", "Phone"),
+    ("department", "Department"),
+    ("doctorName", "Doctor"),
+    ("Status", "Status"),
+    ("createdAt", "Created At"),
+    ("updatedAt", "Updated At"),
+]
+
+def _export_filters_from_request():
+    return {
+        "status": request.args.get("status") or None,
+        "department_id": request.args.get("department_id") or None,
+        "doctor_id": request.args.get("doctor_id") or None,
+        "date": request.args.get("date") or None,
+        "date_from": request.args.get("date_from") or None,
+        "date_to": request.args.get("date_to") or None,
+    }
+
+def _export_rows(filters):
+    """Yield one list of cell values per appointment, in EXPORT_COLUMNS order."""
+    for appt, department_name, doctor_name in ds.iter_appointments(filters):
+        status_raw = appt.status
+        row = {
+            "id": appt.id,
+            "date": appt.date,
+            "time": normalize_time_string(appt.time),
+            "patientName": appt.name,
+            "phoneNumber": appt.phone,
+            "department": department_name or appt.department_id or "",
+            "doctorName": doctor_name or appt.doctor_id or "",
+            "Status": status_raw[:1].upper() + status_raw[1:].lower() if status_raw else "",
+            "createdAt": appt.created_at.strftime("%Y-%m-%d %H:%M:%S") if appt.created_at else "",
+            "updatedAt": appt.updated_at.strftime("%Y-%m-%d %H:%M:%S") if appt.updated_at else "",
+        }
+        yield [row[key] for key, _ in EXPORT_COLUMNS]
+
+def _stream_csv(filters, flush_every=200):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM so Excel opens the Devanagari names correctly
+    buffer.write("\ufeff")
+    writer.writerow([title for _, title in EXPORT_COLUMNS])
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate(0)
+
+    pending = 0
+    for row in _export_rows(filters):
+        writer.writerow(row)
+        pending += 1
+        if pending >= flush_every:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            pending = 0
+    if pending:
+        yield buffer.getvalue()
+
+@admin_bp.route("/appointments/export", methods=["GET"])
+@login_required
+def export_appointments():
+    """Export appointments matching the query-string filters as CSV (streamed)
+    or XLSX (?format=xlsx, requires openpyxl)."""
+    export_format = request.args.get("format", "csv").lower()
+    filters = _export_filters_from_request()
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    if export_format == "csv":
+        response = Response(
+            stream_with_context(_stream_csv(filters)),
+            mimetype="text/csv; charset=utf-8"
+        )
+        response.headers["Content-Disposition"] = f'attachment; filename="appointments_{stamp}.csv"'
+        response.headers["Cache-Control"] = "no-store"
+        response.headers["X-Accel-Buffering"] = "no"
+        return response
+
+    if export_format == "xlsx":
+        try:
+            from openpyxl import Workbook
+        except ImportError:
+            return jsonify({"error": "XLSX export requires the openpyxl package"}), 501
+
+        # XLSX is a zip archive and cannot be emitted incrementally; the
+        # write-only workbook keeps memory flat and spools to a temp file.
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("Appointments")
+        sheet.append([title for _, title in EXPORT_COLUMNS])
+        for row in _export_rows(filters):
+            sheet.append(row)
+        tmp = tempfile.TemporaryFile()
+        workbook.save(tmp)
+        tmp.seek(0)
+        return send_file(
+            tmp,
+            mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            as_attachment=True,
+            download_name=f"appointments_{stamp}.xlsx",
+            max_age=0
+        )
+
+    return jsonify({"error": f"Unsupported export format '{export_format}'"}), 400
+
 # admin_routes.py (Updated Block)
 
 @admin_bp.route("/api/update_appointment_status", methods=["POST"])
 @login_required
 def update_appointment_status():
-    session_gen = get_db()
-    session_db = next(session_gen)
-    
     try:
         data = request.get_json()
         appointment_id = data.get("appointmentId")
         new_status = data.get("newStatus")
         
-        appointment = session_db.query(Appointment).filter(Appointment.id == appointment_id).first()
-        
-        if not appointment:
-            return jsonify({"error": "Appointment not found"}), 404
-        
         # ❌ REMOVED/COMMENTED OUT THE CHECK THAT CAUSED THE 403 ERROR
         # if not appointment.can_edit:
         #     return jsonify({"error": "Appointment cannot be edited"}), 403 
         
-        # Proceed with update logic
-        appointment.status = new_status
-        session_db.commit()
-        
+        # Single UPDATE ... RETURNING; the admin UI may set any status, so the
+        # transition table is not enforced here (see bulk_status for that).
+        result = ds.bulk_update_appointment_status(
+            new_status, ids=[appointment_id], enforce_transitions=False
+        )
+        if not result["updated"]:
+            return jsonify({"error": "Appointment not found"}), 404
+
+        session_gen = get_db()
+        session_db = next(session_gen)
+        try:
+            appointment = Appointment(**result["updated"][0])
+            normalized = normalize_appointment_for_ui(session_db, appointment)
+        finally:
+            next(session_gen, None)
+
         return jsonify({"message": "Status updated successfully", 
-                        "appointment": normalize_appointment_for_ui(session_db, appointment)})
+                        "appointment": normalized})
     
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        session_db.rollback()
         traceback.print_exc()
         return jsonify({"error": f"Error updating status: {str(e)}"}), 500
-    finally:
-        session_db.close()
 
 @admin_bp.route("/save_appointment", methods=["POST"])
 @login_required
@@ -1237,4 +1416,75 @@ def get_analytics():
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
     finally:
-        next(session_gen, None)
\ No newline at end of file
+        next(session_gen, None)
+
+
+# ------------------ Profiling ------------------ #
+# Sampling profiles across all workers and slow-request captures (profiler.py)
+
+@admin_bp.route("/profiler", methods=["GET"])
+@login_required
+def profiler_status():
+    return jsonify(profiler.status())
+
+@admin_bp.route("/profiler/start", methods=["POST"])
+@login_required
+def profiler_start():
+    if not settings.PROFILER_ENABLED:
+        return jsonify({"success": False, "message": "Profiler is disabled (PROFILER_ENABLED)"}), 404
+    data = request.get_json(silent=True) or {}
+    try:
+        control = profiler.start_profile(data.get("seconds", 30), data.get("interval_ms"))
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "message": "seconds and interval_ms must be numbers"}), 400
+    return jsonify({"success": True, "profile": control,
+                    "flamegraph": url_for("admin_bp.profiler_flamegraph", profile_id=control["id"])})
+
+@admin_bp.route("/profiler/stop", methods=["POST"])
+@login_required
+def profiler_stop():
+    control = profiler.stop_profile()
+    if control is None:
+        return jsonify({"success": False, "message": "No profile has been started"}), 404
+    return jsonify({"success": True, "profile": control,
+                    "flamegraph": url_for("admin_bp.profiler_flamegraph", profile_id=control["id"])})
+
+@admin_bp.route("/profiler/<profile_id>.svg")
+@login_required
+def profiler_flamegraph(profile_id):
+    counts = profiler.merged_profile(profile_id)
+    if not counts:
+        return jsonify({"error": "Profile not found or not finished yet"}), 404
+    return Response(profiler.flamegraph_svg(counts, f"Profile {profile_id}"), mimetype="image/svg+xml")
+
+@admin_bp.route("/profiler/<profile_id>.folded")
+@login_required
+def profiler_folded(profile_id):
+    counts = profiler.merged_profile(profile_id)
+    if not counts:
+        return jsonify({"error": "Profile not found or not finished yet"}), 404
+    return Response(profiler.folded_text(counts), mimetype="text/plain")
+
+@admin_bp.route("/profiler/slow/<name>")
+@login_required
+def profiler_slow_request(name):
+    path = profiler.slow_capture_path(name)
+    if path is None:
+        return jsonify({"error": "Capture not found"}), 404
+    if request.args.get("format") == "svg":
+        with open(path, encoding="utf-8") as f:
+            capture = json.load(f)
+        title = f"{capture['method']} {capture['path']} {capture['duration_ms']} ms"
+        return Response(profiler.flamegraph_svg(profiler.parse_folded(capture["folded"]), title), mimetype="image/svg+xml")
+    return send_file(path, mimetype="application/json")
+
+@admin_bp.route("/sql")
+@login_required
+def sql_fingerprints():
+    """This worker's statement fingerprints, by total time (?order=count|mean_ms|max_ms)."""
+    limit = min(request.args.get("limit", 50, type=int), 500)
+    return jsonify({
+        "pid": os.getpid(),
+        "n_plus_one_threshold": settings.SQL_N_PLUS_ONE_THRESHOLD,
+        "fingerprints": sql_stats.top(limit, request.args.get("order", "total_ms")),
+    })
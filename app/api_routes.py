@@ -8,8 +8,15 @@ from functools import wraps
 import jwt
 import os
 from datetime import datetime, timedelta
+from collections.abc import Mapping
+from types import MappingProxyType
 import json
 
+import json_provider
+from config import BASE_DIR, settings
+from services.file_cache import FileCache
+from services.precompressed import Precompressed
+
 # Create API blueprint
 api_bp = Blueprint('api', __name__, url_prefix='/api/v1')
 
@@ -75,12 +82,11 @@ def get_hospitals():
 def get_hospital(hospital_id):
     """Get specific hospital information"""
     try:
-        # Load hospital data
-        hospital_data = load_hospital_data(hospital_id)
-        if not hospital_data:
+        snapshot = _hospital_snapshot(hospital_id)
+        if not snapshot or not snapshot.data:
             return jsonify({'error': 'Hospital not found'}), 404
         
-        return jsonify({'hospital': hospital_data})
+        return _json_response(snapshot.bodies[None])
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -113,8 +119,10 @@ def login():
 def get_departments(hospital_id):
     """Get departments for a specific hospital"""
     try:
-        departments = load_hospital_departments(hospital_id)
-        return jsonify({'departments': departments})
+        snapshot = _snapshot(_departments_file)
+        if not snapshot:
+            return jsonify({'departments': []})
+        return _json_response(snapshot.bodies[None])
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -137,8 +145,11 @@ def get_doctors(hospital_id):
     """Get doctors for a specific hospital"""
     try:
         department_id = request.args.get('department_id')
-        doctors = load_hospital_doctors(hospital_id, department_id)
-        return jsonify({'doctors': doctors})
+        snapshot = _snapshot(_doctors_file)
+        body = snapshot and snapshot.bodies.get(str(department_id) if department_id else None)
+        if not body:
+            return jsonify({'doctors': []})
+        return _json_response(body)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -192,11 +203,6 @@ def create_appointment(hospital_id):
         if 'error' in appointment:
             return jsonify({'error': appointment['error']}), 400
         
-        # Convert datetime objects to strings for JSON serialization
-        for k, v in appointment.items():
-            if hasattr(v, 'isoformat'):
-                appointment[k] = v.isoformat()
-        
         return jsonify({
             'appointment': appointment,
             'appointment_id': appointment['id']
@@ -214,23 +220,6 @@ def get_appointment(hospital_id, appointment_id):
         if not appointment:
             return jsonify({'error': 'Appointment not found'}), 404
         
-        # Enhance appointment data with department and doctor information
-        from services.data_service_db import list_departments, list_doctors
-        
-        # Get department information
-        departments = list_departments()
-        department_info = next((d for d in departments if d['id'] == appointment.get('department_id')), None)
-        
-        # Get doctor information
-        doctors = list_doctors()
-        doctor_info = next((d for d in doctors if d['id'] == appointment.get('doctor_id')), None)
-        
-        # Add enhanced information
-        appointment['department_name'] = department_info['name'] if department_info else {}
-        appointment['doctor_name'] = doctor_info['name'] if doctor_info else {}
-        appointment['doctor_fees'] = doctor_info['fees'] if doctor_info else None
-        appointment['doctor_experience'] = doctor_info['experience'] if doctor_info else None
-        
         return jsonify({
             'appointment': appointment,
             'status': 'success'
@@ -248,30 +237,11 @@ def get_appointments(hospital_id):
         
         appointments = load_appointments_by_phone(hospital_id, phone)
         
-        # Enhance each appointment with department and doctor information
-        from services.data_service_db import list_departments, list_doctors
-        departments = list_departments()
-        doctors = list_doctors()
-        
-        enhanced_appointments = []
-        for appointment in appointments:
-            # Get department information
-            department_info = next((d for d in departments if d['id'] == appointment.get('department_id')), None)
-            
-            # Get doctor information
-            doctor_info = next((d for d in doctors if d['id'] == appointment.get('doctor_id')), None)
-            
-            # Add enhanced information
-            appointment['department_name'] = department_info['name'] if department_info else {}
-            appointment['doctor_name'] = doctor_info['name'] if doctor_info else {}
-            appointment['doctor_fees'] = doctor_info['fees'] if doctor_info else None
-            appointment['doctor_experience'] = doctor_info['experience'] if doctor_info else None
-            
-            enhanced_appointments.append(appointment)
+        # Department/doctor names, fees and experience come from the same JOINed query
         
         return jsonify({
-            'appointments': enhanced_appointments,
-            'count': len(enhanced_appointments),
+            'appointments': appointments,
+            'count': len(appointments),
             'status': 'success'
         })
     except Exception as e:
@@ -309,67 +279,142 @@ def get_widget_config(hospital_id):
         if not hospital_data:
             return jsonify({'error': 'Hospital not found'}), 404
         
-        widget_config = {
-            'hospital_id': hospital_id,
-            'name': hospital_data['name'],
-            'logo_url': hospital_data['logo_url'],
-            'primary_color': hospital_data['primary_color'],
-            'secondary_color': hospital_data['secondary_color'],
-            'features': hospital_data['features'],
-            'widget_url': f"/widget/{hospital_id}",
-            'api_base_url': f"/api/v1/hospitals/{hospital_id}"
-        }
-        
-        return jsonify({'config': widget_config})
+        return jsonify({'config': build_widget_config(hospital_id, hospital_data)})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # ===== HELPER FUNCTIONS =====
 
-def load_hospital_data(hospital_id):
-    """Load hospital data from storage"""
+WIDGET_DEFAULTS = {
+    'name': 'XYZ Hospital',
+    'logo_url': '/static/images/xyz_logo/logo.png',
+    'primary_color': '#2563eb',
+    'secondary_color': '#059669',
+    'features': ['appointment_booking', 'general_queries', 'appointment_management']
+}
+
+def build_widget_config(hospital_id, hospital_data=None):
+    """Widget configuration for a hospital; defaults fill anything the data lacks"""
+    hospital_data = hospital_data or {}
+    # hospital_info.json keeps the details under "hospital" with per-language names
+    info = hospital_data.get('hospital', hospital_data)
+    name = info.get('name') or WIDGET_DEFAULTS['name']
+    if isinstance(name, Mapping):
+        name = name.get('english') or next(iter(name.values()), WIDGET_DEFAULTS['name'])
+    
+    return {
+        'hospital_id': hospital_id,
+        'name': name,
+        'logo_url': info.get('logo_url', WIDGET_DEFAULTS['logo_url']),
+        'primary_color': info.get('primary_color', WIDGET_DEFAULTS['primary_color']),
+        'secondary_color': info.get('secondary_color', WIDGET_DEFAULTS['secondary_color']),
+        'features': info.get('features', WIDGET_DEFAULTS['features']),
+        'widget_url': f"/widget/{hospital_id}",
+        'api_base_url': f"/api/v1/hospitals/{hospital_id}"
+    }
+
+# ===== HOSPITAL DATA FILES =====
+# Each file is parsed once and reloaded when its mtime changes. Callers get a
+# read-only snapshot; the public GET endpoints send pre-serialized bodies.
+
+class JsonSnapshot:
+    """Parsed JSON file: frozen data, optional groups and ready-to-send bodies"""
+    def __init__(self, data, bodies, groups=None):
+        self.data = data
+        self.bodies = bodies
+        self.groups = groups or {}
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+def _read_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _json_body(envelope, value, tag):
+    return Precompressed(json_provider.dumps_bytes({envelope: value}), tag)
+
+def _load_hospital_info(path):
+    data = _read_json(path)
+    return JsonSnapshot(_freeze(data), {None: _json_body('hospital', data, 'hospital')})
+
+def _load_departments(path):
+    departments = _read_json(path)
+    return JsonSnapshot(_freeze(departments), {None: _json_body('departments', departments, 'departments')})
+
+def _load_doctors(path):
+    doctors = _read_json(path)
+    by_department = {}
+    for doctor in doctors:
+        by_department.setdefault(str(doctor.get('department_id')), []).append(doctor)
+    bodies = {None: _json_body('doctors', doctors, 'doctors')}
+    for department_id, group in by_department.items():
+        bodies[department_id] = _json_body('doctors', group, 'doctors')
+    groups = {department_id: _freeze(group) for department_id, group in by_department.items()}
+    return JsonSnapshot(_freeze(doctors), bodies, groups)
+
+DATA_DIR = BASE_DIR / 'data'
+_hospital_info_file = FileCache(DATA_DIR / 'hospital_info.json', _load_hospital_info)
+_departments_file = FileCache(DATA_DIR / 'departments.json', _load_departments)
+_doctors_file = FileCache(DATA_DIR / 'doctors.json', _load_doctors)
+
+def _snapshot(cache):
     try:
-        # In production, this would query a database
-        if hospital_id == 'xyz_hospital':
-            with open('app/data/hospital_info.json', 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return None
-    except:
+        return cache.get()
+    except Exception as e:
+        print(f"Error loading {cache.path}: {e}")
         return None
 
+def _hospital_snapshot(hospital_id):
+    # In production, this would query a database
+    if hospital_id == 'xyz_hospital':
+        return _snapshot(_hospital_info_file)
+    return None
+
+def _json_response(body):
+    return body.respond(
+        'application/json',
+        f"public, max-age={settings.METADATA_MAX_AGE}, "
+        f"stale-while-revalidate={settings.METADATA_STALE_WHILE_REVALIDATE}"
+    )
+
+def load_hospital_data(hospital_id):
+    """Load hospital data (read-only) from storage"""
+    snapshot = _hospital_snapshot(hospital_id)
+    return snapshot.data if snapshot else None
+
 def load_hospital_departments(hospital_id):
-    """Load departments for a hospital"""
-    try:
-        with open('app/data/departments.json', 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except:
-        return []
+    """Load departments (read-only) for a hospital"""
+    snapshot = _snapshot(_departments_file)
+    return snapshot.data if snapshot else ()
 
 def load_hospital_doctors(hospital_id, department_id=None):
-    """Load doctors for a hospital"""
-    try:
-        with open('app/data/doctors.json', 'r', encoding='utf-8') as f:
-            doctors = json.load(f)
-            if department_id:
-                doctors = [d for d in doctors if d.get('department_id') == department_id]
-            return doctors
-    except:
-        return []
+    """Load doctors (read-only) for a hospital"""
+    snapshot = _snapshot(_doctors_file)
+    if not snapshot:
+        return ()
+    if department_id:
+        return snapshot.groups.get(str(department_id), ())
+    return snapshot.data
 
 def load_appointment(hospital_id, appointment_id):
-    """Load specific appointment from database"""
+    """Load specific appointment, with department and doctor details, from database"""
     try:
-        from services.data_service_db import get_appointment_by_id
-        return get_appointment_by_id(appointment_id)
+        from services.data_service_db import get_appointment_details
+        return get_appointment_details(appointment_id)
     except Exception as e:
         print(f"Error loading appointment {appointment_id}: {e}")
         return None
 
 def load_appointments_by_phone(hospital_id, phone):
-    """Load appointments by phone number from database"""
+    """Load appointments, with department and doctor details, by phone number from database"""
     try:
-        from services.data_service_db import get_appointments_by_phone
-        return get_appointments_by_phone(phone)
+        from services.data_service_db import get_appointment_details_by_phone
+        return get_appointment_details_by_phone(phone)
     except Exception as e:
         print(f"Error loading appointments for phone {phone}: {e}")
         return []
@@ -2,38 +2,45 @@ import os
 import logging
 import traceback
 import random
-import tempfile
 import pathlib
 from datetime import datetime, timedelta
-from flask import Flask, json, render_template, request, jsonify, send_file
+from flask import Flask, json, render_template, request, jsonify, send_file, Response, stream_with_context, url_for, g
 from flask_cors import CORS
 from flask_talisman import Talisman
 from config import settings, BASE_DIR
 from services import data_service_db as ds
+from services import slips
 from services.slips import generate_pdf_for_appointment
-from services.ai import get_general_query_answer
-from services.google_stt import google_stt
-from services.google_tts import google_tts
+from services.ai import get_general_query_answer, localize_answer, knowledge_bases
+from services.google_stt import stream_stt
+from services import tts_cache, http_client, metadata_cache, lang_packs, assets, widget_bootstrap
+from services.voice_pipeline import (
+    StageTimer, iter_upload_chunks, voice_for, language_name, render_speech,
+    needs_translation, acknowledgement_audio, speech_digests, executor as voice_executor,
+)
 from services.google_translate import google_translate
-from config_db import SessionLocal
+from config_db import SessionLocal, engine
 from sqlalchemy import text
 from models import Appointment
 from admin_routes import admin_bp
-from api_routes import api_bp
-
-# Configure logging
-logging.basicConfig(
-    level=getattr(logging, settings.LOG_LEVEL),
-    format='%(asctime)s %(levelname)s %(name)s %(message)s',
-    handlers=[
-        logging.FileHandler(settings.LOG_FILE),
-        logging.StreamHandler()
-    ]
-)
+from api_routes import api_bp, build_widget_config, load_hospital_data
+import tenant
+import tracing
+import sql_stats
+import metrics
+import profiler
+import json_provider
+import log_config
+
+# Logging goes through a queue; file/console writes happen on a background thread
+log_config.configure()
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__, static_folder="static", template_folder="templates")
 
+# orjson-backed jsonify with datetime/Decimal support
+json_provider.init_app(app)
+
 # Security configuration
 CORS(app, origins=os.getenv("ALLOWED_ORIGINS", "*").split(","))
 
@@ -80,7 +87,25 @@ csp = {
 }
 
 # Apply Content Security Policy
-Talisman(app, content_security_policy=csp)
+talisman = Talisman(app, content_security_policy=csp)
+
+# Prometheus request latency per route; served at /metrics
+metrics.init_app(app)
+
+# Request ids, per-stage spans (incl. SQL) and a JSON trace log line per request
+tracing.init_app(app, engine)
+
+# Statement fingerprints, per-request query counts, N+1 warnings
+sql_stats.init_app(app, engine)
+
+# Sampling profiler and slow-request capture; no-op unless enabled
+profiler.init_app(app)
+
+# Resolve the hospital (tenant) once per request; scopes all ORM queries
+tenant.init_app(app)
+
+# Fingerprinted bundles from build_assets.py (asset_urls() in templates)
+assets.init_app(app)
 
 # Register blueprints
 app.register_blueprint(admin_bp)
@@ -90,13 +115,34 @@ app.register_blueprint(api_bp)
 if settings.FLASK_ENV == "production":
     # Additional security headers can be added here
     pass
-hospital_data = ds.get_hospital_info()
-if not hospital_data:
-    hospital_data = {
-        "name": "XYZ Hospital",
-         "address": "Warje, pune, Maharashtra, India",
-         "Phone": "+91-8967780000"
-    }
+
+# Split lang.json into compressed per-language packs before the first request
+try:
+    lang_packs.preload()
+except Exception as e:
+    logger.warning(f"Language packs not preloaded: {e}")
+
+
+def warm_caches(hospital_ids=None):
+    """Build shared read-only state before workers fork (gunicorn.conf.py, preload_app).
+
+    Knowledge bases, metadata snapshots and the PDF stack are then inherited
+    copy-on-write instead of being rebuilt by every worker on its first request.
+    """
+    started = datetime.now()
+    for hospital_id in hospital_ids or settings.PRELOAD_HOSPITAL_IDS:
+        try:
+            knowledge_bases.warm([hospital_id])
+            metadata_cache.get(hospital_id)
+        except Exception as e:
+            logger.warning(f"Caches for {hospital_id} not warmed: {e}")
+    try:
+        slips.preload()
+    except Exception as e:
+        logger.warning(f"PDF support not preloaded: {e}")
+    # Workers open their own connections; don't keep the master's idle ones around
+    engine.dispose()
+    return (datetime.now() - started).total_seconds()
 
 # 🔥 Auto-cleanup helper
 def cleanup_old_appointments():
@@ -122,56 +168,80 @@ def api_voice():
             return jsonify({"error": "No audio file uploaded"}), 400
 
         lang = request.form.get("lang", "en-IN")
+        lang_name = language_name(lang)
+        voice = voice_for(lang)
         audio_file = request.files["audio"]
-
-        # Save user audio temporarily
-        tmp_in = pathlib.Path(BASE_DIR) / "data" / "temp_user.wav"
-        audio_file.save(tmp_in)
-
-        # --- Step 1: Speech to Text ---
-        transcript = google_stt(str(tmp_in), language=lang)
-
-        # --- Step 2: Translate to English (for bot logic) ---
-        if lang.startswith("hi"):
-            user_text_en = google_translate.translate(transcript, target_lang="en")
-        elif lang.startswith("mr"):
-            user_text_en = google_translate.translate(transcript, target_lang="en")
-        else:
-            user_text_en = transcript
-
-        # --- Step 3: Bot logic (placeholder: simple echo / can plug booking flow) ---
-        bot_reply_en = f"You said: {user_text_en}"
-
-        # --- Step 4: Translate reply back to user lang ---
-        if lang.startswith("hi"):
-            bot_reply_local = google_translate.translate(bot_reply_en, target_lang="hi")
-        elif lang.startswith("mr"):
-            bot_reply_local = google_translate.translate(bot_reply_en, target_lang="mr")
-        else:
-            bot_reply_local = bot_reply_en
-
-        # --- Step 5: TTS for reply ---
-        tmp_out = tempfile.NamedTemporaryFile(delete=False, suffix=".mp3")
-        voice_map = {
-            "en-IN": "en-IN-Wavenet-D",
-            "hi-IN": "hi-IN-Wavenet-A",
-            "mr-IN": "mr-IN-Wavenet-A"
+        timer = StageTimer()
+        pool = voice_executor()
+
+        # The acknowledgement is synthesized while the user's audio is transcribed
+        ack_future = pool.submit(acknowledgement_audio, lang, lang_name)
+
+        # --- Step 1: Speech to Text (audio is streamed from the upload, never written to disk) ---
+        with timer("stt"):
+            transcript = stream_stt(iter_upload_chunks(audio_file), language=lang)
+
+        # --- Step 2: Query engine (translates the question to English itself) ---
+        with timer("query"):
+            answer = get_general_query_answer(transcript, lang_name, hospital_id=request.form.get("hospital_id"))
+            answer = localize_answer(answer, lang_name)
+            sentences = render_speech(answer, lang_name)
+
+        # --- Step 3: Translate any sentence still in English, in parallel ---
+        with timer("translate_out"):
+            target = lang.split("-")[0]
+            sentences = list(pool.map(
+                lambda s: google_translate.translate(s, target_lang=target) if needs_translation(s, lang_name) else s,
+                sentences
+            ))
+
+        # --- Step 4: TTS for every sentence at once; streamed back in order ---
+        audio_futures = [pool.submit(tts_cache.synthesize_cached, s, lang=lang, voice=voice) for s in sentences]
+        with timer("ack_wait"):
+            try:
+                ack_audio = ack_future.result()
+            except Exception:
+                traceback.print_exc()
+                ack_audio = b""  # the answer still plays without it
+
+        def generate():
+            yield ack_audio
+            with timer("tts"):
+                for future in audio_futures:
+                    try:
+                        yield future.result()
+                    except Exception as e:
+                        # TTS down or circuit open: skip the sentence rather than cut the stream
+                        logger.warning(f"TTS failed for a reply sentence: {e}")
+            timer.log("api_voice")
+
+        headers = {
+            "Content-Disposition": 'inline; filename="reply.mp3"',
+            "Cache-Control": "no-store",
         }
-        voice = voice_map.get(lang, "en-IN-Wavenet-D")
-        google_tts(bot_reply_local, str(tmp_out.name), lang=lang, voice=voice)
-
-        return send_file(
-            tmp_out.name,
-            as_attachment=False,
-            mimetype="audio/mpeg",
-            download_name="reply.mp3"
-        )
+        if settings.TRACE_SERVER_TIMING:
+            headers["Server-Timing"] = timer.server_timing()
+        return Response(stream_with_context(generate()), mimetype="audio/mpeg", headers=headers)
 
     except Exception as e:
         traceback.print_exc()
+        tracing.record_error()
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/api/voice/audio/<digest>.mp3")
+def voice_audio(digest):
+    # Content-addressed, so a given URL never changes
+    if len(digest) != 64 or not all(c in "0123456789abcdef" for c in digest):
+        return jsonify({"error": "Not found"}), 404
+    path = tts_cache.path_for(digest)
+    if not path.is_file():
+        return jsonify({"error": "Not found"}), 404
+    response = send_file(path, mimetype="audio/mpeg", conditional=True, etag=digest, max_age=31536000)
+    response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
+
+
 # --- Page Routes ---
 @app.route("/")
 def index():
@@ -266,27 +336,17 @@ def widget_page(hospital_id):
 
 @app.route("/widget/<hospital_id>/embed.js")
 def widget_embed_js(hospital_id):
-    # Return the widget embed JavaScript
-    return send_file("static/js/widget-embed.js", mimetype="application/javascript")
+    # Small per-hospital loader with the config inlined; the full widget is
+    # fetched when the chat is first opened
+    config = build_widget_config(hospital_id, load_hospital_data(hospital_id))
+    return widget_bootstrap.respond(widget_bootstrap.get(hospital_id, config))
 
 
 @app.route("/meta/departments")
 def meta_depts():
     try:
-        # Check if we're using the correct database
-        from config_db import DATABASE_URL
-        if not DATABASE_URL.startswith("postgresql"):
-            logger.warning("Using SQLite database - falling back to JSON data")
-            # Fallback to JSON data service for development
-            from services import data_service_json as json_ds
-            departments = json_ds.list_departments()
-            logger.info(f"Found {len(departments)} departments in JSON fallback")
-            return jsonify(departments)
-        
-        hospital_id = request.args.get('hospital_id', 'xyz')
-        departments = ds.list_departments(hospital_id=hospital_id)
-        logger.info(f"Found {len(departments)} departments in Supabase for hospital {hospital_id}")
-        return jsonify(departments)
+        meta = metadata_cache.get(g.hospital_id)
+        return metadata_cache.respond(meta, "departments", meta.departments)
     except Exception as e:
         logger.error(f"Error fetching departments: {e}")
         # Try JSON fallback even if database fails
@@ -305,20 +365,10 @@ def meta_depts():
 def meta_doctors():
     dept = request.args.get("department_id")
     try:
-        # Check if we're using the correct database
-        from config_db import DATABASE_URL
-        if not DATABASE_URL.startswith("postgresql"):
-            logger.warning("Using SQLite database - falling back to JSON data for doctors")
-            # Fallback to JSON data service for development
-            from services import data_service_json as json_ds
-            doctors = json_ds.list_doctors(dept)
-            logger.info(f"Found {len(doctors)} doctors in JSON fallback")
-            return jsonify(doctors)
-        
-        hospital_id = request.args.get('hospital_id', 'xyz')
-        doctors = ds.list_doctors(dept, hospital_id=hospital_id)
-        logger.info(f"Found {len(doctors)} doctors in Supabase for hospital {hospital_id}")
-        return jsonify(doctors)
+        meta = metadata_cache.get(g.hospital_id)
+        if dept:
+            return metadata_cache.respond(meta, f"doctors:{dept}", meta.doctors_by_department.get(str(dept), []))
+        return metadata_cache.respond(meta, "doctors", meta.doctors)
     except Exception as e:
         logger.error(f"Error fetching doctors: {e}")
         # Try JSON fallback even if database fails
@@ -340,19 +390,11 @@ def meta_doctor_days():
         return jsonify([]), 400
     
     try:
-        # Check if we're using the correct database
-        from config_db import DATABASE_URL
-        if not DATABASE_URL.startswith("postgresql"):
-            # Fallback to JSON data service for development
-            from services import data_service_json as json_ds
-            doctors = json_ds.list_doctors(None)
-        else:
-            doctors = ds.list_doctors(None)
-            
-        for doc in doctors:
-            if str(doc["id"]) == str(doc_id):
-                return jsonify(doc.get("available_days", []))
-        return jsonify([]), 404
+        meta = metadata_cache.get(g.hospital_id)
+        doc = meta.doctors_by_id.get(str(doc_id))
+        if doc is None:
+            return jsonify([]), 404
+        return metadata_cache.respond(meta, f"doctor_days:{doc_id}", doc.available_days)
     except Exception as e:
         logger.error(f"Error fetching doctor days: {e}")
         return jsonify([]), 500
@@ -408,17 +450,17 @@ def confirm():
 
         # Auto-fill doctor name if missing
         if not data["doctor"] and data.get("doctor_id"):
-            doc_info = next((d for d in ds.list_doctors(None) if str(d["id"]) == str(data["doctor_id"])), None)
+            doc_info = ds.get_doctor(data["doctor_id"])
             if doc_info:
-                data["doctor"] = doc_info["name"]["en"]
+                data["doctor"] = doc_info.name.en
             else:
                 return jsonify({"detail": "Invalid doctor_id"}), 400
 
         # Auto-fill department name if missing
         if not data["department"] and data.get("department_id"):
-            dept_info = next((dep for dep in ds.list_departments() if str(dep["id"]) == str(data["department_id"])), None)
+            dept_info = ds.get_department(data["department_id"])
             if dept_info:
-                data["department"] = dept_info["name"]["en"]
+                data["department"] = dept_info.name.en
             else:
                 return jsonify({"detail": "Invalid department_id"}), 400
 
@@ -444,6 +486,7 @@ def confirm():
 
     except Exception as e:
         traceback.print_exc()
+        tracing.record_error()
         return jsonify({"detail": str(e)}), 500
 
 
@@ -474,15 +517,15 @@ def patch(appointment_id):
 
         # Auto-fill missing doctor name
         if not patch_data["doctor"] and patch_data.get("doctor_id"):
-            doc_info = next((d for d in ds.list_doctors(None) if str(d["id"]) == str(patch_data["doctor_id"])), None)
+            doc_info = ds.get_doctor(patch_data["doctor_id"])
             if doc_info:
-                patch_data["doctor"] = doc_info["name"]["en"]
+                patch_data["doctor"] = doc_info.name.en
 
         # Auto-fill missing department name
         if not patch_data["department"] and patch_data.get("department_id"):
-            dept_info = next((dep for dep in ds.list_departments() if str(dep["id"]) == str(patch_data["department_id"])), None)
+            dept_info = ds.get_department(patch_data["department_id"])
             if dept_info:
-                patch_data["department"] = dept_info["name"]["en"]
+                patch_data["department"] = dept_info.name.en
 
         # ✅ Update appointment
         appt = ds.update_appointment(appointment_id, patch_data)
@@ -496,6 +539,7 @@ def patch(appointment_id):
         return jsonify({"detail": str(e)}), 400
     except Exception as e:
         traceback.print_exc()
+        tracing.record_error()
         return jsonify({"detail": str(e)}), 500
 
 @app.route("/appointments/find", methods=["POST"])
@@ -511,15 +555,11 @@ def find():
         if not appt:
             return jsonify({"detail": "not found"}), 404
         
-        # Ensure all values are JSON serializable
-        for k, v in appt.items():
-            if hasattr(v, 'isoformat'):
-                appt[k] = v.isoformat()
-        
         return jsonify(appt)
     except Exception as e:
         print(f"Error in find endpoint: {e}")
         traceback.print_exc()
+        tracing.record_error()
         return jsonify({"detail": "Internal server error"}), 500
 
 
@@ -561,97 +601,34 @@ def handle_queries():
         question = data.get("question", "")
         lang = data.get("lang", "english").lower()
 
-        answer = get_general_query_answer(question, lang)
+        answer = get_general_query_answer(question, lang, hospital_id=data.get("hospital_id"))
+        answer = localize_answer(answer, lang)
 
-        # --- Helper to localize values ---
-        def pick(val):
-            if isinstance(val, dict):
-                return val.get(lang) or val.get("english") or ""
-            return val or ""
-
-        if answer.get("type") == "timings":
-            answer["opd"] = pick(answer.get("opd"))
-            answer["emergency"] = pick(answer.get("emergency"))
-            answer["visiting"] = pick(answer.get("visiting"))
-
-        elif answer.get("type") == "doctors":
-            # ✅ Normalize department name
-            dept = answer.get("department", "")
-            if isinstance(dept, dict):
-                answer["department"] = dept.get(lang) or dept.get("english") or ""
-            else:
-                answer["department"] = str(dept) if dept else ""
-
-            # ✅ Normalize doctor info
-            doctors = []
-            for d in answer.get("doctors", []):
-                doctors.append({
-                    "name": pick(d.get("name")),
-                    "qualification": pick(d.get("qualification")),
-                    "experience": pick(d.get("experience")),
-                    "timings": pick(d.get("timings")),
-                    "fees": d.get("fees", "")
-                })
-            answer["doctors"] = doctors
-
-        elif answer.get("type") == "departments":
-            depts = []
-            for d in answer.get("departments", []):
-                if isinstance(d, dict):
-                    depts.append(d.get(lang) or d.get("english") or "")
-                else:
-                    depts.append(str(d))
-            answer["departments"] = depts
-
-        elif answer.get("type") == "services":
-            # Localize services
-            new_services = {}
-            for k, v in answer.get("services", {}).items():
-                new_services[pick(k)] = pick(v)
-            answer["services"] = new_services
-
-        elif answer.get("type") == "symptom":
-            if isinstance(answer.get("department"), dict):
-                answer["department"] = answer["department"].get(lang) or answer["department"].get("english") or ""
-
-            doctors = []
-            for d in answer.get("doctors", []):
-                doctors.append({
-                    "name": pick(d.get("name")),
-                    "qualification": pick(d.get("qualification")),
-                    "experience": pick(d.get("experience")),
-                    "timings": pick(d.get("timings")),
-                    "fees": d.get("fees", "")
-                })
-            answer["doctors"] = doctors
-
-        elif answer.get("type") == "text":
-            answer["answer"] = pick(answer.get("answer"))
+        # Optional spoken reply; fixed answers are already in the TTS cache
+        if data.get("speak"):
+            try:
+                answer["audio"] = [url_for("voice_audio", digest=d) for d in speech_digests(answer, lang)]
+            except Exception:
+                traceback.print_exc()
 
         return jsonify(answer)
 
     except Exception as e:
         traceback.print_exc()
+        tracing.record_error()
         return jsonify({"error": str(e)}), 500
 
 
 @app.route("/lang/<lang>")
 def get_language(lang):
     try:
-        lang_file = BASE_DIR / "static" / "lang" / "lang.json"
-        if not lang_file.exists():
-            return jsonify({"error": "lang.json file not found"}), 404
-
-        with lang_file.open(encoding="utf-8") as f:
-            data = json.load(f)
-
-        if lang in data:
-            return jsonify(data[lang])
-        elif "english" in data:
-            return jsonify(data["english"])
-        else:
+        pack = lang_packs.get_pack(lang)
+        if pack is None:
             return jsonify({"error": f"Language '{lang}' not found"}), 404
+        return lang_packs.respond(pack)
 
+    except FileNotFoundError:
+        return jsonify({"error": "lang.json file not found"}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -690,6 +667,7 @@ def health_check():
             "status": "healthy", 
             "timestamp": datetime.now().isoformat(),
             "database": db_status,
+            "upstreams": http_client.stats(),
             "environment": os.getenv("FLASK_ENV", "development")
         }), 200
     except Exception as e:
@@ -703,6 +681,12 @@ def health_check():
             "environment": os.getenv("FLASK_ENV", "development")
         }), 200
 
+# Prometheus scrape endpoint; plain HTTP so in-cluster scrapers aren't redirected
+@app.route("/metrics")
+@talisman(force_https=False)
+def metrics_endpoint():
+    return metrics.respond()
+
 # Debug endpoint to check data
 @app.route("/debug/data")
 def debug_data():
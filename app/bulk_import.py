@@ -0,0 +1,454 @@
+"""
+Bulk import for hospital onboarding.
+
+Streams CSV / JSON / JSON Lines input, validates and normalizes rows in
+chunks, and loads each chunk with a single round trip per chunk:
+PostgreSQL uses COPY into a staging table followed by one
+INSERT ... ON CONFLICT, SQLite uses executemany with an upsert.
+
+Usage:
+    python app/bulk_import.py appointments app/data/appointments.csv
+    python app/bulk_import.py doctors app/data/doctors.json --chunk-size 500
+    python app/bulk_import.py appointments history.csv --rejects rejects.csv
+    python app/bulk_import.py doctors doctors.csv --hospital-id reliance
+    python app/bulk_import.py appointments backup.csv --keep-ids
+
+Appointment ids in the input are ignored unless --keep-ids is given: an
+export from another database would otherwise overwrite live appointments
+that happen to share an id.
+
+Department and doctor ids are unique across hospitals (see models.py). A row
+whose id already belongs to another hospital is not updated; it goes to the
+rejects file instead.
+"""
+import argparse
+import csv
+import functools
+import io
+import json
+import re
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from config import settings
+from config_db import engine, DATABASE_URL
+from models import Appointment, Base
+from migrate_data import parse_date, parse_timestamp, parse_boolean
+
+DEFAULT_CHUNK_SIZE = 1000
+DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+TIME_RE = re.compile(r"^\d{2}:\d{2}$")
+
+
+class RowRejected(ValueError):
+    """Raised by a normalizer when a row cannot be imported."""
+
+
+# --- Value helpers ---
+def _to_bool(value, default=None):
+    """Parse a boolean cell; a missing/empty/"null" value gives default."""
+    if isinstance(value, bool):
+        return value
+    if value is None or str(value).strip().lower() in ("", "null"):
+        return default
+    return parse_boolean(str(value))
+
+def _column_default(model, column):
+    default = model.__table__.c[column].default
+    return default.arg if default is not None else None
+
+def _to_timestamp(value):
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return parse_timestamp(str(value))
+
+def _name_parts(row):
+    """Accept either {"name": {"en":..}} (JSON exports) or name_en/name_hi/name_mr columns."""
+    name = row.get("name")
+    if isinstance(name, dict):
+        return name.get("en"), name.get("hi"), name.get("mr")
+    return row.get("name_en") or name, row.get("name_hi"), row.get("name_mr")
+
+def _days_list(value):
+    if not value:
+        return []
+    if isinstance(value, list):
+        return [str(d).strip() for d in value if str(d).strip()]
+    return [d.strip() for d in re.split(r"[,|;]", str(value)) if d.strip()]
+
+def _required(row, *fields):
+    missing = [f for f in fields if row.get(f) in (None, "")]
+    if missing:
+        raise RowRejected(f"missing required field(s): {', '.join(missing)}")
+
+
+# --- Row normalizers (raw input row -> column dict) ---
+def normalize_department(row):
+    _required(row, "id")
+    name_en, name_hi, name_mr = _name_parts(row)
+    if not name_en:
+        raise RowRejected("missing English name")
+    return {"id": str(row["id"]), "name_en": name_en, "name_hi": name_hi, "name_mr": name_mr}
+
+def normalize_doctor(row):
+    _required(row, "id", "department_id")
+    name_en, name_hi, name_mr = _name_parts(row)
+    if not name_en:
+        raise RowRejected("missing English name")
+    fees = row.get("fees")
+    if fees not in (None, ""):
+        try:
+            fees = float(fees)
+        except (TypeError, ValueError):
+            raise RowRejected(f"invalid fees '{fees}'")
+    else:
+        fees = None
+    return {
+        "id": str(row["id"]),
+        "department_id": str(row["department_id"]),
+        "name_en": name_en,
+        "name_hi": name_hi,
+        "name_mr": name_mr,
+        "education": row.get("education"),
+        "experience": row.get("experience"),
+        "fees": fees,
+        "available_days": _days_list(row.get("available_days")),
+        "start_time": row.get("start_time") or None,
+        "end_time": row.get("end_time") or None,
+    }
+
+def normalize_appointment(row, keep_id=False):
+    _required(row, "name", "phone", "department_id", "doctor_id", "date", "time")
+    date_val = parse_date(str(row["date"]))
+    if not date_val or not DATE_RE.match(date_val):
+        raise RowRejected(f"invalid date '{row['date']}'")
+    time_val = str(row["time"]).strip()
+    if not TIME_RE.match(time_val):
+        try:
+            time_val = datetime.strptime(time_val, "%I:%M %p").strftime("%H:%M")
+        except ValueError:
+            raise RowRejected(f"invalid time '{row['time']}'")
+    out = {
+        "name": str(row["name"]).strip(),
+        "phone": str(row["phone"]).strip(),
+        "department_id": str(row["department_id"]),
+        "doctor_id": str(row["doctor_id"]),
+        "date": date_val,
+        "time": time_val,
+        "status": str(row.get("status") or "booked").lower(),
+        "created_at": _to_timestamp(row.get("created_at")) or datetime.now(),
+        "updated_at": _to_timestamp(row.get("updated_at")),
+    }
+    # Missing flags get the model's defaults (can_edit/is_new True), as an ORM insert would
+    for flag in ("can_edit", "is_updated", "is_new", "viewed_by_admin"):
+        out[flag] = _to_bool(row.get(flag), _column_default(Appointment, flag))
+    if keep_id and row.get("id") not in (None, ""):
+        try:
+            out["id"] = int(row["id"])
+        except (TypeError, ValueError):
+            raise RowRejected(f"invalid id '{row['id']}'")
+    return out
+
+def normalize_user(row):
+    _required(row, "id", "name")
+    columns = ("id", "name", "password", "hospital_id", "address", "about",
+               "services", "staff", "working_hours")
+    return {c: row.get(c) for c in columns}
+
+
+# table -> (normalizer, upsert key)
+TENANT_TABLES = {"departments", "doctors", "appointments"}
+TABLES = {
+    "departments": (normalize_department, "id"),
+    "doctors": (normalize_doctor, "id"),
+    "appointments": (normalize_appointment, "id"),
+    "users": (normalize_user, "id"),
+}
+
+
+# --- Input readers ---
+def iter_input_rows(path):
+    """Yield raw row dicts from a .csv, .jsonl/.ndjson or .json (array) file."""
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == ".csv":
+        with path.open(newline="", encoding="utf-8-sig") as f:
+            yield from csv.DictReader(f)
+    elif suffix in (".jsonl", ".ndjson"):
+        with path.open(encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+    elif suffix == ".json":
+        # Plain JSON arrays have to be parsed whole; prefer .jsonl for large files
+        with path.open(encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            data = [data]
+        yield from data
+    else:
+        raise ValueError(f"Unsupported input format: {path.suffix}")
+
+def iter_chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# --- Loaders ---
+def _is_postgres():
+    return DATABASE_URL.startswith("postgresql")
+
+def _sqlite_value(value):
+    if isinstance(value, list):
+        return ",".join(value)
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    return value
+
+def _copy_escape(value):
+    """Render one value in PostgreSQL COPY text format."""
+    if value is None:
+        return r"\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime):
+        value = value.isoformat(sep=" ")
+    elif isinstance(value, list):
+        value = "{" + ",".join(
+            '"' + str(v).replace("\\", "\\\\").replace('"', '\\"') + '"' for v in value
+        ) + "}"
+    else:
+        value = str(value)
+    return (value.replace("\\", "\\\\").replace("\t", "\\t")
+                 .replace("\n", "\\n").replace("\r", "\\r"))
+
+def _upsert_sql(table, columns, key, source):
+    cols = ", ".join(columns)
+    if key not in columns:
+        return f"INSERT INTO {table} ({cols}) {source}"
+    insert = f"INSERT INTO {table} ({cols}) {source} ON CONFLICT ({key})"
+    if table not in TENANT_TABLES:
+        updates = ", ".join(f"{c} = excluded.{c}" for c in columns if c != key)
+        return f"{insert} DO UPDATE SET {updates}"
+    # A conflicting row of another hospital is left alone (and reported by _load_chunk)
+    updates = ", ".join(f"{c} = excluded.{c}" for c in columns if c not in (key, "hospital_id"))
+    if not updates:
+        return f"{insert} DO NOTHING"
+    return f"{insert} DO UPDATE SET {updates} WHERE {table}.hospital_id = excluded.hospital_id"
+
+def _load_sqlite(cursor, table, key, columns, rows):
+    placeholders = ", ".join("?" for _ in columns)
+    sql = _upsert_sql(table, columns, key, f"VALUES ({placeholders})")
+    cursor.executemany(sql, [tuple(_sqlite_value(r.get(c)) for c in columns) for r in rows])
+    return cursor.rowcount
+
+def _load_postgres(cursor, table, key, columns, rows):
+    staging = f"_import_{table}"
+    cols = ", ".join(columns)
+    cursor.execute(
+        f"CREATE TEMP TABLE IF NOT EXISTS {staging} "
+        f"(LIKE {table} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+    )
+    buf = io.StringIO()
+    for r in rows:
+        buf.write("\t".join(_copy_escape(r.get(c)) for c in columns))
+        buf.write("\n")
+    buf.seek(0)
+    cursor.copy_expert(f"COPY {staging} ({cols}) FROM STDIN", buf)
+    cursor.execute(_upsert_sql(table, columns, key, f"SELECT {cols} FROM {staging}"))
+    written = cursor.rowcount
+    cursor.execute(f"TRUNCATE {staging}")
+    return written
+
+def _rows_of_other_hospitals(cursor, table, key, rows):
+    """Rows whose key is stored under a different hospital_id (skipped by the upsert)."""
+    placeholder = "%s" if _is_postgres() else "?"
+    keys = [r[key] for r in rows]
+    cursor.execute(
+        f"SELECT {key}, hospital_id FROM {table} WHERE {key} IN ({', '.join(placeholder for _ in keys)})",
+        keys,
+    )
+    owners = dict(cursor.fetchall())
+    return [r for r in rows if owners.get(r[key]) != r["hospital_id"]]
+
+def _load_chunk(conn, table, key, rows):
+    """Load rows; returns the rows that were skipped because their key belongs
+    to another hospital."""
+    # Rows without the key (e.g. appointments relying on autoincrement) are
+    # plain inserts; group rows by their column set so each group is one statement.
+    groups = {}
+    for r in rows:
+        groups.setdefault(tuple(r.keys()), []).append(r)
+    skipped = []
+    cursor = conn.cursor()
+    try:
+        for columns, group in groups.items():
+            if _is_postgres():
+                written = _load_postgres(cursor, table, key, list(columns), group)
+            else:
+                written = _load_sqlite(cursor, table, key, list(columns), group)
+            if table in TENANT_TABLES and key in columns and written < len(group):
+                skipped.extend(_rows_of_other_hospitals(cursor, table, key, group))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return skipped
+
+def _has_serial_key(table, key):
+    """True when table.key is an autoincrementing integer (a PostgreSQL serial)."""
+    model_table = Base.metadata.tables.get(table)
+    if model_table is None or key not in model_table.c:
+        return False
+    column = model_table.c[key]
+    return column.primary_key and column.autoincrement in (True, "auto") and \
+        column.type.python_type is int
+
+def _reset_sequence(conn, table, key):
+    """Move the serial past explicitly imported ids so later inserts don't collide."""
+    if not _is_postgres() or not _has_serial_key(table, key):
+        return
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence('{table}', '{key}'), "
+            f"COALESCE((SELECT MAX({key}) FROM {table}), 1))"
+        )
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print(f"⚠️  Could not reset the {table}.{key} sequence: {e}")
+    finally:
+        cursor.close()
+
+
+# --- Entry point ---
+def import_rows(table, rows, chunk_size=DEFAULT_CHUNK_SIZE, rejects_path=None,
+                hospital_id=None, verbose=True, keep_ids=False):
+    """Validate, normalize and load an iterable of raw row dicts into table.
+
+    Rows of tenant tables are stamped with hospital_id (the row's own value
+    wins, then the argument, then settings.DEFAULT_HOSPITAL_ID). Appointments
+    get new ids unless keep_ids is set, in which case rows with an id upsert
+    on it.
+
+    Rejected rows are written to rejects_path (CSV, original fields plus an
+    _error column). Returns a summary dict with loaded/rejected counts,
+    elapsed seconds and rows_per_second.
+    """
+    if table not in TABLES:
+        raise ValueError(f"Unknown table '{table}'. Choose from: {', '.join(TABLES)}")
+    normalize, key = TABLES[table]
+    if table == "appointments" and keep_ids:
+        normalize = functools.partial(normalize, keep_id=True)
+    hospital_id = hospital_id or settings.DEFAULT_HOSPITAL_ID
+
+    rejects_file = None
+    rejects_writer = None
+    loaded = rejected = 0
+
+    def reject(raw, error):
+        nonlocal rejects_file, rejects_writer, rejected
+        rejected += 1
+        if rejects_path:
+            if rejects_writer is None:
+                rejects_file = open(rejects_path, "w", newline="", encoding="utf-8")
+                rejects_writer = csv.writer(rejects_file)
+                rejects_writer.writerow(["_error", "_row"])
+            rejects_writer.writerow([error, json.dumps(raw, ensure_ascii=False, default=str)])
+
+    start = time.perf_counter()
+    conn = engine.raw_connection()
+    try:
+        for chunk_no, chunk in enumerate(iter_chunks(rows, chunk_size), start=1):
+            chunk_start = time.perf_counter()
+            good = []
+            raw_of = {}
+            for raw in chunk:
+                try:
+                    row = normalize(raw)
+                    if table in TENANT_TABLES:
+                        row["hospital_id"] = raw.get("hospital_id") or hospital_id
+                    good.append(row)
+                    raw_of[id(row)] = raw
+                except (RowRejected, KeyError, TypeError, ValueError) as e:
+                    reject(raw, str(e))
+            chunk_loaded = len(good)
+            if good:
+                for row in _load_chunk(conn, table, key, good):
+                    reject(raw_of[id(row)], f"{key} '{row[key]}' belongs to another hospital")
+                    chunk_loaded -= 1
+                loaded += chunk_loaded
+            if verbose:
+                chunk_elapsed = time.perf_counter() - chunk_start
+                rate = len(chunk) / chunk_elapsed if chunk_elapsed else 0
+                print(f"  chunk {chunk_no}: {chunk_loaded} loaded, {len(chunk) - chunk_loaded} rejected "
+                      f"({rate:,.0f} rows/s)")
+        if loaded:
+            _reset_sequence(conn, table, key)
+    finally:
+        conn.close()
+        if rejects_file:
+            rejects_file.close()
+
+    elapsed = time.perf_counter() - start
+    summary = {
+        "table": table,
+        "loaded": loaded,
+        "rejected": rejected,
+        "elapsed": round(elapsed, 3),
+        "rows_per_second": round((loaded + rejected) / elapsed, 1) if elapsed else 0.0,
+        "rejects_path": str(rejects_path) if rejected and rejects_path else None,
+    }
+    if verbose:
+        print(f"{table}: {loaded} loaded, {rejected} rejected in {summary['elapsed']}s "
+              f"({summary['rows_per_second']:,.0f} rows/s)")
+        if summary["rejects_path"]:
+            print(f"  rejected rows written to {summary['rejects_path']}")
+    return summary
+
+def import_file(table, path, chunk_size=DEFAULT_CHUNK_SIZE, rejects_path=None,
+                hospital_id=None, verbose=True, keep_ids=False):
+    """Import a CSV / JSON / JSON Lines file into table (see import_rows)."""
+    return import_rows(table, iter_input_rows(path), chunk_size=chunk_size,
+                       rejects_path=rejects_path, hospital_id=hospital_id, verbose=verbose,
+                       keep_ids=keep_ids)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import hospital data")
+    parser.add_argument("table", choices=sorted(TABLES))
+    parser.add_argument("path", help="CSV, JSON or JSON Lines file")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--hospital-id", help="Tenant for rows without a hospital_id "
+                                              "(default: DEFAULT_HOSPITAL_ID)")
+    parser.add_argument("--keep-ids", action="store_true",
+                        help="Keep appointment ids from the input and upsert on them "
+                             "(default: appointments get new ids)")
+    parser.add_argument("--rejects", help="CSV file for rows that fail validation "
+                                          "(default: <input>.rejects.csv)")
+    args = parser.parse_args(argv)
+
+    rejects = args.rejects or str(Path(args.path).with_suffix(".rejects.csv"))
+    summary = import_file(args.table, args.path, chunk_size=args.chunk_size,
+                          rejects_path=rejects, hospital_id=args.hospital_id,
+                          keep_ids=args.keep_ids)
+    return 1 if summary["rejected"] and not summary["loaded"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
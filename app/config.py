@@ -28,6 +28,29 @@ class Settings:
     VERTEX_AI_API_KEY = os.getenv("VERTEX_AI_API_KEY")
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
     
+    # Voice (point the URLs at voice_stub_server.py for local testing)
+    GOOGLE_STT_URL = os.getenv("GOOGLE_STT_URL", "https://speech.googleapis.com/v1/speech:recognize")
+    GOOGLE_TTS_URL = os.getenv("GOOGLE_TTS_URL", "https://texttospeech.googleapis.com/v1/text:synthesize")
+    GOOGLE_STT_STREAMING = os.getenv("GOOGLE_STT_STREAMING", "False").lower() == "true"
+    VOICE_HTTP_TIMEOUT = float(os.getenv("VOICE_HTTP_TIMEOUT", "15"))
+    
+    # Outbound HTTP (services/http_client.py)
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3"))
+    HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))
+    HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+    HTTP_BACKOFF_MS = int(os.getenv("HTTP_BACKOFF_MS", "200"))
+    BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "5"))
+    BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "30"))
+    VOICE_UPLOAD_CHUNK_BYTES = 16 * 1024  # under the streaming recognizer's 25KB request limit
+    VOICE_WORKERS = int(os.getenv("VOICE_WORKERS", "8"))
+    # Synthesized audio cache; precompute fixed answers only when TTS is reachable
+    TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "tts_cache"))
+    TTS_CACHE_MAX_MB = int(os.getenv("TTS_CACHE_MAX_MB", "512"))
+    TTS_PRECOMPUTE = os.getenv(
+        "TTS_PRECOMPUTE",
+        str(bool(GOOGLE_TTS_API_KEY or os.getenv("GOOGLE_TTS_URL")))
+    ).lower() == "true"
+    
     # Email Configuration
     HOSPITAL_EMAIL = os.getenv("HOSPITAL_EMAIL")
     EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
@@ -46,6 +69,22 @@ class Settings:
         DATABASE_URL = "sqlite:///hospital_chat.db"
         print("Using SQLite database for development")
     
+    # Multi-tenancy: hospital used when a request does not name one
+    DEFAULT_HOSPITAL_ID = os.getenv("DEFAULT_HOSPITAL_ID", "xyz")
+    # Per-hospital query engines kept in memory before the coldest is evicted
+    KB_MAX_TENANTS = int(os.getenv("KB_MAX_TENANTS", "200"))
+    KB_MAX_MEMORY_MB = int(os.getenv("KB_MAX_MEMORY_MB", "256"))
+    
+    # /meta endpoint cache: in-process TTL and browser/CDN caching of the widget's lists
+    METADATA_CACHE_TTL = int(os.getenv("METADATA_CACHE_TTL", "300"))
+    METADATA_MAX_AGE = int(os.getenv("METADATA_MAX_AGE", "60"))
+    METADATA_STALE_WHILE_REVALIDATE = int(os.getenv("METADATA_STALE_WHILE_REVALIDATE", "600"))
+    
+    # /widget/<id>/embed.js bootstrap: its URL is pasted into host pages, so it
+    # is revalidated rather than immutable
+    WIDGET_BOOTSTRAP_MAX_AGE = int(os.getenv("WIDGET_BOOTSTRAP_MAX_AGE", "3600"))
+    WIDGET_BOOTSTRAP_STALE_WHILE_REVALIDATE = int(os.getenv("WIDGET_BOOTSTRAP_STALE_WHILE_REVALIDATE", "86400"))
+    
     # Security Settings
     SESSION_COOKIE_SECURE = FLASK_ENV == "production"
     SESSION_COOKIE_HTTPONLY = True
@@ -57,7 +96,55 @@ class Settings:
     
     # Logging Configuration
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
-    LOG_FILE = os.getenv("LOG_FILE", "app.log")
+    # Anchored to the app directory, not the CWD; empty logs to the console only
+    LOG_FILE = os.getenv("LOG_FILE", str(Path(__file__).resolve().parent / "logs" / "app.log"))
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "text" if FLASK_ENV == "development" else "json").lower()
+    LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+    LOG_ROTATE_WHEN = os.getenv("LOG_ROTATE_WHEN", "")  # e.g. midnight; overrides LOG_MAX_BYTES
+    LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+    LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    
+    # Prometheus /metrics (metrics.py); set METRICS_TOKEN to require
+    # "Authorization: Bearer <token>" on scrapes. Without a token /metrics
+    # answers 403 outside development
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "True").lower() == "true"
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+    
+    # Worker startup: with gunicorn preload_app the master builds these
+    # hospitals' knowledge bases and metadata once and workers inherit them
+    PRELOAD_HOSPITAL_IDS = [h.strip() for h in os.getenv("PRELOAD_HOSPITAL_IDS", DEFAULT_HOSPITAL_ID).split(",") if h.strip()]
+    
+    # Sampling profiler and slow-request capture (profiler.py); both off by default
+    PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "False").lower() == "true"
+    PROFILER_DIR = os.getenv("PROFILER_DIR", "")  # default: data/profiles
+    PROFILER_INTERVAL_MS = int(os.getenv("PROFILER_INTERVAL_MS", "10"))
+    PROFILER_MAX_SECONDS = int(os.getenv("PROFILER_MAX_SECONDS", "300"))
+    PROFILER_MAX_DEPTH = int(os.getenv("PROFILER_MAX_DEPTH", "64"))
+    SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))
+    SLOW_REQUEST_KEEP = int(os.getenv("SLOW_REQUEST_KEEP", "100"))
+    
+    # SQL fingerprints and N+1 detection (sql_stats.py); the X-SQL-Queries
+    # response header is on by default in development only
+    SQL_STATS_ENABLED = os.getenv("SQL_STATS_ENABLED", "True").lower() == "true"
+    SQL_STATS_HEADER = os.getenv("SQL_STATS_HEADER", str(FLASK_ENV == "development")).lower() == "true"
+    SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))
+    SQL_SLOW_MS = float(os.getenv("SQL_SLOW_MS", "0"))
+    SQL_FINGERPRINT_MAX = int(os.getenv("SQL_FINGERPRINT_MAX", "500"))
+    SQL_STATEMENT_MAX_CHARS = int(os.getenv("SQL_STATEMENT_MAX_CHARS", "300"))
+    
+    # Request tracing (tracing.py): one JSON log line per request with its
+    # spans, optionally exported to an OTLP/HTTP collector
+    TRACE_ENABLED = os.getenv("TRACE_ENABLED", "True").lower() == "true"
+    TRACE_LOG_MIN_MS = float(os.getenv("TRACE_LOG_MIN_MS", "0"))
+    # Server-Timing exposes internal stage names to clients; development only by default
+    TRACE_SERVER_TIMING = os.getenv("TRACE_SERVER_TIMING", str(FLASK_ENV == "development")).lower() == "true"
+    TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", "200"))
+    TRACE_SQL_MAX_CHARS = int(os.getenv("TRACE_SQL_MAX_CHARS", "300"))
+    TRACE_EXPORT_URL = os.getenv("TRACE_EXPORT_URL", "")  # e.g. http://127.0.0.1:4318/v1/traces
+    TRACE_EXPORT_BATCH = int(os.getenv("TRACE_EXPORT_BATCH", "50"))
+    TRACE_EXPORT_INTERVAL = float(os.getenv("TRACE_EXPORT_INTERVAL", "2"))
+    TRACE_EXPORT_QUEUE = int(os.getenv("TRACE_EXPORT_QUEUE", "1000"))
+    TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "hospital-chat-assistant")
 
 BASE_DIR = Path(__file__).resolve().parent
 settings = Settings()
@@ -1,9 +1,11 @@
 import os
-from sqlalchemy import create_engine
+import time
+from sqlalchemy import create_engine, exc
 from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlalchemy.pool import QueuePool
 from dotenv import load_dotenv
 import logging
+import metrics
 
 load_dotenv()
 
@@ -31,6 +33,27 @@ if DATABASE_URL.startswith("postgresql"):
 else:
     print("Using SQLite database - departments may not load properly")
 
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that reports checkout wait time, timeouts and usage to /metrics."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        metrics.pool_created(self.size())
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            metrics.pool_timeout()
+            raise
+        metrics.pool_checkout(time.perf_counter() - start, self.checkedout(), self.overflow())
+        return conn
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        metrics.pool_usage(self.checkedout(), self.overflow())
+
 # Production-ready engine configuration
 engine_kwargs = {
     "echo": os.getenv("FLASK_ENV") == "development"
@@ -39,20 +62,26 @@ engine_kwargs = {
 # Add PostgreSQL-specific configurations only for PostgreSQL databases
 if DATABASE_URL.startswith("postgresql"):
     engine_kwargs.update({
-        "poolclass": QueuePool,
-        "pool_size": 10,
-        "max_overflow": 20,
+        "poolclass": InstrumentedQueuePool,
+        # gevent workers run many requests per process; raise these to match
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "30")),
         "pool_pre_ping": True,
         "pool_recycle": 3600,  # Recycle connections after 1 hour
     })
 
 engine = create_engine(DATABASE_URL, **engine_kwargs)
+
+# A forked worker (gunicorn preload_app) must not reuse the parent's sockets;
+# close=False leaves them to the parent instead of closing them under it
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=lambda: engine.dispose(close=False))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
-# Configure logging for database operations
-logging.basicConfig(level=logging.INFO)
+# Quiet SQLAlchemy's engine logger outside development (handlers: log_config.py)
 db_logger = logging.getLogger('sqlalchemy.engine')
 if os.getenv("FLASK_ENV") != "development":
     db_logger.setLevel(logging.WARNING)
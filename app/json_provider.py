@@ -0,0 +1,92 @@
+# app/json_provider.py
+"""
+JSON encoding for every API response.
+
+FastJSONProvider is registered as the app's JSON provider, so jsonify() and
+request.get_json() use it; dumps_bytes() serves code that pre-serializes
+bodies outside a request (metadata and hospital file snapshots).
+
+orjson is used when installed (several times faster than the json module,
+and it produces bytes for the response directly); otherwise the standard
+library. Both encode the values our rows and snapshots contain:
+
+    datetime / date / time  -> ISO 8601 string
+    Decimal                 -> float
+    read-only mappings      -> object, tuples/sets -> array
+    records (to_dict())     -> their to_dict() (services.records)
+
+so routes return row dicts as they are instead of converting fields first.
+"""
+import json
+import decimal
+import datetime
+from collections.abc import Mapping
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional; the json module is always available
+    orjson = None
+
+
+def _default(obj):
+    """Types neither encoder handles natively."""
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    to_dict = getattr(obj, "to_dict", None)
+    if to_dict is not None:
+        return to_dict()
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if isinstance(obj, (datetime.date, datetime.time)):
+        return obj.isoformat()
+    if hasattr(obj, "__html__"):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATACLASS
+
+    def dumps_bytes(obj):
+        # Non-string keys (e.g. int ids) become strings, as with json.dumps;
+        # dataclass records go through their to_dict() like with the json module
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+
+    def loads(s):
+        return orjson.loads(s)
+else:
+    def dumps_bytes(obj):
+        return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def loads(s):
+        return json.loads(s)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    ensure_ascii = False
+    sort_keys = False
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            # Callers asking for indent/sort_keys/... get the json module
+            kwargs.setdefault("default", _default)
+            kwargs.setdefault("ensure_ascii", self.ensure_ascii)
+            return json.dumps(obj, **kwargs)
+        return dumps_bytes(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return json.loads(s, **kwargs)
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj) + b"\n", mimetype=self.mimetype)
+
+
+def init_app(app):
+    app.json = FastJSONProvider(app)
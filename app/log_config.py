@@ -0,0 +1,200 @@
+# app/log_config.py
+"""
+Application logging: a queue in front of the real handlers.
+
+Request threads only put records on an in-memory queue (QueueHandler); a
+background QueueListener thread formats them and does the file and console
+I/O, so a slow disk or a blocked stdout pipe never holds up a request.
+
+    LOG_LEVEL            root level (INFO); DEBUG turns on hot-path debug lines
+    LOG_FORMAT           json (one object per line) or text
+    LOG_FILE             log file; empty logs to the console only
+    LOG_MAX_BYTES        rotate the file at this size (10 MB) ...
+    LOG_ROTATE_WHEN      ... or on a schedule instead (midnight, h, d, w0-w6)
+    LOG_BACKUP_COUNT     rotated files kept (5)
+    LOG_QUEUE_SIZE       records buffered before new ones are dropped (10000)
+
+LOG_MAX_BYTES=0 without LOG_ROTATE_WHEN leaves rotation to an external
+logrotate (the file is reopened when it is moved). Use that when several
+gunicorn workers write the same file; the built-in rotation is per process.
+
+Every record carries the request id (tracing.py) and the hospital id of the
+request that logged it. They are taken on the request thread, before the
+record is queued.
+"""
+import os
+import sys
+import queue
+import atexit
+import logging
+import threading
+import traceback
+from datetime import datetime, timezone
+from logging.handlers import (
+    QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler, WatchedFileHandler,
+)
+
+import tenant
+import tracing
+import json_provider
+from config import settings
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"
+
+_queue = queue.Queue(maxsize=max(1, settings.LOG_QUEUE_SIZE))
+_lock = threading.Lock()
+_listener = None
+_listener_pid = None
+_queue_handler = None
+_handlers = []
+_dropped = 0
+
+
+class RequestContextFilter(logging.Filter):
+    """Adds request_id and hospital_id to each record."""
+
+    def filter(self, record):
+        if not hasattr(record, "request_id"):
+            record.request_id = tracing.request_id() or "-"
+        if not hasattr(record, "hospital_id"):
+            record.hospital_id = tenant.get_current_hospital_id()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line.
+
+    A record logged with extra={"fields": {...}} (the tracing request log)
+    has those fields merged in instead of a message.
+    """
+
+    def format(self, record):
+        out = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "pid": record.process,
+            "request_id": getattr(record, "request_id", "-"),
+        }
+        hospital_id = getattr(record, "hospital_id", None)
+        if hospital_id:
+            out["hospital_id"] = hospital_id
+        fields = getattr(record, "fields", None)
+        if isinstance(fields, dict):
+            out.update(fields)
+        else:
+            out["message"] = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            out["exception"] = record.exc_text
+        if record.stack_info:
+            out["stack"] = record.stack_info
+        return json_provider.dumps_bytes(out).decode("utf-8")
+
+
+class _QueueHandler(QueueHandler):
+    """Queues records without blocking; drops them when the queue is full."""
+
+    def prepare(self, record):
+        # Resolve the message and traceback on the calling thread: args may
+        # be mutable objects and exc_info holds live frames.
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = "".join(traceback.format_exception(*record.exc_info)).rstrip()
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        global _dropped
+        if _listener_pid != os.getpid():
+            _start_listener()  # first record after a fork
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _dropped += 1
+
+
+def _formatter():
+    if settings.LOG_FORMAT == "json":
+        return JsonFormatter()
+    return logging.Formatter(TEXT_FORMAT)
+
+
+def _file_handler(path):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    if settings.LOG_ROTATE_WHEN:
+        return TimedRotatingFileHandler(
+            path, when=settings.LOG_ROTATE_WHEN, backupCount=settings.LOG_BACKUP_COUNT, encoding="utf-8",
+        )
+    if settings.LOG_MAX_BYTES > 0:
+        return RotatingFileHandler(
+            path, maxBytes=settings.LOG_MAX_BYTES, backupCount=settings.LOG_BACKUP_COUNT, encoding="utf-8",
+        )
+    return WatchedFileHandler(path, encoding="utf-8")
+
+
+def _start_listener():
+    global _listener, _listener_pid
+    with _lock:
+        if _listener_pid == os.getpid():
+            return
+        _listener = QueueListener(_queue, *_handlers, respect_handler_level=True)
+        _listener_pid = os.getpid()
+        _listener.start()
+
+
+def _reset_after_fork():
+    # The listener thread is not inherited, and it may have held the queue's
+    # lock mid-fork; the child gets a new queue and starts its own listener
+    global _queue, _lock, _listener
+    _queue = queue.Queue(maxsize=max(1, settings.LOG_QUEUE_SIZE))
+    _lock = threading.Lock()
+    _listener = None
+    if _queue_handler is not None:
+        _queue_handler.queue = _queue
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _stop_listener():
+    # Flush what is still queued when the process exits
+    if _listener is not None and _listener_pid == os.getpid():
+        _listener.stop()
+
+
+def configure():
+    """Route the root logger through the queue. Safe to call more than once."""
+    if _handlers:
+        return
+    formatter = _formatter()
+    _handlers.append(logging.StreamHandler(sys.stderr))
+    if settings.LOG_FILE:
+        try:
+            _handlers.append(_file_handler(settings.LOG_FILE))
+        except OSError as e:
+            print(f"[LOGGING] Cannot open {settings.LOG_FILE}, logging to the console only: {e}")
+    for handler in _handlers:
+        handler.setFormatter(formatter)
+
+    global _queue_handler
+    _queue_handler = _QueueHandler(_queue)
+    _queue_handler.addFilter(RequestContextFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):  # e.g. a basicConfig() done by an import
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(getattr(logging, settings.LOG_LEVEL.upper(), logging.INFO))
+
+    _start_listener()
+    atexit.register(_stop_listener)
+
+
+def stats():
+    return {"queued": _queue.qsize(), "dropped": _dropped, "listener_pid": _listener_pid}
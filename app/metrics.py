@@ -0,0 +1,192 @@
+# app/metrics.py
+"""
+Prometheus metrics, served at /metrics.
+
+    http_request_duration_seconds{method,endpoint,status}   request latency
+    db_pool_checkout_seconds                                 wait for a pooled connection
+    db_pool_timeouts_total                                   checkouts that gave up
+    db_pool_checked_out / db_pool_overflow / db_pool_size    pool usage (summed over workers)
+    cache_requests_total{cache,result}                       hits and misses per cache
+    slips_in_progress / slip_render_seconds                  appointment slip PDF rendering
+    upstream_requests_total{upstream,outcome}                Google API calls by outcome
+    upstream_request_seconds{upstream}                       Google API call latency
+    sql_statements_total{fingerprint}                        executions per statement fingerprint
+    sql_statement_seconds_total{fingerprint}                 time per statement fingerprint
+    sql_statements_per_request{endpoint}                     statements run by one request
+    sql_n_plus_one_total{endpoint,fingerprint}               requests repeating a statement (sql_stats.py)
+
+Cache hit ratio is hits / (hits + misses) of cache_requests_total; the
+caches are translation, metadata, knowledge_base, tts and response_body.
+
+Under gunicorn every worker keeps its own values. Set PROMETHEUS_MULTIPROC_DIR
+to an empty directory (gunicorn.conf.py clears it at startup and cleans up
+after dead workers) and /metrics reports the totals across workers, whichever
+worker answers the scrape.
+
+prometheus_client is optional: without it the recording functions below do
+nothing and /metrics answers 501.
+
+Scrapes need "Authorization: Bearer <METRICS_TOKEN>". /metrics is exempt from
+the HTTPS redirect, so outside development it answers 403 until a token is
+set; metrics are still recorded.
+"""
+import os
+import time
+import functools
+
+from flask import Response, request
+
+from config import settings
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+        generate_latest, multiprocess,
+    )
+except ImportError:  # optional; metrics are simply not recorded
+    Counter = None
+
+ENABLED = settings.METRICS_ENABLED and Counter is not None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+if ENABLED:
+    REQUEST_LATENCY = Histogram(
+        "http_request_duration_seconds", "Request latency by route",
+        ["method", "endpoint", "status"], buckets=LATENCY_BUCKETS,
+    )
+    POOL_CHECKOUT = Histogram(
+        "db_pool_checkout_seconds", "Time spent waiting for a database connection from the pool",
+        buckets=POOL_WAIT_BUCKETS,
+    )
+    POOL_TIMEOUTS = Counter("db_pool_timeouts_total", "Pool checkouts that timed out")
+    POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Connections in use", multiprocess_mode="livesum")
+    POOL_OVERFLOW = Gauge("db_pool_overflow", "Connections open beyond pool_size", multiprocess_mode="livesum")
+    POOL_SIZE = Gauge("db_pool_size", "Configured pool_size", multiprocess_mode="livesum")
+    CACHE_REQUESTS = Counter("cache_requests_total", "Cache lookups by cache and result", ["cache", "result"])
+    SLIPS_IN_PROGRESS = Gauge("slips_in_progress", "Slip PDFs being rendered", multiprocess_mode="livesum")
+    SLIP_RENDER = Histogram("slip_render_seconds", "Slip PDF render time", buckets=LATENCY_BUCKETS)
+    UPSTREAM_REQUESTS = Counter(
+        "upstream_requests_total", "External API calls by outcome (success, error, rejected)",
+        ["upstream", "outcome"],
+    )
+    UPSTREAM_LATENCY = Histogram(
+        "upstream_request_seconds", "External API call latency", ["upstream"], buckets=LATENCY_BUCKETS,
+    )
+    SQL_STATEMENTS = Counter("sql_statements_total", "SQL statements executed by fingerprint", ["fingerprint"])
+    SQL_SECONDS = Counter("sql_statement_seconds_total", "SQL execution time by fingerprint", ["fingerprint"])
+    SQL_PER_REQUEST = Histogram(
+        "sql_statements_per_request", "SQL statements executed by one request", ["endpoint"],
+        buckets=QUERY_COUNT_BUCKETS,
+    )
+    SQL_N_PLUS_ONE = Counter(
+        "sql_n_plus_one_total", "Requests that repeated one statement past SQL_N_PLUS_ONE_THRESHOLD",
+        ["endpoint", "fingerprint"],
+    )
+
+
+# --- Recording ---
+def cache_lookup(cache, hit):
+    if ENABLED:
+        CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def upstream_call(upstream, outcome, seconds=None):
+    if ENABLED:
+        UPSTREAM_REQUESTS.labels(upstream, outcome).inc()
+        if seconds is not None:
+            UPSTREAM_LATENCY.labels(upstream).observe(seconds)
+
+
+def pool_checkout(seconds, checked_out, overflow):
+    if ENABLED:
+        POOL_CHECKOUT.observe(seconds)
+        pool_usage(checked_out, overflow)
+
+
+def pool_usage(checked_out, overflow):
+    if ENABLED:
+        POOL_CHECKED_OUT.set(checked_out)
+        POOL_OVERFLOW.set(max(0, overflow))
+
+
+def pool_timeout():
+    if ENABLED:
+        POOL_TIMEOUTS.inc()
+
+
+def pool_created(size):
+    if ENABLED:
+        POOL_SIZE.set(size)
+
+
+def sql_statement(fingerprint, seconds):
+    if ENABLED:
+        SQL_STATEMENTS.labels(fingerprint).inc()
+        SQL_SECONDS.labels(fingerprint).inc(seconds)
+
+
+def sql_request(endpoint, count, repeated):
+    if ENABLED:
+        SQL_PER_REQUEST.labels(endpoint).observe(count)
+        for fingerprint in repeated:
+            SQL_N_PLUS_ONE.labels(endpoint, fingerprint).inc()
+
+
+def slip_render(fn):
+    """Decorator for slip rendering: in-progress gauge and duration."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not ENABLED:
+            return fn(*args, **kwargs)
+        SLIPS_IN_PROGRESS.inc()
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            SLIP_RENDER.observe(time.perf_counter() - start)
+            SLIPS_IN_PROGRESS.dec()
+    return wrapper
+
+
+# --- Requests ---
+def _begin_request():
+    request.environ["metrics.start"] = time.perf_counter()
+
+
+def _observe_request(response):
+    start = request.environ.get("metrics.start")
+    if start is not None:
+        REQUEST_LATENCY.labels(
+            request.method, request.endpoint or "unmatched", str(response.status_code)
+        ).observe(time.perf_counter() - start)
+    return response
+
+
+# --- Exposition ---
+def _registry():
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def respond():
+    """The /metrics response."""
+    if not ENABLED:
+        return Response("metrics disabled or prometheus_client not installed\n", status=501, mimetype="text/plain")
+    if not settings.METRICS_TOKEN:
+        if settings.FLASK_ENV != "development":
+            return Response("set METRICS_TOKEN to serve metrics\n", status=403, mimetype="text/plain")
+    elif request.headers.get("Authorization") != f"Bearer {settings.METRICS_TOKEN}":
+        return Response("unauthorized\n", status=401, mimetype="text/plain")
+    return Response(generate_latest(_registry()), content_type=CONTENT_TYPE_LATEST)
+
+
+def init_app(app):
+    if ENABLED:
+        app.before_request(_begin_request)
+        app.after_request(_observe_request)
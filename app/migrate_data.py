@@ -1,11 +1,7 @@
-import csv
 import json
 from datetime import datetime
 from config_db import SessionLocal, engine, Base
-from models import User, Department, Doctor, Appointment, HospitalInfo
-
-# Create tables (if not already created)
-Base.metadata.create_all(bind=engine)
+from models import HospitalInfo
 
 def load_json(file_path):
     with open(file_path, "r", encoding="utf-8") as f:
@@ -51,81 +47,25 @@ def migrate():
         return
     
     print("🔄 Starting data migration to Supabase PostgreSQL...")
-    session = SessionLocal()
-    try:
-        # --- USERS ---
-        try:
-            users = load_json("app/data/users.json")
-            for u in users:
-                session.merge(User(**u))
-            session.commit()
-            print("Users migrated successfully")
-        except FileNotFoundError:
-            print("Warning: app/data/users.json not found, skipping user migration")
+    # Create tables (if not already created)
+    Base.metadata.create_all(bind=engine)
 
-        # --- DEPARTMENTS ---
+    # Bulk loads (COPY + upsert per chunk) instead of a merge() per row
+    from bulk_import import import_file
+    sources = [
+        ("users", "app/data/users.json"),
+        ("departments", "app/data/departments.json"),
+        ("doctors", "app/data/doctors.json"),
+        ("appointments", "app/data/appointments.csv"),
+    ]
+    for table, path in sources:
         try:
-            depts = load_json("app/data/departments.json")
-            for d in depts:
-                dept_obj = Department(
-                    id=d["id"],
-                    name_en=d["name"].get("en"),
-                    name_hi=d["name"].get("hi"),
-                    name_mr=d["name"].get("mr"),
-                )
-                session.merge(dept_obj)
-            session.commit()
-            print("Departments migrated successfully")
+            import_file(table, path, rejects_path=f"{path}.rejects.csv")
         except FileNotFoundError:
-            print("Warning: app/data/departments.json not found, skipping department migration")
-
-        # --- DOCTORS ---
-        try:
-            doctors = load_json("app/data/doctors.json")
-            for d in doctors:
-                doc_obj = Doctor(
-                    id=d["id"],
-                    department_id=d["department_id"],
-                    name_en=d["name"].get("en"),
-                    name_hi=d["name"].get("hi"),
-                    name_mr=d["name"].get("mr"),
-                    education=d["education"],
-                    experience=d["experience"],
-                    fees=d["fees"],
-                    available_days=d["available_days"],
-                    start_time=d.get("start_time"),
-                    end_time=d.get("end_time"),
-                )
-                session.merge(doc_obj)
-            session.commit()
-            print("Doctors migrated successfully")
-        except FileNotFoundError:
-            print("Warning: app/data/doctors.json not found, skipping doctor migration")
-
-        # --- APPOINTMENTS ---
-        with open("app/data/appointments.csv", newline="", encoding="utf-8") as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                appt_obj = Appointment(
-                    # Do not set id to avoid conflicts with autoincrement
-                    name=row["name"],
-                    phone=row["phone"],
-                    department_id=row["department_id"],
-                    doctor_id=row["doctor_id"],
-                    date=parse_date(row["date"]),
-                    time=row["time"],
-                    status=row["status"].lower(),
-                    created_at=parse_timestamp(row["created_at"]),
-                    updated_at=parse_timestamp(row["updated_at"]),
-                    can_edit=parse_boolean(row["can_edit"]),
-                    is_updated=parse_boolean(row["is_updated"]),
-                    is_new=parse_boolean(row["is_new"]),
-                    viewed_by_admin=parse_boolean(row["viewed_by_admin"]),
-                )
-                session.merge(appt_obj)
-            session.commit()
-            print("Appointments migrated successfully")
+            print(f"Warning: {path} not found, skipping {table} migration")
 
+    session = SessionLocal()
+    try:
         # --- HOSPITAL INFO ---
         try:
             hosp = load_json("app/data/hospital_info.json")["hospital"]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, Text, Numeric, ARRAY, TIMESTAMP, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, Text, Numeric, ARRAY, TIMESTAMP, ForeignKey, Index
 from config_db import Base
 
 class User(Base):
@@ -13,16 +13,32 @@ class User(Base):
     staff = Column(Text)
     working_hours = Column(Text)
 
+# Tables holding per-hospital rows carry a hospital_id column; their composite
+# indexes lead on it so tenant-scoped queries never scan other hospitals' rows.
+#
+# Department and doctor ids are primary keys on their own, so an id is unique
+# across all hospitals, not per hospital (doctors and appointments reference
+# departments.id / doctors.id directly). Code that creates them checks the id
+# against every hospital (tenant.id_in_use); bulk_import rejects rows whose
+# id another hospital already owns.
 class Department(Base):
     __tablename__ = "departments"
+    __table_args__ = (
+        Index("ix_departments_hospital_id", "hospital_id", "id"),
+    )
     id = Column(String, primary_key=True)
+    hospital_id = Column(String)
     name_en = Column(String)
     name_hi = Column(String)
     name_mr = Column(String)
 
 class Doctor(Base):
     __tablename__ = "doctors"
+    __table_args__ = (
+        Index("ix_doctors_hospital_department", "hospital_id", "department_id"),
+    )
     id = Column(String, primary_key=True)
+    hospital_id = Column(String)
     department_id = Column(String, ForeignKey("departments.id"))
     name_en = Column(String)
     name_hi = Column(String)
@@ -37,7 +53,13 @@ class Doctor(Base):
 
 class Appointment(Base):
     __tablename__ = "appointments"
+    __table_args__ = (
+        Index("ix_appointments_hospital_phone", "hospital_id", "phone"),
+        Index("ix_appointments_hospital_doctor_date", "hospital_id", "doctor_id", "date"),
+        Index("ix_appointments_hospital_status", "hospital_id", "status"),
+    )
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    hospital_id = Column(String)
     name = Column(String)
     phone = Column(String)
     department_id = Column(String, ForeignKey("departments.id"))
@@ -58,6 +80,7 @@ class Appointment(Base):
 class HospitalInfo(Base):
     __tablename__ = "hospital_info"
     id = Column(Integer, primary_key=True, autoincrement=True)
+    hospital_id = Column(String, index=True)
     name_en = Column(String)
     name_hi = Column(String)
     name_mr = Column(String)
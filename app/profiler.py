@@ -0,0 +1,414 @@
+# app/profiler.py
+"""
+In-process sampling profiler and slow-request capture.
+
+A background thread per worker process reads every thread's stack with
+sys._current_frames() at PROFILER_INTERVAL_MS and counts them as folded
+stacks ("file:function;file:function ..." + count), the input format of
+flamegraph.pl, inferno and speedscope. Nothing is imported or started while
+both features below are off.
+
+Profiling (PROFILER_ENABLED): an admin starts a profile for N seconds from
+/admin/profiler/start. The request is written to PROFILER_DIR/control.json;
+every worker polls that file once a second, so all gunicorn workers profile
+the same window, not just the one that served the admin request. Each
+worker writes PROFILER_DIR/<profile id>/<pid>.folded when the window ends
+or the profile is stopped; the admin pages merge them into one flame graph
+(flamegraph_svg()).
+
+Slow requests (SLOW_REQUEST_MS > 0): the stacks of threads serving requests
+are sampled while they run. A request that takes longer than the threshold
+gets a JSON capture in PROFILER_DIR/slow/ with its folded stacks and the SQL
+statements tracing recorded for it; only the newest SLOW_REQUEST_KEEP files
+are kept.
+
+Stacks are per OS thread: with the sync worker each request has its own.
+Under the gevent worker all requests share one thread and the sampler only
+runs when the hub gets control, so profile a sync worker for CPU problems.
+"""
+import os
+import sys
+import json
+import time
+import html
+import zlib
+import threading
+from collections import Counter
+
+from flask import g, request
+
+import tracing
+from config import settings, BASE_DIR
+
+PROFILER_DIR = settings.PROFILER_DIR or (BASE_DIR / "data" / "profiles")
+CONTROL_FILE = os.path.join(PROFILER_DIR, "control.json")
+SLOW_DIR = os.path.join(PROFILER_DIR, "slow")
+
+_lock = threading.Lock()
+_control_lock = threading.Lock()  # _profile and its counts
+_wake = threading.Event()
+_thread = None
+_thread_pid = None
+_labels = {}  # code object -> "file:function"
+
+_profile = None      # the whole-process profile being taken, if any
+_control_sig = None  # (mtime_ns, size) of the control file last read
+_requests = {}       # thread id -> _RequestSamples of requests in flight
+
+
+# --- Stacks ---
+def _label(code):
+    label = _labels.get(code)
+    if label is None:
+        path = code.co_filename
+        try:
+            short = os.path.relpath(path, BASE_DIR)
+            if short.startswith(".."):
+                short = "/".join(path.replace("\\", "/").split("/")[-2:])
+        except ValueError:
+            short = os.path.basename(path)
+        label = _labels[code] = f"{short}:{code.co_name}"
+    return label
+
+
+def folded(frame):
+    """One stack as root;...;leaf."""
+    parts = []
+    while frame is not None and len(parts) < settings.PROFILER_MAX_DEPTH:
+        parts.append(_label(frame.f_code))
+        frame = frame.f_back
+    parts.reverse()
+    return ";".join(parts)
+
+
+def folded_text(counts):
+    return "".join(f"{stack} {n}\n" for stack, n in counts.most_common())
+
+
+def parse_folded(text, counts=None):
+    counts = Counter() if counts is None else counts
+    for line in text.splitlines():
+        stack, _, n = line.rpartition(" ")
+        if stack and n.isdigit():
+            counts[stack] += int(n)
+    return counts
+
+
+class _Profile:
+    def __init__(self, profile_id, until, interval_ms):
+        self.id = profile_id
+        self.until = until
+        self.interval = interval_ms / 1000
+        self.counts = Counter()
+        self.samples = 0
+
+
+class _RequestSamples:
+    __slots__ = ("started", "counts")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.counts = Counter()
+
+
+# --- Sampler thread ---
+def _ensure_thread():
+    global _thread, _thread_pid
+    if _thread_pid == os.getpid():
+        return
+    with _lock:
+        if _thread_pid == os.getpid():
+            return
+        # First use in this process (gunicorn forks workers after import)
+        _thread = threading.Thread(target=_run, name="profiler", daemon=True)
+        _thread_pid = os.getpid()
+        _thread.start()
+
+
+def _run():
+    own = threading.get_ident()
+    next_poll = 0.0
+    while True:
+        now = time.time()
+        if settings.PROFILER_ENABLED and now >= next_poll:
+            try:
+                _poll_control(now)
+            except Exception as e:
+                print(f"[PROFILER] Reading {CONTROL_FILE} failed: {e}")
+            next_poll = now + 1.0
+
+        profile = _profile
+        if profile is None and not _requests:
+            _wake.wait(1.0)
+            _wake.clear()
+            continue
+
+        frames = sys._current_frames()
+        if profile is not None:
+            with _control_lock:
+                for tid, frame in frames.items():
+                    if tid != own:
+                        profile.counts[folded(frame)] += 1
+                profile.samples += 1
+                if now >= profile.until and profile is _profile:
+                    _finish_profile()
+        for tid, samples in list(_requests.items()):
+            frame = frames.get(tid)
+            if frame is not None:
+                samples.counts[folded(frame)] += 1
+        del frames
+
+        interval = profile.interval if profile is not None else settings.PROFILER_INTERVAL_MS / 1000
+        time.sleep(interval)
+
+
+# --- Profiles (all workers) ---
+def _read_control():
+    with open(CONTROL_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_control(control):
+    os.makedirs(PROFILER_DIR, exist_ok=True)
+    tmp = f"{CONTROL_FILE}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(control, f)
+    os.replace(tmp, CONTROL_FILE)
+
+
+def _poll_control(now):
+    with _control_lock:
+        _apply_control(now)
+
+
+def _apply_control(now):
+    global _profile, _control_sig
+    try:
+        st = os.stat(CONTROL_FILE)
+    except FileNotFoundError:
+        return
+    sig = (st.st_mtime_ns, st.st_size)
+    if sig == _control_sig:
+        return
+    _control_sig = sig
+    control = _read_control()
+    if _profile is not None and _profile.id == control["id"]:
+        _profile.until = min(_profile.until, control["until"])  # stopped early
+    elif control["until"] > now and not os.path.exists(_profile_file(control["id"])):
+        if _profile is not None:
+            _finish_profile()
+        _profile = _Profile(control["id"], control["until"], control.get("interval_ms", settings.PROFILER_INTERVAL_MS))
+
+
+def _profile_file(profile_id, pid=None):
+    return os.path.join(PROFILER_DIR, profile_id, f"{pid or os.getpid()}.folded")
+
+
+def _finish_profile():
+    global _profile
+    profile, _profile = _profile, None
+    if profile is None:
+        return
+    path = _profile_file(profile.id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(folded_text(profile.counts))
+
+
+def start_profile(seconds, interval_ms=None):
+    """Have every worker profile for `seconds`; returns the control record."""
+    seconds = max(1, min(int(seconds), settings.PROFILER_MAX_SECONDS))
+    interval_ms = max(1, int(interval_ms or settings.PROFILER_INTERVAL_MS))
+    control = {
+        "id": time.strftime("%Y%m%d-%H%M%S"),
+        "until": time.time() + seconds,
+        "interval_ms": interval_ms,
+    }
+    _write_control(control)
+    _ensure_thread()
+    _poll_control(time.time())
+    _wake.set()
+    return control
+
+
+def stop_profile():
+    """End the running profile early in every worker."""
+    try:
+        control = _read_control()
+    except FileNotFoundError:
+        return None
+    control["until"] = min(control["until"], time.time())
+    _write_control(control)
+    _poll_control(time.time() - 1)
+    return control
+
+
+def status():
+    try:
+        control = _read_control()
+    except FileNotFoundError:
+        control = None
+    profiles = []
+    if os.path.isdir(PROFILER_DIR):
+        for name in sorted(os.listdir(PROFILER_DIR), reverse=True):
+            path = os.path.join(PROFILER_DIR, name)
+            if os.path.isdir(path) and name != "slow":
+                profiles.append({"id": name, "workers": len(os.listdir(path))})
+    slow = sorted(os.listdir(SLOW_DIR), reverse=True) if os.path.isdir(SLOW_DIR) else []
+    return {
+        "enabled": settings.PROFILER_ENABLED,
+        "slow_request_ms": settings.SLOW_REQUEST_MS,
+        "running": bool(control and control["until"] > time.time()),
+        "control": control,
+        "profiles": profiles,
+        "slow_requests": slow,
+    }
+
+
+def merged_profile(profile_id):
+    """Folded stacks of every worker for a profile id, summed; None if unknown."""
+    directory = os.path.join(PROFILER_DIR, profile_id)
+    if os.path.dirname(os.path.normpath(directory)) != os.path.normpath(str(PROFILER_DIR)) or not os.path.isdir(directory):
+        return None
+    counts = Counter()
+    for name in os.listdir(directory):
+        if name.endswith(".folded"):
+            with open(os.path.join(directory, name), encoding="utf-8") as f:
+                parse_folded(f.read(), counts)
+    return counts
+
+
+def slow_capture_path(name):
+    """Path of a slow-request capture by file name, or None."""
+    path = os.path.join(SLOW_DIR, os.path.basename(name))
+    return path if os.path.isfile(path) else None
+
+
+# --- Flame graph ---
+FRAME_HEIGHT = 16
+SVG_WIDTH = 1200
+
+
+def flamegraph_svg(counts, title="Flame graph"):
+    """Self-contained SVG flame graph of folded stack counts (hover for details)."""
+    root = {"children": {}, "value": 0}
+    for stack, n in counts.items():
+        node = root
+        node["value"] += n
+        for name in stack.split(";"):
+            node = node["children"].setdefault(name, {"children": {}, "value": 0})
+            node["value"] += n
+
+    total = root["value"] or 1
+    rects = []
+    depth_max = 0
+
+    def layout(node, x, depth):
+        nonlocal depth_max
+        for name, child in sorted(node["children"].items()):
+            width = child["value"] / total * SVG_WIDTH
+            if width >= 0.5:
+                depth_max = max(depth_max, depth)
+                rects.append((name, child["value"], x, depth, width))
+                layout(child, x, depth + 1)
+            x += width
+
+    layout(root, 0.0, 0)
+    height = (depth_max + 3) * FRAME_HEIGHT
+    out = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{SVG_WIDTH}" height="{height}" '
+        f'font-family="monospace" font-size="11">',
+        f'<text x="4" y="12">{html.escape(title)} ({root["value"]} samples)</text>',
+    ]
+    for name, value, x, depth, width in rects:
+        y = height - (depth + 1) * FRAME_HEIGHT
+        hue = zlib.crc32(name.encode("utf-8")) % 60
+        label = html.escape(name)
+        out.append(
+            f'<g><title>{label} ({value} samples, {100 * value / total:.1f}%)</title>'
+            f'<rect x="{x:.1f}" y="{y}" width="{width:.1f}" height="{FRAME_HEIGHT - 1}" '
+            f'fill="hsl({hue},90%,60%)"/>'
+        )
+        chars = int(width / 7)
+        if chars >= 3:
+            text = name if len(name) <= chars else name[:chars - 2] + ".."
+            out.append(f'<text x="{x + 2:.1f}" y="{y + FRAME_HEIGHT - 4}">{html.escape(text)}</text>')
+        out.append("</g>")
+    out.append("</svg>")
+    return "\n".join(out)
+
+
+# --- Slow requests ---
+def _begin_request():
+    _ensure_thread()
+    if settings.SLOW_REQUEST_MS > 0:
+        tid = threading.get_ident()
+        was_idle = not _requests
+        _requests[tid] = g._profile_samples = _RequestSamples()
+        if was_idle:
+            _wake.set()
+
+
+def _end_request(exc=None):
+    samples = g.pop("_profile_samples", None)
+    if samples is None:
+        return
+    _requests.pop(threading.get_ident(), None)
+    duration = (time.perf_counter() - samples.started) * 1000
+    if duration >= settings.SLOW_REQUEST_MS:
+        try:
+            _write_slow_capture(samples, duration, exc)
+        except Exception as e:
+            print(f"[PROFILER] Slow request capture failed: {e}")
+
+
+def _write_slow_capture(samples, duration, exc):
+    trace = tracing.current()
+    sql = []
+    if trace is not None:
+        sql = [
+            {
+                "statement": s.attrs.get("statement"),
+                "start_ms": round((s.start - trace.started) * 1000, 2),
+                "duration_ms": round(s.duration_ms, 2),
+            }
+            for s in list(trace.spans) if s.name == "db"
+        ]
+    request_id = tracing.request_id() or "-"
+    capture = {
+        "request_id": request_id,
+        "method": request.method,
+        "path": request.path,
+        "endpoint": request.endpoint,
+        "hospital_id": g.get("hospital_id"),
+        "pid": os.getpid(),
+        "duration_ms": round(duration, 2),
+        "threshold_ms": settings.SLOW_REQUEST_MS,
+        "error": repr(exc) if exc is not None else None,
+        "stages": {k: round(v, 2) for k, v in trace.stage_totals().items()} if trace else {},
+        "interval_ms": settings.PROFILER_INTERVAL_MS,
+        "samples": sum(samples.counts.values()),
+        "folded": folded_text(samples.counts),
+        "sql": sql,
+    }
+    os.makedirs(SLOW_DIR, exist_ok=True)
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{request_id[:32]}.json"
+    with open(os.path.join(SLOW_DIR, name), "w", encoding="utf-8") as f:
+        json.dump(capture, f, ensure_ascii=False, indent=1)
+    _rotate()
+
+
+def _rotate():
+    names = sorted(n for n in os.listdir(SLOW_DIR) if n.endswith(".json"))
+    for name in names[:-settings.SLOW_REQUEST_KEEP or None]:
+        try:
+            os.remove(os.path.join(SLOW_DIR, name))
+        except FileNotFoundError:
+            pass  # another worker rotated it first
+
+
+def init_app(app):
+    # Off by default: no hooks, no thread
+    if settings.PROFILER_ENABLED or settings.SLOW_REQUEST_MS > 0:
+        app.before_request(_begin_request)
+        app.teardown_request(_end_request)
@@ -1,16 +1,24 @@
 import json
+import sys
+import threading
+from collections import OrderedDict
 from pathlib import Path
 import re
 import difflib
-from deep_translator import GoogleTranslator
+from services.google_translate import translate_text
 from datetime import datetime
+from config import settings
+from tenant import canonical_hospital_id, get_current_hospital_id
+from services import records
+import tracing
+import metrics
 
 # --- Paths ---
 BASE_DIR = Path(__file__).resolve().parent.parent
 HOSP_FILE = BASE_DIR / "data" / "hospital_info.json"
-
-with HOSP_FILE.open(encoding="utf-8") as f:
-    HOSP_DATA = json.load(f)
+# Per-hospital data lives in data/hospitals/<hospital_id>/hospital_info.json
+HOSPITALS_DIR = BASE_DIR / "data" / "hospitals"
+_SAFE_ID = re.compile(r"^[A-Za-z0-9_\-]+$")
 
 # Map friendly language names to ISO codes
 LANG_CODE_MAP = {
@@ -28,13 +36,15 @@ def _fast_translate(text: str, source: str, target: str) -> str:
         return text
     cache_key = (text, source, target)
     if cache_key in _translation_cache:
+        metrics.cache_lookup("translation", True)
         return _translation_cache[cache_key]
+    metrics.cache_lookup("translation", False)
     try:
-        translated = GoogleTranslator(source=source, target=target).translate(text)
+        translated = translate_text(text, source=source, target=target)
         _translation_cache[cache_key] = translated
         return translated
     except Exception:
-        return text  # fallback
+        return text  # fallback (also taken straight away while the circuit is open)
 
 # --- Pick correct language field ---
 def pick_lang(val, user_lang="english"):
@@ -141,6 +151,42 @@ INTENT_KEYWORDS = {
     },
 }
 
+# --- Canned answers (a hospital's "canned_answers" in its JSON overrides these) ---
+DEFAULT_CANNED_ANSWERS = {
+    "documents": {
+        "english": "Please bring your ID proof, insurance card (if applicable), previous medical reports, and any current medications you are taking.",
+        "hindi": "कृपया अपना पहचान पत्र, बीमा कार्ड (यदि लागू हो), पिछली चिकित्सा रिपोर्ट, और आपके द्वारा ली जा रही कोई भी वर्तमान दवाएं लाएं।",
+        "marathi": "कृपया आपले ओळखपत्र, विमा कार्ड (लागू असल्यास), मागील वैद्यकीय अहवाल आणि आपण घेत असलेली कोणतीही सध्याची औषधे आणा."
+    },
+    "parking": {
+        "english": "Please contact the hospital reception for parking information.",
+        "hindi": "पार्किंग की जानकारी के लिए कृपया अस्पताल के रिसेप्शन से संपर्क करें।",
+        "marathi": "पार्किंगच्या माहितीसाठी कृपया रुग्णालयाच्या रिसेप्शनशी संपर्क साधा."
+    },
+    "tips_note": {
+        "english": "Bring previous reports and arrive 10 minutes early.",
+        "hindi": "पिछली रिपोर्ट साथ लाएँ और 10 मिनट पहले पहुँचे।",
+        "marathi": "मागील अहवाल सोबत आणा आणि 10 मिनिटे लवकर या."
+    },
+    "fallback": {
+        "english": "Sorry, I couldn't understand that. Please try rephrasing or ask about departments, doctors, timings, or booking.",
+        "hindi": "क्षमा करें, मैं समझ नहीं पाया। कृपया दोबारा पूछें या विभाग, डॉक्टर, समय या बुकिंग के बारे में पूछें।",
+        "marathi": "माफ करा, मला समजले नाही. कृपया पुन्हा विचारा किंवा विभाग, डॉक्टर, वेळा किंवा बुकिंगबद्दल विचारा."
+    },
+}
+
+# Templates for answers built from the hospital's own data when it has no override
+FEES_TEMPLATE = {
+    "english": "Consultation fees vary by department: {fees}.",
+    "hindi": "परामर्श शुल्क विभाग के अनुसार भिन्न होता है: {fees}।",
+    "marathi": "सल्लागार शुल्क विभागानुसार बदलते: {fees}.",
+}
+EMERGENCY_TEMPLATE = {
+    "english": "For emergencies, call {phone} immediately.",
+    "hindi": "आपातकाल के लिए, तुरंत {phone} पर कॉल करें।",
+    "marathi": "आपत्कालीन परिस्थितीसाठी, ताबडतोब {phone} वर कॉल करा.",
+}
+
 # --- Normalization helpers ---
 def _norm(s: str) -> str:
     s = s.lower().strip()
@@ -163,162 +209,205 @@ def _has_intent(q_en: str, intent: str, threshold: float=0.85) -> bool:
                 return True
     return False
 
-def _best_department_match(q_en: str, threshold: float=0.65) -> str|None:
-    qn = _norm(q_en)
-    best, score = None, 0
-    for dept in HOSP_DATA["departments"]:
-        dept_name_en = pick_lang(dept["name"], "english")
-        cand_set = {dept_name_en.lower()} | DEPT_SYNONYMS.get(dept_name_en, set())
-        for cand in cand_set:
-            for w in qn.split():
-                sc = difflib.SequenceMatcher(None, cand, w).ratio()
-                if sc > score:
-                    best, score = dept_name_en, sc
-    return best if score >= threshold else None
-
-# ---------- Doctor index & matching ----------
 def _clean_doctor_name(s: str) -> str:
     s = _norm(s)
     s = s.replace("dr.", " ").replace("dr ", " ")
     s = re.sub(r"\s+", " ", s).strip()
     return s
 
-# Build an index of doctor names (across languages) → (dept, doc)
-DOCTOR_INDEX = []
-for dept in HOSP_DATA["departments"]:
-    dept_key = pick_lang(dept["name"], "english")
-    for doc in dept.get("doctors", []):
-        # name can be dict or string
-        names = []
-        if isinstance(doc.get("name"), dict):
-            names.extend(doc["name"].values())
-        else:
-            names.append(str(doc.get("name", "")))
-        # also add without "Dr"
-        cleaned = [_clean_doctor_name(n) for n in names]
-        for n in set(names + cleaned):
-            if n:
-                DOCTOR_INDEX.append({
-                    "match_key": _clean_doctor_name(n),
-                    "dept_key": dept_key,
-                    "dept": dept,
-                    "doc": doc
-                })
-
-# plus a quick map to search by strong fuzzy match
-def _match_doctor(q_text: str, threshold: float = 0.82):
-    qn = _clean_doctor_name(q_text)
-    best = None
-    best_score = 0.0
-    for entry in DOCTOR_INDEX:
-        mk = entry["match_key"]
-        # direct containment helps "meet dr khan"
-        if mk and (mk in qn or qn in mk):
-            return entry
-        sc = difflib.SequenceMatcher(None, mk, qn).ratio()
-        if sc > best_score:
-            best_score = sc
-            best = entry
-    if best and best_score >= threshold:
-        return best
-    # token-wise fallback: try each token window
-    for tok in qn.split():
-        if not tok or len(tok) < 3:
-            continue
-        for entry in DOCTOR_INDEX:
-            sc = difflib.SequenceMatcher(None, entry["match_key"], tok).ratio()
-            if sc > 0.92:
-                return entry
-    return None
-
-def _extract_named_doctor(q_text: str):
-    """
-    Try to extract something like 'dr khan' / 'डॉ खान' / 'doctor priya' etc.
-    Returns best matched doctor entry or None.
-    """
-    qt = _norm(q_text)
-    # common markers preceding names
-    patterns = [
-        r"(dr\.?\s+[a-z\u0900-\u097F\-]+(?:\s+[a-z\u0900-\u097F\-]+)?)",
-        r"(doctor\s+[a-z\u0900-\u097F\-]+)",
-        r"(डॉ\.?\s*[a-z\u0900-\u097F\-]+)",
-    ]
-    candidates = []
-    for p in patterns:
-        for m in re.finditer(p, qt, flags=re.IGNORECASE):
-            candidates.append(m.group(1))
-    # also try last two words (e.g., "meet khan", "मिलना खान")
-    words = qt.split()
-    if len(words) >= 2:
-        candidates.append(" ".join(words[-2:]))
-
-    # direct match over candidates
-    for c in candidates:
-        m = _match_doctor(c)
-        if m:
-            return m
-    # as a final attempt, try full text
-    return _match_doctor(qt)
-
 # Format doctor payload
 def _doctor_payload(doc, dept, user_lang="english"):
     return {
-        "name": pick_lang(doc.get("name"), user_lang),
-        "qualification": pick_lang(doc.get("qualification"), user_lang),
-        "experience": doc.get("experience", ""),
-        "fees": doc.get("fees", dept.get("fees")),
-        "timings": pick_lang(doc.get("timings"), user_lang)
+        "name": doc.name.pick(user_lang),
+        "qualification": records.pick(doc.education, user_lang),
+        "experience": doc.experience or "",
+        "fees": doc.fees if doc.fees is not None else dept.fees,
+        "timings": records.pick(doc.timings, user_lang)
     }
 
-# ---------- Main function ----------
-def get_general_query_answer(question: str, user_lang="english") -> dict:
-    user_lang_code = LANG_CODE_MAP.get(user_lang.lower(), "en")
-
-    # Step 1: translate to English for logic
-    q_en = _fast_translate(question, user_lang_code, "en").strip()
-    q_norm = _norm(q_en)
-    result = None
-
-    # 0) Try strong doctor-name intent: "I want to meet Dr Khan" / "डॉ खान से मिलना है" / "डॉ खान कसे भेटायचे"
-    direct_doc_hit = _extract_named_doctor(q_en)
-    if direct_doc_hit:
-        dept = direct_doc_hit["dept"]
-        doc = direct_doc_hit["doc"]
-        dept_key = pick_lang(dept["name"], "english")
-
-        steps_dict = HOSP_DATA.get("appointment_process", {}).get("booking", {})
-        if isinstance(steps_dict, dict):
-            steps = steps_dict.get(user_lang.lower(), steps_dict.get("english", []))
-        else:
-            steps = steps_dict or []
-
-        result = {
-            "type": "doctors",  # keep existing frontend renderer
-            "department": pick_lang(dept["name"], user_lang),
-            "department_key": dept_key,
-            "fees": dept.get("fees"),
-            "doctors": [
-                _doctor_payload(doc, dept, user_lang=user_lang)
-            ],
-            # extra helpful fields (frontend may ignore safely)
-            "process": {
-                "action": "booking",
-                "steps": steps
-            },
-            "tips": {
-                "note": {
-                    "english": "Bring previous reports and arrive 10 minutes early.",
-                    "hindi": "पिछली रिपोर्ट साथ लाएँ और 10 मिनट पहले पहुँचे।",
-                    "marathi": "मागील अहवाल सोबत आणा आणि 10 मिनिटे लवकर या."
-                }.get(user_lang.lower(), "Bring previous reports and arrive 10 minutes early.")
-            }
-        }
-        return result
+def _steps_for(steps_dict, user_lang):
+    if isinstance(steps_dict, dict):
+        return steps_dict.get(user_lang.lower(), steps_dict.get("english", []))
+    return steps_dict or []
+
+
+# ---------- Per-hospital knowledge base ----------
+class HospitalKnowledgeBase:
+    """Query engine for one hospital.
+
+    Everything derived from the hospital's data (doctor name index, department
+    synonyms, symptom map, pre-normalized FAQs, canned answers) is built once
+    here, so answering a question only reads from this object. Departments and
+    doctors are kept as services.records instances rather than the parsed JSON.
+    """
+
+    def __init__(self, hospital_id, data, source=None):
+        self.hospital_id = hospital_id
+        self.source = source
+        self.hospital = data.get("hospital", {})
+        self.departments = tuple(records.Department.from_dict(d) for d in data.get("departments", []))
+        self.services = data.get("services", {})
+        self.appointment_process = data.get("appointment_process", {})
+        self.faq_list = data.get("faqs", [])
+        self.dept_by_key = {d.key: d for d in self.departments}
+
+        # Shared synonyms/symptoms plus whatever the hospital adds
+        self.dept_synonyms = {k: set(v) for k, v in DEPT_SYNONYMS.items()}
+        for dept_key, words in data.get("synonyms", {}).items():
+            self.dept_synonyms.setdefault(dept_key, set()).update(w.lower() for w in words)
+        self.symptom_map = dict(SYMPTOM_MAP)
+        self.symptom_map.update(data.get("symptoms", {}))
+
+        self.doctor_index = self._build_doctor_index()
+        self.faqs = self._build_faq_index()
+        self.canned = self._build_canned_answers(data.get("canned_answers", {}))
+
+    def _build_doctor_index(self):
+        # Index of doctor names (across languages) → (dept, doc)
+        index = []
+        for dept in self.departments:
+            dept_key = dept.key
+            for doc in dept.doctors:
+                names = [n for n in (doc.name.en, doc.name.hi, doc.name.mr) if n is not None]
+                # also add without "Dr"
+                cleaned = [_clean_doctor_name(n) for n in names]
+                for n in set(names + cleaned):
+                    if n:
+                        index.append(records.IndexEntry(_clean_doctor_name(n), dept_key, dept, doc))
+        return tuple(index)
+
+    def _build_faq_index(self):
+        # (normalized question, its word set, faq) for every language version
+        index = []
+        for f in self.faq_list:
+            for qtext in f.get("question", {}).values():
+                qtext_norm = _norm(qtext)
+                index.append((qtext_norm, set(qtext_norm.split()), f))
+        return index
+
+    def _build_canned_answers(self, overrides):
+        canned = {k: dict(v) for k, v in DEFAULT_CANNED_ANSWERS.items()}
 
-    # 1) Contact
-    if _has_intent(q_norm, "contact"):
-        h = HOSP_DATA["hospital"]
-        result = {
+        fees = [(d.name, d.fees) for d in self.departments if d.fees is not None]
+        if fees:
+            canned["fees"] = {
+                lang: tpl.format(fees=", ".join(f"{name.pick(lang)} - ₹{fee}" for name, fee in fees))
+                for lang, tpl in FEES_TEMPLATE.items()
+            }
+        phone = self.hospital.get("emergency_phone") or self.hospital.get("phone")
+        if phone:
+            canned["emergency"] = {lang: tpl.format(phone=phone) for lang, tpl in EMERGENCY_TEMPLATE.items()}
+
+        for key, answer in overrides.items():
+            canned[key] = answer
+        return canned
+
+    def canned_answer(self, key, user_lang="english"):
+        return pick_lang(self.canned.get(key, DEFAULT_CANNED_ANSWERS["fallback"]), user_lang)
+
+    # --- Matching ---
+    def best_department_match(self, q_en: str, threshold: float=0.65) -> str|None:
+        qn = _norm(q_en)
+        best, score = None, 0
+        for dept_name_en in self.dept_by_key:
+            cand_set = {dept_name_en.lower()} | self.dept_synonyms.get(dept_name_en, set())
+            for cand in cand_set:
+                for w in qn.split():
+                    sc = difflib.SequenceMatcher(None, cand, w).ratio()
+                    if sc > score:
+                        best, score = dept_name_en, sc
+        return best if score >= threshold else None
+
+    def match_doctor(self, q_text: str, threshold: float = 0.82):
+        qn = _clean_doctor_name(q_text)
+        best = None
+        best_score = 0.0
+        for entry in self.doctor_index:
+            mk = entry.match_key
+            # direct containment helps "meet dr khan"
+            if mk and (mk in qn or qn in mk):
+                return entry
+            sc = difflib.SequenceMatcher(None, mk, qn).ratio()
+            if sc > best_score:
+                best_score = sc
+                best = entry
+        if best and best_score >= threshold:
+            return best
+        # token-wise fallback: try each token window
+        for tok in qn.split():
+            if not tok or len(tok) < 3:
+                continue
+            for entry in self.doctor_index:
+                sc = difflib.SequenceMatcher(None, entry.match_key, tok).ratio()
+                if sc > 0.92:
+                    return entry
+        return None
+
+    def extract_named_doctor(self, q_text: str):
+        """
+        Try to extract something like 'dr khan' / 'डॉ खान' / 'doctor priya' etc.
+        Returns best matched doctor entry or None.
+        """
+        qt = _norm(q_text)
+        # common markers preceding names
+        patterns = [
+            r"(dr\.?\s+[a-z\u0900-\u097F\-]+(?:\s+[a-z\u0900-\u097F\-]+)?)",
+            r"(doctor\s+[a-z\u0900-\u097F\-]+)",
+            r"(डॉ\.?\s*[a-z\u0900-\u097F\-]+)",
+        ]
+        candidates = []
+        for p in patterns:
+            for m in re.finditer(p, qt, flags=re.IGNORECASE):
+                candidates.append(m.group(1))
+        # also try last two words (e.g., "meet khan", "मिलना खान")
+        words = qt.split()
+        if len(words) >= 2:
+            candidates.append(" ".join(words[-2:]))
+
+        # direct match over candidates
+        for c in candidates:
+            m = self.match_doctor(c)
+            if m:
+                return m
+        # as a final attempt, try full text
+        return self.match_doctor(qt)
+
+    def match_faq(self, q_en: str):
+        best_match_score = 0
+        best_faq = None
+        user_q_norm = _norm(q_en)
+        user_words = set(user_q_norm.split())
+
+        for qtext_norm, q_words, f in self.faqs:
+            # Calculate similarity score
+            similarity = difflib.SequenceMatcher(None, qtext_norm, user_q_norm).ratio()
+
+            # Also check for keyword overlap
+            keyword_overlap = len(q_words.intersection(user_words)) / max(len(q_words), 1)
+
+            # Combined score (weighted)
+            combined_score = (similarity * 0.7) + (keyword_overlap * 0.3)
+
+            # Check for exact substring match (higher priority)
+            if qtext_norm in user_q_norm or user_q_norm in qtext_norm:
+                combined_score = max(combined_score, 0.8)
+
+            # Update best match if this is better
+            if combined_score > best_match_score and combined_score >= 0.6:
+                best_match_score = combined_score
+                best_faq = f
+        return best_faq
+
+    def _service_matching(self, word, user_lang):
+        for key in self.services.keys():
+            if word in key.lower():
+                return {key: pick_lang(self.services[key], user_lang)}
+        return None
+
+    # --- Answers that only depend on the hospital's data ---
+    def contact_answer(self, user_lang="english"):
+        h = self.hospital
+        return {
             "type":"contact",
             "name": pick_lang(h["name"], user_lang),
             "address": pick_lang(h["address"], user_lang),
@@ -327,187 +416,398 @@ def get_general_query_answer(question: str, user_lang="english") -> dict:
             "website": h["website"]
         }
 
-    # 2) Timings
-    elif _has_intent(q_norm, "timings"):
-        t = HOSP_DATA["hospital"]["timings"]
-        result = {
+    def timings_answer(self, user_lang="english"):
+        t = self.hospital["timings"]
+        return {
             "type":"timings",
             "opd": pick_lang(t["general_opd"], user_lang),
             "emergency": pick_lang(t["emergency"], user_lang),
             "visiting": pick_lang(t["visiting_hours"], user_lang)
         }
 
-    # 3) Departments
-    elif _has_intent(q_norm, "departments"):
-        result = {
+    def departments_answer(self, user_lang="english"):
+        return {
             "type":"departments",
-            "departments":[pick_lang(d["name"], user_lang) for d in HOSP_DATA["departments"]],
-            "departments_key":[pick_lang(d["name"], "english") for d in HOSP_DATA["departments"]]
+            "departments":[d.name.pick(user_lang) for d in self.departments],
+            "departments_key":list(self.dept_by_key)
         }
 
-    # 4) Doctors (generic or dept-specific)
-    elif _has_intent(q_norm, "doctors"):
-        dept_name = _best_department_match(q_norm)
-        if dept_name:
-            dept = next(d for d in HOSP_DATA["departments"] if pick_lang(d["name"], "english") == dept_name)
-            result = {
-                "type":"doctors",
-                "department": pick_lang(dept["name"], user_lang),
-                "department_key": dept_name,
-                "fees": dept.get("fees"),
-                "doctors":[_doctor_payload(doc, dept, user_lang) for doc in dept.get("doctors", [])]
+    def services_answer(self, user_lang="english"):
+        return {"type": "services",
+                "services": {k: pick_lang(v, user_lang) for k,v in self.services.items()},
+                "services_key": list(self.services.keys())}
+
+    def process_answer(self, action, user_lang="english"):
+        steps = _steps_for(self.appointment_process.get(action, {}), user_lang)
+        return {"type":"process","action":action,"steps":steps}
+
+    def static_answers(self, user_lang="english"):
+        """Every answer whose content is fixed by the data, e.g. for pre-rendering speech."""
+        yield self.contact_answer(user_lang)
+        yield self.timings_answer(user_lang)
+        yield self.departments_answer(user_lang)
+        yield self.services_answer(user_lang)
+        for action in self.appointment_process:
+            yield self.process_answer(action, user_lang)
+        for key in self.canned:
+            yield {"type": "text", "answer": self.canned_answer(key, user_lang)}
+        for f in self.faq_list:
+            yield {"type": "text", "answer": pick_lang(f.get("answer"), user_lang)}
+
+    # ---------- Main entry ----------
+    def answer(self, question: str, user_lang="english") -> dict:
+        user_lang_code = LANG_CODE_MAP.get(user_lang.lower(), "en")
+
+        # Step 1: translate to English for logic
+        with tracing.span("translate"):
+            q_en = _fast_translate(question, user_lang_code, "en").strip()
+        q_norm = _norm(q_en)
+
+        # 0) Try strong doctor-name intent: "I want to meet Dr Khan" / "डॉ खान से मिलना है" / "डॉ खान कसे भेटायचे"
+        with tracing.span("doctor_match"):
+            direct_doc_hit = self.extract_named_doctor(q_en)
+        if direct_doc_hit:
+            dept = direct_doc_hit.dept
+            doc = direct_doc_hit.doc
+            return {
+                "type": "doctors",  # keep existing frontend renderer
+                "department": dept.name.pick(user_lang),
+                "department_key": direct_doc_hit.dept_key,
+                "fees": dept.fees,
+                "doctors": [
+                    _doctor_payload(doc, dept, user_lang=user_lang)
+                ],
+                # extra helpful fields (frontend may ignore safely)
+                "process": {
+                    "action": "booking",
+                    "steps": _steps_for(self.appointment_process.get("booking", {}), user_lang)
+                },
+                "tips": {
+                    "note": self.canned_answer("tips_note", user_lang)
+                }
             }
+
+        # 1)-7) Intents and symptoms
+        with tracing.span("intent_match"):
+            result = self._intent_answer(q_norm, user_lang)
+
+        # 8) FAQ matching
+        if not result:
+            with tracing.span("faq_match"):
+                best_faq = self.match_faq(q_en)
+            if best_faq:
+                adict = best_faq.get("answer", {})
+                if isinstance(adict, dict):
+                    ans = adict.get(user_lang.lower(), adict.get("english"))
+                else:
+                    ans = adict
+                result = {"type": "text", "answer": ans}
+
+        # 9) Absolute fallback → polite “no answer”
+        if not result:
+            # keep frontend-friendly type
+            result = {"type": "text", "answer": self.canned_answer("fallback", user_lang)}
+        return result
+
+    def _intent_answer(self, q_norm, user_lang):
+        """Answer from the intent keywords, then the symptom map; None if nothing matched."""
+        result = None
+
+        # 1) Contact
+        if _has_intent(q_norm, "contact"):
+            result = self.contact_answer(user_lang)
+
+        # 2) Timings
+        elif _has_intent(q_norm, "timings"):
+            result = self.timings_answer(user_lang)
+
+        # 3) Departments
+        elif _has_intent(q_norm, "departments"):
+            result = self.departments_answer(user_lang)
+
+        # 4) Doctors (generic or dept-specific)
+        elif _has_intent(q_norm, "doctors"):
+            dept_name = self.best_department_match(q_norm)
+            if dept_name:
+                dept = self.dept_by_key[dept_name]
+                result = {
+                    "type":"doctors",
+                    "department": dept.name.pick(user_lang),
+                    "department_key": dept_name,
+                    "fees": dept.fees,
+                    "doctors":[_doctor_payload(doc, dept, user_lang) for doc in dept.doctors]
+                }
+            else:
+                all_docs = []
+                for dept in self.departments:
+                    for doc in dept.doctors:
+                        d = _doctor_payload(doc, dept, user_lang)
+                        d["department"] = dept.name.pick(user_lang)
+                        d["department_key"] = dept.key
+                        all_docs.append(d)
+                result = {"type":"doctors","department":"All","doctors":all_docs}
+
+        # 5) Services
+        elif _has_intent(q_norm, "services"):
+            matched = None
+            if "ambulance" in q_norm or "रुग्णवाहिका" in q_norm or "एम्बुलेंस" in q_norm:
+                matched = self._service_matching("ambulance", user_lang)
+            elif "pharmacy" in q_norm or "फार्मेसी" in q_norm:
+                matched = self._service_matching("pharmacy", user_lang)
+            elif "lab" in q_norm or "लैब" in q_norm or "लॅब" in q_norm:
+                matched = self._service_matching("lab", user_lang)
+            elif "parking" in q_norm or "पार्किंग" in q_norm:
+                result = {"type": "text", "answer": self.canned_answer("parking", user_lang)}
+            elif "insurance" in q_norm or "बीमा" in q_norm or "विमा" in q_norm:
+                matched = self._service_matching("insurance", user_lang)
+
+            if matched:
+                result = {"type": "services", "services": matched, "services_key": list(matched.keys())}
+            elif not result:
+                result = self.services_answer(user_lang)
+
+        # 6) Process (book/edit/cancel)
+        elif _has_intent(q_norm, "process"):
+            action = "booking"
+            if "cancel" in q_norm or "रद्द" in q_norm or "रद्द करें" in q_norm:
+                action = "cancel"
+            elif "edit" in q_norm or "change" in q_norm or "बदल" in q_norm or "modify" in q_norm or "रीशेड्यूल" in q_norm:
+                action = "edit"
+
+            result = self.process_answer(action, user_lang)
+
+        # 6.5) Fees
+        elif _has_intent(q_norm, "fees"):
+            result = {"type": "text", "answer": self.canned_answer("fees", user_lang)}
+
+        # 6.6) Documents
+        elif _has_intent(q_norm, "documents"):
+            result = {"type": "text", "answer": self.canned_answer("documents", user_lang)}
+
+        # 6.7) Emergency
+        elif _has_intent(q_norm, "emergency"):
+            result = {"type": "text", "answer": self.canned_answer("emergency", user_lang)}
+
+        # 7) Symptoms smart-match
         else:
-            all_docs = []
-            for dept in HOSP_DATA["departments"]:
-                for doc in dept.get("doctors", []):
-                    d = _doctor_payload(doc, dept, user_lang)
-                    d["department"] = pick_lang(dept["name"], user_lang)
-                    d["department_key"] = pick_lang(dept["name"], "english")
-                    all_docs.append(d)
-            result = {"type":"doctors","department":"All","doctors":all_docs}
-
-    # 5) Services
-    elif _has_intent(q_norm, "services"):
-        matched = None
-        if "ambulance" in q_norm or "रुग्णवाहिका" in q_norm or "एम्बुलेंस" in q_norm:
-            for key in HOSP_DATA["services"].keys():
-                if "ambulance" in key.lower():
-                    matched = {key: pick_lang(HOSP_DATA["services"][key], user_lang)}
-                    break
-        elif "pharmacy" in q_norm or "फार्मेसी" in q_norm:
-            for key in HOSP_DATA["services"].keys():
-                if "pharmacy" in key.lower():
-                    matched = {key: pick_lang(HOSP_DATA["services"][key], user_lang)}
-                    break
-        elif "lab" in q_norm or "लैब" in q_norm or "लॅब" in q_norm:
-            for key in HOSP_DATA["services"].keys():
-                if "lab" in key.lower():
-                    matched = {key: pick_lang(HOSP_DATA["services"][key], user_lang)}
+            for sym, dept in self.symptom_map.items():
+                dept_data = self.dept_by_key.get(dept)
+                if dept_data is None:
+                    continue
+                if difflib.SequenceMatcher(None, sym, q_norm).ratio() > 0.8 or sym in q_norm:
+                    result = {
+                        "type":"symptom","symptom":sym,
+                        "department": dept_data.name.pick(user_lang),
+                        "department_key": dept,
+                        "fees": dept_data.fees,
+                        "doctors":[_doctor_payload(doc, dept_data, user_lang) for doc in dept_data.doctors]
+                    }
                     break
-        elif "parking" in q_norm or "पार्किंग" in q_norm:
-            result = {"type": "text", "answer": {
-                "english": "Yes, we have free parking facilities for patients and visitors. The parking area is located in front of the main building.",
-                "hindi": "हाँ, हमारे पास रोगियों और आगंतुकों के लिए निःशुल्क पार्किंग सुविधा है। पार्किंग क्षेत्र मुख्य भवन के सामने स्थित है।",
-                "marathi": "होय, आमच्याकडे रुग्ण आणि भेट देणाऱ्यांसाठी विनामूल्य पार्किंग सुविधा आहे. पार्किंग क्षेत्र मुख्य इमारतीच्या समोर आहे."
-            }.get(user_lang.lower(), "Yes, we have free parking facilities for patients and visitors.")}
-        elif "insurance" in q_norm or "बीमा" in q_norm or "विमा" in q_norm:
-            for key in HOSP_DATA["services"].keys():
-                if "insurance" in key.lower():
-                    matched = {key: pick_lang(HOSP_DATA["services"][key], user_lang)}
-                    break
-        
-        if matched:
-            result = {"type": "services", "services": matched, "services_key": list(matched.keys())}
-        elif not result:
-            result = {"type": "services",
-                      "services": {k: pick_lang(v, user_lang) for k,v in HOSP_DATA["services"].items()},
-                      "services_key": list(HOSP_DATA["services"].keys())}
-
-    # 6) Process (book/edit/cancel)
-    elif _has_intent(q_norm, "process"):
-        action = "booking"
-        if "cancel" in q_norm or "रद्द" in q_norm or "रद्द करें" in q_norm:
-            action = "cancel"
-        elif "edit" in q_norm or "change" in q_norm or "बदल" in q_norm or "modify" in q_norm or "रीशेड्यूल" in q_norm:
-            action = "edit"
-
-        steps_dict = HOSP_DATA["appointment_process"][action]
-        if isinstance(steps_dict, dict):
-            steps = steps_dict.get(user_lang.lower(), steps_dict.get("english", []))
+        return result
+
+
+# ---------- Tenant registry ----------
+def _deep_sizeof(obj, seen=None):
+    """Approximate retained size of an object graph in bytes."""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_sizeof(k, seen) + _deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(_deep_sizeof(i, seen) for i in obj)
+    elif hasattr(obj, "__dict__"):
+        size += _deep_sizeof(vars(obj), seen)
+    elif hasattr(type(obj), "__slots__"):
+        size += sum(_deep_sizeof(getattr(obj, name, None), seen) for name in type(obj).__slots__)
+    return size
+
+def hospital_data_file(hospital_id) -> Path:
+    """data/hospitals/<id>/hospital_info.json, or the shared file if the hospital has none."""
+    if hospital_id and _SAFE_ID.match(hospital_id):
+        path = HOSPITALS_DIR / hospital_id / "hospital_info.json"
+        if path.is_file():
+            return path
+    return HOSP_FILE
+
+class KnowledgeBaseRegistry:
+    """Lazily built, LRU-evicted cache of HospitalKnowledgeBase instances.
+
+    Entries are keyed by data file, so hospitals without their own file share
+    one instance built from the default data. A file edited on disk is picked up
+    on the next lookup. Cold entries are evicted once either the tenant count
+    or the approximate memory total goes over its limit; the most recently used
+    entry is always kept.
+    """
+
+    def __init__(self, max_tenants=None, max_bytes=None):
+        self.max_tenants = max_tenants or settings.KB_MAX_TENANTS
+        self.max_bytes = max_bytes or settings.KB_MAX_MEMORY_MB * 1024 * 1024
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # path -> (mtime, size, kb)
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._speech_pending = []  # built by warm(); speech is queued by whichever process serves them
+
+    def warm(self, hospital_ids):
+        """Build knowledge bases ahead of the first request (gunicorn master with preload_app).
+
+        Their speech precompute is left to the first lookup in each worker, so
+        the master starts no threads that the forked workers would inherit.
+        """
+        for hospital_id in hospital_ids:
+            self.get(hospital_id, precompute_speech=False)
+
+    def get(self, hospital_id, precompute_speech=True) -> HospitalKnowledgeBase:
+        if self._speech_pending and precompute_speech:
+            self._precompute_pending()
+        path = hospital_data_file(hospital_id)
+        key = str(path)
+        mtime = path.stat().st_mtime
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == mtime:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                metrics.cache_lookup("knowledge_base", True)
+                return entry[2]
+            self.misses += 1
+        metrics.cache_lookup("knowledge_base", False)
+
+        # Build outside the lock so a slow load doesn't block other tenants
+        with tracing.span("kb_build", source=key):
+            with path.open(encoding="utf-8") as f:
+                data = json.load(f)
+            kb = HospitalKnowledgeBase(hospital_id if path != HOSP_FILE else None, data, source=key)
+            size = _deep_sizeof(kb)
+        if precompute_speech:
+            self._precompute_speech(kb)
         else:
-            steps = steps_dict
-
-        result = {"type":"process","action":action,"steps":steps}
-
-    # 6.5) Fees
-    elif _has_intent(q_norm, "fees"):
-        result = {"type": "text", "answer": {
-            "english": "Consultation fees vary by department: General Medicine - ₹400, Cardiology - ₹600, Orthopedics - ₹500. Emergency consultation is ₹800.",
-            "hindi": "परामर्श शुल्क विभाग के अनुसार भिन्न होता है: जनरल मेडिसिन - ₹400, कार्डियोलॉजी - ₹600, ऑर्थोपेडिक्स - ₹500। आपातकालीन परामर्श ₹800 है।",
-            "marathi": "सल्लागार शुल्क विभागानुसार बदलते: जनरल मेडिसिन - ₹400, कार्डिओलॉजी - ₹600, ऑर्थोपेडिक्स - ₹500. आपत्कालीन सल्लागार ₹800 आहे."
-        }.get(user_lang.lower(), "Consultation fees vary by department.")}
-
-    # 6.6) Documents
-    elif _has_intent(q_norm, "documents"):
-        result = {"type": "text", "answer": {
-            "english": "Please bring your ID proof, insurance card (if applicable), previous medical reports, and any current medications you are taking.",
-            "hindi": "कृपया अपना पहचान पत्र, बीमा कार्ड (यदि लागू हो), पिछली चिकित्सा रिपोर्ट, और आपके द्वारा ली जा रही कोई भी वर्तमान दवाएं लाएं।",
-            "marathi": "कृपया आपले ओळखपत्र, विमा कार्ड (लागू असल्यास), मागील वैद्यकीय अहवाल आणि आपण घेत असलेली कोणतीही सध्याची औषधे आणा."
-        }.get(user_lang.lower(), "Please bring your ID proof and medical documents.")}
-
-    # 6.7) Emergency
-    elif _has_intent(q_norm, "emergency"):
-        result = {"type": "text", "answer": {
-            "english": "For emergencies, call +91 9921142657 immediately. We provide 24/7 emergency services including trauma care, cardiac emergency, stroke care, and general emergency treatment.",
-            "hindi": "आपातकाल के लिए, तुरंत +91 9921142657 पर कॉल करें। हम 24/7 आपातकालीन सेवाएं प्रदान करते हैं जिसमें ट्रॉमा केयर, कार्डियक इमरजेंसी, स्ट्रोक केयर, और सामान्य आपातकालीन उपचार शामिल है।",
-            "marathi": "आपत्कालीन परिस्थितीसाठी, ताबडतोब +91 9921142657 वर कॉल करा. आम्ही २४/७ आपत्कालीन सेवा पुरवतो ज्यामध्ये ट्रॉमा केअर, कार्डियक इमरजन्सी, स्ट्रोक केअर आणि सामान्य आपत्कालीन उपचार समाविष्ट आहे."
-        }.get(user_lang.lower(), "For emergencies, call +91 9921142657 immediately.")}
-
-    # 7) Symptoms smart-match
-    else:
-        for sym, dept in SYMPTOM_MAP.items():
-            if difflib.SequenceMatcher(None, sym, q_norm).ratio() > 0.8 or sym in q_norm:
-                dept_data = next(d for d in HOSP_DATA["departments"] if pick_lang(d["name"], "english") == dept)
-                result = {
-                    "type":"symptom","symptom":sym,
-                    "department": pick_lang(dept_data["name"], user_lang),
-                    "department_key": dept,
-                    "fees": dept_data.get("fees"),
-                    "doctors":[_doctor_payload(doc, dept_data, user_lang) for doc in dept_data.get("doctors", [])]
-                }
-                break
+            self._speech_pending.append(kb)
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old:
+                self._total_bytes -= old[1]
+            self._entries[key] = (mtime, size, kb)
+            self._total_bytes += size
+            self._evict()
+        return kb
+
+    def _precompute_pending(self):
+        with self._lock:
+            pending, self._speech_pending = self._speech_pending, []
+        for kb in pending:
+            self._precompute_speech(kb)
+
+    def _precompute_speech(self, kb):
+        # Fixed answers are spoken often; have their audio ready before anyone asks
+        try:
+            from services.voice_pipeline import precompute_static_speech
+            precompute_static_speech(kb)
+        except Exception as e:
+            print(f"[KB] Speech precompute skipped: {e}")
+
+    def _evict(self):
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_tenants or self._total_bytes > self.max_bytes
+        ):
+            key, (_, size, _) = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            print(f"[KB] Evicted knowledge base {key} ({size} bytes)")
+
+    def invalidate(self, hospital_id=None):
+        """Drop one hospital's knowledge base, or all of them."""
+        with self._lock:
+            if hospital_id is None:
+                self._entries.clear()
+                self._total_bytes = 0
+                return
+            entry = self._entries.pop(str(hospital_data_file(hospital_id)), None)
+            if entry:
+                self._total_bytes -= entry[1]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "tenants": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_tenants": self.max_tenants,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": {k: v[1] for k, v in self._entries.items()},
+            }
 
-    # 8) Enhanced FAQ matching with better similarity detection
-    if not result:
-        best_match_score = 0
-        best_faq = None
-        
-        for f in HOSP_DATA.get("faqs", []):
-            qdict = f.get("question", {})
-            adict = f.get("answer", {})
-            
-            # Check all language versions of the question
-            for lang_key, qtext in qdict.items():
-                # Normalize both question and user input
-                qtext_norm = _norm(qtext)
-                user_q_norm = _norm(q_en)
-                
-                # Calculate similarity score
-                similarity = difflib.SequenceMatcher(None, qtext_norm, user_q_norm).ratio()
-                
-                # Also check for keyword overlap
-                q_words = set(qtext_norm.split())
-                user_words = set(user_q_norm.split())
-                keyword_overlap = len(q_words.intersection(user_words)) / max(len(q_words), 1)
-                
-                # Combined score (weighted)
-                combined_score = (similarity * 0.7) + (keyword_overlap * 0.3)
-                
-                # Check for exact substring match (higher priority)
-                if qtext_norm in user_q_norm or user_q_norm in qtext_norm:
-                    combined_score = max(combined_score, 0.8)
-                
-                # Update best match if this is better
-                if combined_score > best_match_score and combined_score >= 0.6:
-                    best_match_score = combined_score
-                    best_faq = f
-        
-        # If we found a good match, use it
-        if best_faq:
-            adict = best_faq.get("answer", {})
-            if isinstance(adict, dict):
-                ans = adict.get(user_lang.lower(), adict.get("english"))
+knowledge_bases = KnowledgeBaseRegistry()
+
+def get_knowledge_base(hospital_id=None) -> HospitalKnowledgeBase:
+    hospital_id = canonical_hospital_id(hospital_id) or get_current_hospital_id() or settings.DEFAULT_HOSPITAL_ID
+    return knowledge_bases.get(hospital_id)
+
+# ---------- Main function ----------
+def get_general_query_answer(question: str, user_lang="english", hospital_id=None) -> dict:
+    return get_knowledge_base(hospital_id).answer(question, user_lang)
+
+
+# ---------- Presentation ----------
+def localize_answer(answer: dict, lang="english") -> dict:
+    """Flatten any multilingual fields left in an answer to the user's language."""
+    lang = lang.lower()
+
+    def pick(val):
+        if isinstance(val, dict):
+            return val.get(lang) or val.get("english") or ""
+        return val or ""
+
+    def pick_doctors(doctors):
+        return [{
+            "name": pick(d.get("name")),
+            "qualification": pick(d.get("qualification")),
+            "experience": pick(d.get("experience")),
+            "timings": pick(d.get("timings")),
+            "fees": d.get("fees", "")
+        } for d in doctors]
+
+    kind = answer.get("type")
+    if kind == "timings":
+        answer["opd"] = pick(answer.get("opd"))
+        answer["emergency"] = pick(answer.get("emergency"))
+        answer["visiting"] = pick(answer.get("visiting"))
+
+    elif kind == "doctors":
+        dept = answer.get("department", "")
+        if isinstance(dept, dict):
+            answer["department"] = dept.get(lang) or dept.get("english") or ""
+        else:
+            answer["department"] = str(dept) if dept else ""
+        answer["doctors"] = pick_doctors(answer.get("doctors", []))
+
+    elif kind == "departments":
+        depts = []
+        for d in answer.get("departments", []):
+            if isinstance(d, dict):
+                depts.append(d.get(lang) or d.get("english") or "")
             else:
-                ans = adict
-            result = {"type": "text", "answer": ans}
-
-    # 9) Absolute fallback → polite “no answer”
-    if not result:
-        # keep frontend-friendly type
-        result = {"type": "text", "answer": {
-            "english": "Sorry, I couldn't understand that. Please try rephrasing or ask about departments, doctors, timings, or booking.",
-            "hindi": "क्षमा करें, मैं समझ नहीं पाया। कृपया दोबारा पूछें या विभाग, डॉक्टर, समय या बुकिंग के बारे में पूछें।",
-            "marathi": "माफ करा, मला समजले नाही. कृपया पुन्हा विचारा किंवा विभाग, डॉक्टर, वेळा किंवा बुकिंगबद्दल विचारा."
-        }.get(user_lang.lower(), "Sorry, I couldn't understand that.")}
-    return result
+                depts.append(str(d))
+        answer["departments"] = depts
+
+    elif kind == "services":
+        answer["services"] = {pick(k): pick(v) for k, v in answer.get("services", {}).items()}
+
+    elif kind == "symptom":
+        if isinstance(answer.get("department"), dict):
+            answer["department"] = answer["department"].get(lang) or answer["department"].get("english") or ""
+        answer["doctors"] = pick_doctors(answer.get("doctors", []))
+
+    elif kind == "text":
+        answer["answer"] = pick(answer.get("answer"))
+
+    return answer
@@ -0,0 +1,106 @@
+# app/services/assets.py
+"""
+Per-page JS/CSS bundles and their fingerprinted URLs.
+
+build_assets.py concatenates and minifies each bundle below, writes it to
+static/dist/ as <name>.<hash>.<ext> with .gz/.br siblings and records the
+mapping in static/dist/manifest.json. Templates call
+
+    {% for url in asset_urls('chat.js') %}<script src="{{ url }}"></script>{% endfor %}
+
+which yields the single fingerprinted file when the manifest exists and the
+original source files otherwise, so a checkout without a build keeps working.
+"""
+import json
+
+from flask import request, send_from_directory, url_for
+
+from config import BASE_DIR
+from services.file_cache import FileCache
+
+STATIC_DIR = BASE_DIR / "static"
+DIST_DIR = STATIC_DIR / "dist"
+MANIFEST_FILE = DIST_DIR / "manifest.json"
+
+_CHAT_FLOWS = ["js/chat_booking.js", "js/chat_myappointments.js", "js/chat_general_query.js", "js/chat.js"]
+
+# Bundle name -> source files under static/, in load order
+BUNDLES = {
+    "chat.css": ["css/style.css", "css/responsive.css", "css/ai-icon.css", "css/fontawesome-fallback.css"],
+    "chat.js": ["js/responsive-interactions.js", "js/dynamic-animations.js", "js/responsive-testing.js"] + _CHAT_FLOWS,
+    "premium-chat.css": ["css/premium-chat.css"],
+    "premium-chat.js": ["js/premium-chat.js"] + _CHAT_FLOWS,
+    "modern-chat.css": ["css/modern-chat.css"],
+    "modern-chat.js": ["js/modern-chat.js"] + _CHAT_FLOWS,
+    "unified-chat.css": ["css/unified-chat.css"],
+    "unified-chat.js": ["js/unified-chat.js"] + _CHAT_FLOWS,
+    "ai-3d-chat.css": ["css/ai-3d-chat.css"],
+    "ai-3d-chat.js": ["js/ai-3d-chat.js"] + _CHAT_FLOWS,
+    "my-appointments.js": ["js/chat.js", "js/chat_myappointments.js"],
+    "voice.css": ["css/style.css", "css/ai-icon.css"],
+    "voice.js": ["js/main.js", "js/voice.js", "js/voice_booking.js", "js/voice_my_appointments.js",
+                 "js/voice_general_query.js"],
+    "admin.css": ["css/ai-icon.css", "css/admin-modern.css"],
+    # Full embeddable widget, loaded by the /widget/<id>/embed.js bootstrap
+    "widget.js": ["js/widget-embed.js"],
+}
+
+# Built from the NotoSansDevanagari fonts; there is no unbundled equivalent
+GENERATED = {"devanagari.css"}
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def _load_manifest(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+_manifest = FileCache(MANIFEST_FILE, _load_manifest)
+
+
+def manifest():
+    """Bundle name -> fingerprinted file name, or {} before the first build."""
+    try:
+        return _manifest.get()
+    except FileNotFoundError:
+        return {}
+
+
+def asset_urls(name):
+    """URLs a template should load for a bundle, in order."""
+    built = manifest().get(name)
+    if built:
+        return [url_for("static", filename=f"dist/{built}")]
+    if name in GENERATED:
+        return []
+    return [url_for("static", filename=src) for src in BUNDLES[name]]
+
+
+def serve_dist(filename):
+    """Fingerprinted file, precompressed when the client accepts it."""
+    for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+        if request.accept_encodings[encoding] > 0 and (DIST_DIR / f"{filename}{suffix}").is_file():
+            resp = send_from_directory(DIST_DIR, filename + suffix, max_age=31536000)
+            resp.headers["Content-Encoding"] = encoding
+            resp.mimetype = _mimetype(filename)
+            break
+    else:
+        resp = send_from_directory(DIST_DIR, filename, max_age=31536000)
+    resp.headers["Cache-Control"] = IMMUTABLE
+    resp.vary.add("Accept-Encoding")
+    return resp
+
+
+def _mimetype(filename):
+    if filename.endswith(".js"):
+        return "text/javascript"
+    if filename.endswith(".css"):
+        return "text/css"
+    return "application/octet-stream"
+
+
+def init_app(app):
+    app.jinja_env.globals["asset_urls"] = asset_urls
+    # More specific than Flask's /static/<path:filename>, so it wins for dist/
+    app.add_url_rule("/static/dist/<path:filename>", "static_dist", serve_dist)
@@ -1,47 +1,96 @@
 # services/data_service_db.py
-from datetime import datetime, timedelta
+from datetime import datetime
+import logging
 import traceback
-from config_db import SessionLocal
+from config_db import SessionLocal, engine
 from models import Appointment, Doctor, Department, User, HospitalInfo
+from sqlalchemy import update, select, func
 from sqlalchemy.orm.exc import NoResultFound
+from tenant import canonical_hospital_id, get_current_hospital_id
+from services import records
+
+logger = logging.getLogger(__name__)
 
 # Departments
 def list_departments(hospital_id=None):
     session = SessionLocal()
-    rows = session.query(Department).all()
-    result = []
-    for d in rows:
-        result.append({
-            "id": d.id,
-            "name": {"en": d.name_en, "hi": d.name_hi, "mr": d.name_mr}
-        })
+    q = session.query(Department)
+    if hospital_id:
+        q = q.filter(Department.hospital_id == canonical_hospital_id(hospital_id))
+    rows = q.all()
+    result = [_department_dict(d) for d in rows]
     session.close()
     return result
 
+def _department_dict(d):
+    return {
+        "id": d.id,
+        "name": {"en": d.name_en, "hi": d.name_hi, "mr": d.name_mr}
+    }
+
 # Doctors
 def list_doctors(department_id=None, hospital_id=None):
     session = SessionLocal()
     q = session.query(Doctor)
+    if hospital_id:
+        q = q.filter(Doctor.hospital_id == canonical_hospital_id(hospital_id))
     if department_id:
         q = q.filter_by(department_id=department_id)
     rows = q.all()
-    result = []
-    for doc in rows:
-        result.append({
-            "id": doc.id,
-            "department_id": doc.department_id,
-            "name": {"en": doc.name_en, "hi": doc.name_hi, "mr": doc.name_mr},
-            "education": doc.education,
-            "experience": doc.experience,
-            "fees": float(doc.fees) if doc.fees else None,
-            "available_days": doc.available_days,
-            "start_time": doc.start_time,
-            "end_time": doc.end_time,
-            "photo": doc.photo
-        })
+    result = [_doctor_dict(doc) for doc in rows]
     session.close()
     return result
 
+def _doctor_dict(doc):
+    return {
+        "id": doc.id,
+        "department_id": doc.department_id,
+        "name": {"en": doc.name_en, "hi": doc.name_hi, "mr": doc.name_mr},
+        "education": doc.education,
+        "experience": doc.experience,
+        "fees": float(doc.fees) if doc.fees else None,
+        "available_days": doc.available_days,
+        "start_time": doc.start_time,
+        "end_time": doc.end_time,
+        "photo": doc.photo
+    }
+
+# Keyed lookups for the booking routes. Served from the per-hospital metadata
+# snapshot (services.metadata_cache), which commits to Department/Doctor rows
+# invalidate; a miss falls back to a primary-key query.
+def get_doctor(doctor_id, hospital_id=None):
+    """records.Doctor by id, or None"""
+    return _get_by_id(Doctor, "doctors_by_id", _doctor_record, doctor_id, hospital_id)
+
+def get_department(department_id, hospital_id=None):
+    """records.Department by id, or None"""
+    return _get_by_id(Department, "departments_by_id", _department_record, department_id, hospital_id)
+
+def _doctor_record(doc):
+    return records.Doctor.from_dict(_doctor_dict(doc))
+
+def _department_record(d):
+    return records.Department.from_dict(_department_dict(d))
+
+def _get_by_id(model, index, to_record, obj_id, hospital_id):
+    if obj_id is None or str(obj_id) == "":
+        return None
+    from services import metadata_cache
+    try:
+        found = getattr(metadata_cache.get(hospital_id or get_current_hospital_id()), index).get(str(obj_id))
+        if found is not None:
+            return found
+    except Exception as e:
+        print(f"Metadata cache lookup failed for {model.__tablename__} {obj_id}: {e}")
+    session = SessionLocal()
+    try:
+        obj = session.get(model, str(obj_id))
+        if obj is None or (hospital_id and obj.hospital_id != canonical_hospital_id(hospital_id)):
+            return None
+        return to_record(obj)
+    finally:
+        session.close()
+
 # Appointments
 def list_appointments(status=None):
     session = SessionLocal()
@@ -49,33 +98,48 @@ def list_appointments(status=None):
     if status:
         q = q.filter_by(status=status)
     rows = q.all()
-    result = []
-    for a in rows:
-        result.append({
-            "id": a.id,
-            "name": a.name,
-            "phone": a.phone,
-            "department_id": a.department_id,
-            "doctor_id": a.doctor_id,
-            "date": a.date,
-            "time": a.time,
-            "status": a.status,
-            "created_at": a.created_at.isoformat() if a.created_at else None,
-            "updated_at": a.updated_at.isoformat() if a.updated_at else None,
-            "can_edit": a.can_edit,
-            "is_updated": a.is_updated,
-            "is_new": a.is_new,
-            "viewed_by_admin": a.viewed_by_admin,
-        })
+    result = [appointment_dict(a) for a in rows]
     session.close()
     return result
 
+def appointment_dict(a):
+    """Explicit projection of an Appointment row; dates stay datetimes for the JSON provider"""
+    return {
+        "id": a.id,
+        "hospital_id": a.hospital_id,
+        "name": a.name,
+        "phone": a.phone,
+        "department_id": a.department_id,
+        "doctor_id": a.doctor_id,
+        "date": a.date,
+        "time": a.time,
+        "status": a.status,
+        "created_at": a.created_at,
+        "updated_at": a.updated_at,
+        "can_edit": a.can_edit,
+        "is_updated": a.is_updated,
+        "is_new": a.is_new,
+        "viewed_by_admin": a.viewed_by_admin,
+    }
+
+def user_dict(u):
+    return {
+        "id": u.id,
+        "name": u.name,
+        "password": u.password,
+        "hospital_id": u.hospital_id,
+        "address": u.address,
+        "about": u.about,
+        "services": u.services,
+        "staff": u.staff,
+        "working_hours": u.working_hours,
+    }
+
 def get_appointment_by_id(appt_id):
     session = SessionLocal()
     try:
         obj = session.query(Appointment).filter_by(id=appt_id).one()
-        d = obj.__dict__.copy()
-        d.pop("_sa_instance_state", None)
+        d = appointment_dict(obj)
         return d
     except NoResultFound:
         return None
@@ -132,8 +196,7 @@ def create_preview(data):
         if not getattr(obj, "id", None):
             raise ValueError("Database did not return appointment ID")
 
-        d = obj.__dict__.copy()
-        d.pop("_sa_instance_state", None)
+        d = appointment_dict(obj)
         print("[SUCCESS] create_preview success with ID:", d.get("id"))
         return d
 
@@ -156,8 +219,7 @@ def confirm_appointment(appt_id):
         session.commit()
         session.refresh(obj)
 
-        d = obj.__dict__.copy()
-        d.pop("_sa_instance_state", None)
+        d = appointment_dict(obj)
         return d
     except NoResultFound:
         return {"error": f"Appointment with ID {appt_id} not found."}
@@ -179,8 +241,7 @@ def update_appointment(appt_id, patch_data):
         obj.updated_at = datetime.now()
         session.commit()
         session.refresh(obj)
-        d = obj.__dict__.copy()
-        d.pop("_sa_instance_state", None)
+        d = appointment_dict(obj)
         return d
     except NoResultFound:
         return None
@@ -221,15 +282,7 @@ def find_by_key(key):
         
         if not obj:
             return None
-        d = obj.__dict__.copy()
-        d.pop("_sa_instance_state", None)
-        
-        # Convert any datetime objects to strings to avoid serialization issues
-        for k, v in d.items():
-            if hasattr(v, 'isoformat'):
-                d[k] = v.isoformat()
-        
-        return d
+        return appointment_dict(obj)
     except Exception as e:
         print(f"Error in find_by_key: {e}")
         return None
@@ -241,7 +294,7 @@ def get_hospital_info(hospital_id=None):
     try:
         # Get hospital info by hospital_id, or first record if no hospital_id specified
         if hospital_id:
-            hosp = session.query(HospitalInfo).filter_by(hospital_id=hospital_id).first()
+            hosp = session.query(HospitalInfo).filter_by(hospital_id=canonical_hospital_id(hospital_id)).first()
         else:
             hosp = session.query(HospitalInfo).first()
             
@@ -261,21 +314,20 @@ def get_hospital_info(hospital_id=None):
     finally:
         session.close()
 
-# 🔥 CRITICAL DEBUGGING ADDITIONS
 def list_slots(doctor_id, date_str):
     session = SessionLocal()
     try:
         doctor = session.query(Doctor).filter_by(id=doctor_id).first()
         if not doctor:
-            print(f"[ERROR] list_slots: Doctor ID {doctor_id} not found.")
+            logger.warning("list_slots: doctor %s not found", doctor_id)
             return {"slots": []}
 
         # parse date
         try:
             date = datetime.strptime(date_str, "%Y-%m-%d").date()
         except ValueError:
-             print(f"[ERROR] list_slots: Invalid date format received: {date_str}")
-             return {"slots": []}
+            logger.warning("list_slots: invalid date %r", date_str)
+            return {"slots": []}
 
         # normalize doctor available_days into list
         available_days = []
@@ -287,31 +339,20 @@ def list_slots(doctor_id, date_str):
 
         weekday = date.strftime("%A").lower()
         
-        # --- DEBUG LOGGING ---
-        print(f"[DEBUG] list_slots: Doctor {doctor_id}, Date {date_str}, Weekday {weekday}")
-        print(f"[DEBUG] list_slots: Doctor's DB available_days (RAW): {doctor.available_days}")
-        print(f"[DEBUG] list_slots: Normalized available_days: {available_days}")
-        # ---------------------
-        
+        # Per slot query: only formatted when LOG_LEVEL=DEBUG
+        logger.debug("list_slots: doctor %s, date %s (%s), available_days raw=%r normalized=%r",
+                     doctor_id, date_str, weekday, doctor.available_days, available_days)
+
         if weekday not in available_days:
-            print(f"[DEBUG] list_slots: {weekday} is NOT in doctor's available days.")
+            logger.debug("list_slots: doctor %s does not work on %s", doctor_id, weekday)
             return {"slots": []}
 
         # generate slots between start_time and end_time (default 10:00–17:00 if missing)
         start_str = doctor.start_time or "10:00"
         end_str = doctor.end_time or "17:00"
 
-        start = datetime.strptime(start_str, "%H:%M")
-        end = datetime.strptime(end_str, "%H:%M")
-
-        slots = []
-        cur = start
-        while cur < end:
-            slots.append({
-                "value": cur.strftime("%H:%M"),          # backend format
-                "display": cur.strftime("%I:%M %p")      # frontend display
-            })
-            cur += timedelta(minutes=15)
+        # 15-minute records, shared by every doctor with the same hours
+        slots = records.slot_grid(start_str, end_str)
 
         # remove already booked slots
         booked = session.query(Appointment).filter_by(
@@ -319,9 +360,9 @@ def list_slots(doctor_id, date_str):
         ).all()
         booked_times = {b.time for b in booked}
 
-        available = [s for s in slots if s["value"] not in booked_times]
+        available = [s for s in slots if s.value not in booked_times]
         
-        print(f"[DEBUG] list_slots: Found {len(available)} available slots.")
+        logger.debug("list_slots: %d available slots", len(available))
 
         return {"slots": available}
 
@@ -341,9 +382,7 @@ def find_user(name):
     session = SessionLocal()
     try:
         user = session.query(User).filter_by(name=name).one()
-        d = user.__dict__.copy()
-        d.pop("_sa_instance_state", None)
-        return d
+        return user_dict(user)
     except NoResultFound:
         return None
     finally:
@@ -367,16 +406,61 @@ def get_appointments_by_phone(phone):
     session = SessionLocal()
     try:
         appts = session.query(Appointment).filter_by(phone=phone).all()
-        result = []
-        for appt in appts:
-            appt_dict = appt.__dict__.copy()
-            appt_dict.pop("_sa_instance_state", None)
-            # Convert datetime objects to strings
-            for k, v in appt_dict.items():
-                if hasattr(v, 'isoformat'):
-                    appt_dict[k] = v.isoformat()
-            result.append(appt_dict)
-        return result
+        return [appointment_dict(appt) for appt in appts]
+    except Exception as e:
+        print(f"Error getting appointments by phone {phone}: {e}")
+        return []
+    finally:
+        session.close()
+
+# Appointments with their department and doctor, one JOINed query (API views)
+_APPOINTMENT_COLUMNS = [getattr(Appointment, c.key) for c in Appointment.__table__.columns]
+
+def _appointment_details_select():
+    return (
+        select(
+            *_APPOINTMENT_COLUMNS,
+            Department.id.label("_department_ref"),
+            Department.name_en.label("_department_en"),
+            Department.name_hi.label("_department_hi"),
+            Department.name_mr.label("_department_mr"),
+            Doctor.id.label("_doctor_ref"),
+            Doctor.name_en.label("_doctor_en"),
+            Doctor.name_hi.label("_doctor_hi"),
+            Doctor.name_mr.label("_doctor_mr"),
+            Doctor.fees.label("_doctor_fees"),
+            Doctor.experience.label("_doctor_experience"),
+        )
+        .outerjoin(Department, Department.id == Appointment.department_id)
+        .outerjoin(Doctor, Doctor.id == Appointment.doctor_id)
+    )
+
+def _appointment_details(row):
+    m = row._mapping
+    d = {col.key: m[col.key] for col in _APPOINTMENT_COLUMNS}
+    has_dept = m["_department_ref"] is not None
+    has_doc = m["_doctor_ref"] is not None
+    d["department_name"] = {"en": m["_department_en"], "hi": m["_department_hi"], "mr": m["_department_mr"]} if has_dept else {}
+    d["doctor_name"] = {"en": m["_doctor_en"], "hi": m["_doctor_hi"], "mr": m["_doctor_mr"]} if has_doc else {}
+    d["doctor_fees"] = float(m["_doctor_fees"]) if has_doc and m["_doctor_fees"] else None
+    d["doctor_experience"] = m["_doctor_experience"] if has_doc else None
+    return d
+
+def get_appointment_details(appt_id):
+    """Appointment with department/doctor names, fees and experience, or None"""
+    session = SessionLocal()
+    try:
+        row = session.execute(_appointment_details_select().where(Appointment.id == appt_id)).first()
+        return _appointment_details(row) if row else None
+    finally:
+        session.close()
+
+def get_appointment_details_by_phone(phone):
+    """All appointments for a phone number with department/doctor details"""
+    session = SessionLocal()
+    try:
+        rows = session.execute(_appointment_details_select().where(Appointment.phone == phone)).all()
+        return [_appointment_details(row) for row in rows]
     except Exception as e:
         print(f"Error getting appointments by phone {phone}: {e}")
         return []
@@ -401,8 +485,7 @@ def mark_appointment_viewed(appt_id):
         obj.updated_at = datetime.now()
         session.commit()
         session.refresh(obj)
-        d = obj.__dict__.copy()
-        d.pop("_sa_instance_state", None)
+        d = appointment_dict(obj)
         return d
     except NoResultFound:
         return None
@@ -411,7 +494,198 @@ def mark_appointment_viewed(appt_id):
         return None
     finally:
         session.close()
-        
+
+# --- Bulk appointment mutations ---
+# Target status -> statuses an appointment may move from. Status values are
+# compared lower-cased because older rows were stored capitalised ("Cancelled").
+APPOINTMENT_STATUS_TRANSITIONS = {
+    "booked": {"preview", "pending"},
+    "pending": {"preview", "booked", "confirmed"},
+    "confirmed": {"pending", "booked"},
+    "visited": {"pending", "booked", "confirmed"},
+    "completed": {"pending", "booked", "confirmed", "visited"},
+    "no-show": {"pending", "booked", "confirmed"},
+    "cancelled": {"preview", "pending", "booked", "confirmed"},
+}
+
+# Callbacks invoked as callback(event) after appointment rows change.
+_appointment_listeners = []
+
+def on_appointment_change(callback):
+    """Register a callback for appointment change events. Usable as a decorator."""
+    _appointment_listeners.append(callback)
+    return callback
+
+def _emit_appointment_change(action, rows, **extra):
+    if not rows:
+        return
+    event = {
+        "action": action,
+        "ids": [r["id"] for r in rows],
+        "rows": rows,
+        "at": datetime.now().isoformat(),
+    }
+    event.update(extra)
+    for callback in list(_appointment_listeners):
+        try:
+            callback(event)
+        except Exception:
+            traceback.print_exc()
+
+APPOINTMENT_FILTER_KEYS = (
+    "status", "department_id", "doctor_id", "phone", "date", "date_from", "date_to", "viewed_by_admin",
+)
+
+def appointment_filter_clauses(filters):
+    """Translate a filter dict (keys in APPOINTMENT_FILTER_KEYS) into SQLAlchemy
+    WHERE clauses. Empty values are ignored; unknown keys raise ValueError so a
+    misspelt filter can't silently widen the selection."""
+    filters = filters or {}
+    if not isinstance(filters, dict):
+        raise ValueError("filters must be an object")
+    unknown = sorted(set(filters) - set(APPOINTMENT_FILTER_KEYS))
+    if unknown:
+        raise ValueError(f"Unknown appointment filter(s): {', '.join(map(str, unknown))}")
+    clauses = []
+    if filters.get("status"):
+        statuses = filters["status"]
+        if isinstance(statuses, str):
+            statuses = [statuses]
+        clauses.append(func.lower(Appointment.status).in_([s.lower() for s in statuses]))
+    if filters.get("department_id"):
+        clauses.append(Appointment.department_id == str(filters["department_id"]))
+    if filters.get("doctor_id"):
+        clauses.append(Appointment.doctor_id == str(filters["doctor_id"]))
+    if filters.get("phone"):
+        clauses.append(Appointment.phone == str(filters["phone"]))
+    if filters.get("date"):
+        clauses.append(Appointment.date == filters["date"])
+    if filters.get("date_from"):
+        clauses.append(Appointment.date >= filters["date_from"])
+    if filters.get("date_to"):
+        clauses.append(Appointment.date <= filters["date_to"])
+    if filters.get("viewed_by_admin") is not None:
+        clauses.append(Appointment.viewed_by_admin == bool(filters["viewed_by_admin"]))
+    return clauses
+
+def _selection_clauses(ids, filters):
+    """WHERE clauses choosing the appointments a bulk change applies to.
+
+    Raises ValueError when ids and filters select nothing specific: a bulk
+    UPDATE without them would rewrite every appointment of the hospital.
+    """
+    clauses = appointment_filter_clauses(filters)
+    if ids:
+        clauses.append(Appointment.id.in_([int(i) for i in ids]))
+    if not clauses:
+        raise ValueError("Either ids or a non-empty filter must be provided")
+    return clauses
+
+def _bulk_update(session, clauses, values):
+    """Run a single UPDATE ... WHERE ... and return the touched rows as dicts.
+
+    Uses RETURNING where the dialect supports it; otherwise the matching ids are
+    selected first inside the same transaction.
+    """
+    columns = Appointment.__table__.c
+    stmt = update(Appointment).where(*clauses).values(**values)
+    if getattr(engine.dialect, "update_returning", False):
+        rows = session.execute(
+            stmt.returning(*columns).execution_options(synchronize_session=False)
+        ).mappings().all()
+        return [dict(r) for r in rows]
+
+    ids = session.execute(select(Appointment.id).where(*clauses)).scalars().all()
+    if not ids:
+        return []
+    session.execute(
+        update(Appointment).where(Appointment.id.in_(ids)).values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    rows = session.execute(select(*columns).where(Appointment.id.in_(ids))).mappings().all()
+    return [dict(r) for r in rows]
+
+def bulk_update_appointment_status(new_status, ids=None, filters=None, enforce_transitions=True):
+    """Move every appointment matched by ids and/or filters to new_status in one
+    UPDATE statement.
+
+    Returns {"updated": [...rows], "skipped": [...ids]} where skipped lists the
+    requested ids that were missing or not allowed to transition. Raises
+    ValueError for an unknown status, an unknown filter or an empty selection.
+    """
+    new_status = (new_status or "").strip().lower()
+    if new_status not in APPOINTMENT_STATUS_TRANSITIONS:
+        raise ValueError(f"Unknown status '{new_status}'")
+    clauses = _selection_clauses(ids, filters)
+    if enforce_transitions:
+        allowed_from = APPOINTMENT_STATUS_TRANSITIONS[new_status]
+        clauses.append(func.lower(Appointment.status).in_(allowed_from))
+
+    session = SessionLocal()
+    try:
+        rows = _bulk_update(session, clauses, {
+            "status": new_status,
+            "updated_at": datetime.now(),
+        })
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+    updated_ids = {r["id"] for r in rows}
+    skipped = [int(i) for i in (ids or []) if int(i) not in updated_ids]
+    _emit_appointment_change("status", rows, status=new_status)
+    return {"updated": rows, "skipped": skipped}
+
+def bulk_mark_appointments_viewed(ids=None, filters=None):
+    """Flag appointments as viewed by the admin in one UPDATE. Rows that are
+    already viewed are left untouched. Returns the updated rows."""
+    clauses = _selection_clauses(ids, filters)
+    clauses.append(Appointment.viewed_by_admin.isnot(True))
+
+    session = SessionLocal()
+    try:
+        rows = _bulk_update(session, clauses, {
+            "viewed_by_admin": True,
+            "updated_at": datetime.now(),
+        })
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+    _emit_appointment_change("viewed", rows)
+    return rows
+
+def iter_appointments(filters=None, batch_size=500):
+    """Stream appointments matching filters (see appointment_filter_clauses)
+    together with English department/doctor names, batch_size rows at a time.
+
+    Uses a server-side cursor where the driver supports it, so memory stays
+    flat regardless of how many rows match. The session is closed when the
+    generator is exhausted or closed.
+    """
+    session = SessionLocal()
+    try:
+        q = session.query(
+            Appointment,
+            Department.name_en.label("department_name"),
+            Doctor.name_en.label("doctor_name"),
+        ).outerjoin(Department, Department.id == Appointment.department_id)\
+         .outerjoin(Doctor, Doctor.id == Appointment.doctor_id)\
+         .filter(*appointment_filter_clauses(filters))\
+         .order_by(Appointment.id)\
+         .execution_options(stream_results=True)\
+         .yield_per(batch_size)
+        for appt, department_name, doctor_name in q:
+            yield appt, department_name, doctor_name
+    finally:
+        session.close()
+
 def get_slot_for_appointment(doctorid, date, slot=None):
     slots = listslots(doctorid, date)
     if slot in slots:
@@ -422,6 +696,6 @@ def get_slot_for_appointment(doctorid, date, slot=None):
 def listslots(doctorid, date):
     result = list_slots(doctorid, date)
     if "slots" in result:
-        return [s["value"] for s in result["slots"]]
+        return [s.value for s in result["slots"]]
     return []
 # --- End of services/data_service_db.py ---
\ No newline at end of file
@@ -0,0 +1,53 @@
+# app/services/file_cache.py
+import os
+import time
+import threading
+from pathlib import Path
+
+
+class FileCache:
+    """Holds the result of loading a file and reloads it when the file changes.
+
+    `loader(path)` builds whatever the caller wants to keep (parsed JSON,
+    pre-serialized bodies, ...). The file's mtime and size are checked at most
+    every `check_interval` seconds, so a cache hit normally costs no syscall.
+    Edits on disk are picked up by every worker without a restart.
+    """
+
+    def __init__(self, path, loader, check_interval=2.0):
+        self.path = Path(path)
+        self.loader = loader
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._value = None
+        self._signature = None
+        self._checked_at = 0.0
+
+    def _stat_signature(self):
+        st = os.stat(self.path)
+        return (st.st_mtime_ns, st.st_size)
+
+    def get(self):
+        now = time.monotonic()
+        if self._value is not None and now - self._checked_at < self.check_interval:
+            return self._value
+        with self._lock:
+            if self._value is not None and now - self._checked_at < self.check_interval:
+                return self._value
+            signature = self._stat_signature()
+            if signature != self._signature or self._value is None:
+                try:
+                    self._value = self.loader(self.path)
+                except Exception as e:
+                    if self._value is None:
+                        raise
+                    # Half-written or invalid edit: keep serving the last good copy
+                    print(f"[FileCache] Reload of {self.path} failed, keeping previous version: {e}")
+                self._signature = signature
+            self._checked_at = now
+            return self._value
+
+    def invalidate(self):
+        with self._lock:
+            self._value = None
+            self._signature = None
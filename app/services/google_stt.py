@@ -1,38 +1,74 @@
 # app/services/google_stt.py
-import requests
 import base64
 from config import settings
-from google.cloud import speech
+from services.http_client import get_upstream, UpstreamError
 
-def google_stt(audio_content, language_code="en-IN"):
-    client = speech.SpeechClient()
-    audio = speech.RecognitionAudio(content=audio_content)
-    config = speech.RecognitionConfig(
-        encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
-        sample_rate_hertz=16000,
-        language_code=language_code,
-    )
+STT_SAMPLE_RATE = 16000
 
-    response = client.recognize(config=config, audio=audio)
-    return [result.alternatives[0].transcript for result in response.results]
 
+def _recognition_config(language):
+    return {
+        "encoding": "LINEAR16",
+        "sampleRateHertz": STT_SAMPLE_RATE,
+        "languageCode": language
+    }
 
-def google_stt(audio_path, language="en-IN"):
-    url = f"https://speech.googleapis.com/v1/speech:recognize?key={settings.GOOGLE_STT_API_KEY}"
-    
-    with open(audio_path, "rb") as f:
-        audio_content = base64.b64encode(f.read()).decode("utf-8")
 
+def _stt_rest(audio_bytes, language):
+    """One-shot recognize over REST (also what the local stub server speaks)."""
+    url = f"{settings.GOOGLE_STT_URL}?key={settings.GOOGLE_STT_API_KEY}"
     body = {
-        "config": {
-            "encoding": "LINEAR16",
-            "sampleRateHertz": 16000,
-            "languageCode": language
-        },
-        "audio": {"content": audio_content}
+        "config": _recognition_config(language),
+        "audio": {"content": base64.b64encode(audio_bytes).decode("utf-8")}
     }
-    r = requests.post(url, json=body)
-    result = r.json()
+    result = get_upstream("stt").post_json(url, body)
     if "results" in result:
-        return result["results"][0]["alternatives"][0]["transcript"]
+        return " ".join(res["alternatives"][0]["transcript"] for res in result["results"] if res.get("alternatives"))
     return ""
+
+
+def _stt_streaming(chunks, language):
+    """Feed audio chunks to the gRPC streaming recognizer as they arrive."""
+    from google.cloud import speech
+
+    client = speech.SpeechClient()
+    config = speech.StreamingRecognitionConfig(
+        config=speech.RecognitionConfig(
+            encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
+            sample_rate_hertz=STT_SAMPLE_RATE,
+            language_code=language,
+        ),
+        single_utterance=False,
+    )
+    requests_iter = (speech.StreamingRecognizeRequest(audio_content=chunk) for chunk in chunks if chunk)
+    transcript = []
+    for response in client.streaming_recognize(config=config, requests=requests_iter):
+        for result in response.results:
+            if result.is_final and result.alternatives:
+                transcript.append(result.alternatives[0].transcript)
+    return " ".join(transcript).strip()
+
+
+def stream_stt(chunks, language="en-IN"):
+    """Transcribe an iterable of audio byte chunks.
+
+    Uses the streaming recognizer when GOOGLE_STT_STREAMING is enabled (needs
+    service-account credentials); otherwise the chunks are joined in memory and
+    sent to the REST endpoint at GOOGLE_STT_URL.
+    """
+    try:
+        if settings.GOOGLE_STT_STREAMING:
+            # A consumed chunk iterator can't be replayed, so no retries here
+            return get_upstream("stt").call(_stt_streaming, chunks, language, retries=0)
+        return _stt_rest(b"".join(chunks), language)
+    except UpstreamError as e:
+        print(f"[STT Error] {e}")
+        return ""  # treated like silence; the bot asks the user to rephrase
+
+
+def google_stt(audio, language="en-IN"):
+    """Transcribe raw audio bytes, or the audio file at the given path."""
+    if isinstance(audio, (bytes, bytearray)):
+        return stream_stt([bytes(audio)], language=language)
+    with open(audio, "rb") as f:
+        return stream_stt([f.read()], language=language)
@@ -1,4 +1,52 @@
-from deep_translator import GoogleTranslator
+import functools
+from services.http_client import get_upstream
+
+TRANSLATE_URL = "https://translate.google.com/m"
+MAX_CHARS = 5000
+
+
+class TranslationError(Exception):
+    """Google answered but gave no usable translation (bad request, unexpected page)."""
+
+
+@functools.lru_cache(maxsize=64)
+def language_codes(source, target):
+    """Google language codes for source/target given as names or codes.
+
+    Raises deep_translator's LanguageNotSupportedException for unknown languages.
+    """
+    # Imported on first use: deep_translator pulls in bs4 and every provider
+    from deep_translator import GoogleTranslator
+    translator = GoogleTranslator(source=source, target=target)
+    return translator.source, translator.target
+
+
+def _extract_translation(html):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, "html.parser")
+    element = soup.find("div", {"class": "t0"}) or soup.find("div", {"class": "result-container"})
+    if element is None:
+        raise TranslationError("no translation in the response")
+    return element.get_text(strip=True)
+
+
+def translate_text(text, source="auto", target="en"):
+    """Translate through the 'translate' upstream's pooled session and timeout.
+
+    Only connection errors, timeouts and 429/5xx answers count toward the
+    upstream's circuit breaker; bad input, unsupported languages and other
+    4xx answers raise here without touching it.
+    """
+    if not isinstance(text, str) or len(text) >= MAX_CHARS:
+        raise ValueError(f"text must be a string shorter than {MAX_CHARS} characters")
+    text = text.strip()
+    sl, tl = language_codes(source, target)
+    if not text or sl == tl:
+        return text
+    response = get_upstream("translate").request("GET", TRANSLATE_URL, params={"tl": tl, "sl": sl, "q": text})
+    if not 200 <= response.status_code < 300:
+        raise TranslationError(f"HTTP {response.status_code}")
+    return _extract_translation(response.text)
 
 class GoogleTranslateService:
     def __init__(self, default_target="en"):
@@ -16,18 +64,18 @@ class GoogleTranslateService:
         translated = None
 
         try:
-            translated = GoogleTranslator(
-                source=source_lang, target=target
-            ).translate(text)
+            translated = translate_text(text, source=source_lang, target=target)
         except Exception as e:
             print(f"[Translation Error] {e}")
             translated = None
 
         # 🔥 Fallback: if translator failed OR returned empty OR returned same text
         if not translated or translated.strip() == "" or translated.strip().lower() == text.strip().lower():
+            if source_lang == "auto":
+                return translated or text  # the retry below would be the same call
             try:
                 # try once more with source_lang="auto"
-                translated = GoogleTranslator(source="auto", target=target).translate(text)
+                translated = translate_text(text, source="auto", target=target)
             except Exception as e2:
                 print(f"[Fallback Translation Error] {e2}")
                 return text  # final fallback → original
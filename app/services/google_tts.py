@@ -1,18 +1,42 @@
 # app/services/google_tts.py
-import requests
+import re
+import base64
 from config import settings
+from services.http_client import get_upstream
 
-def google_tts(text, out_file, lang="en-IN", voice="en-IN-Wavenet-D"):
-    url = f"https://texttospeech.googleapis.com/v1/text:synthesize?key={settings.GOOGLE_TTS_API_KEY}"
+# Split after sentence-ending punctuation (Latin and Devanagari danda)
+_SENTENCE_END = re.compile(r"(?<=[.!?।])\s+")
+
+
+def synthesize(text, lang="en-IN", voice="en-IN-Wavenet-D"):
+    """Return MP3 bytes for text."""
+    url = f"{settings.GOOGLE_TTS_URL}?key={settings.GOOGLE_TTS_API_KEY}"
     body = {
         "input": {"text": text},
         "voice": {"languageCode": lang, "name": voice},
         "audioConfig": {"audioEncoding": "MP3"}
     }
-    r = requests.post(url, json=body)
-    result = r.json()
+    result = get_upstream("tts").post_json(url, body)
     if "audioContent" in result:
-        with open(out_file, "wb") as f:
-            f.write(bytes(result["audioContent"], "utf-8"))
-    else:
-        raise Exception(f"TTS error: {result}")
+        # audioContent is base64-encoded MP3
+        return base64.b64decode(result["audioContent"])
+    raise Exception(f"TTS error: {result}")
+
+
+def split_sentences(text):
+    return [s for s in (part.strip() for part in _SENTENCE_END.split(text or "")) if s]
+
+
+def google_tts_stream(text, lang="en-IN", voice="en-IN-Wavenet-D"):
+    """Yield MP3 audio sentence by sentence so playback can start early.
+
+    MP3 frames are self-contained, so the chunks concatenate into one
+    playable stream.
+    """
+    for sentence in split_sentences(text):
+        yield synthesize(sentence, lang=lang, voice=voice)
+
+
+def google_tts(text, out_file, lang="en-IN", voice="en-IN-Wavenet-D"):
+    with open(out_file, "wb") as f:
+        f.write(synthesize(text, lang=lang, voice=voice))
@@ -0,0 +1,232 @@
+# app/services/http_client.py
+"""
+Shared outbound HTTP layer for the Google STT/TTS/Translate wrappers.
+
+Each upstream gets its own keep-alive connection pool, timeouts, retry with
+jittered exponential backoff, a circuit breaker and a latency histogram.
+When an upstream's breaker is open, calls raise CircuitOpenError straight
+away and the callers drop to their existing fallbacks (empty transcript,
+untranslated text, no audio) instead of queueing behind a dead service.
+
+Only transient failures are retried and count toward the breaker: for
+request() that is a connection error, a timeout or a 429/5xx answer. Any
+other exception (bad input, a 4xx, a parse error) means the upstream is
+reachable, so it propagates unchanged and the breaker is left alone.
+"""
+import os
+import time
+import random
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import tracing
+import metrics
+from config import settings
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Upper bounds in milliseconds; the last bucket catches everything slower
+LATENCY_BUCKETS_MS = (25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float("inf"))
+
+
+class UpstreamError(Exception):
+    """An upstream call failed after all retries."""
+
+
+class CircuitOpenError(UpstreamError):
+    """The upstream is marked degraded; the call was not attempted."""
+
+
+# What request() treats as the upstream failing (UpstreamError covers 429/5xx)
+TRANSPORT_ERRORS = (requests.ConnectionError, requests.Timeout, UpstreamError)
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures and lets a single
+    trial call through once `reset_timeout` seconds have passed."""
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def release(self):
+        """The call ended without saying anything about the upstream's health."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class LatencyHistogram:
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.total_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, ms):
+        with self._lock:
+            for i, upper in enumerate(self.buckets):
+                if ms <= upper:
+                    self.counts[i] += 1
+                    break
+            self.count += 1
+            self.total_ms += ms
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "count": self.count,
+                "avg_ms": round(self.total_ms / self.count, 1) if self.count else 0.0,
+                "buckets": {("+Inf" if b == float("inf") else str(b)): c for b, c in zip(self.buckets, self.counts)},
+            }
+
+
+class Upstream:
+    def __init__(self, name, timeout=None, retries=None, backoff_ms=None):
+        self.name = name
+        self.timeout = timeout or (settings.HTTP_CONNECT_TIMEOUT, settings.VOICE_HTTP_TIMEOUT)
+        self.retries = settings.HTTP_RETRIES if retries is None else retries
+        self.backoff_ms = backoff_ms or settings.HTTP_BACKOFF_MS
+        self.breaker = CircuitBreaker(settings.BREAKER_FAILURES, settings.BREAKER_RESET_SECONDS)
+        self.latency = LatencyHistogram()
+        self.errors = 0
+        self.rejected = 0
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.HTTP_POOL_SIZE, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _sleep_before_retry(self, attempt):
+        # Full jitter: spreads retries from many workers instead of syncing them up
+        time.sleep(random.uniform(0, self.backoff_ms * (2 ** attempt)) / 1000)
+
+    def call(self, fn, *args, retries=None, transient=Exception, **kwargs):
+        """Run fn(*args, **kwargs) under this upstream's breaker, retries and timing.
+
+        Exceptions matching `transient` are retried and count as failures;
+        others are raised as they are.
+        """
+        if not self.breaker.allow():
+            self.rejected += 1
+            metrics.upstream_call(self.name, "rejected")
+            raise CircuitOpenError(f"{self.name} is unavailable (circuit open)")
+
+        retries = self.retries if retries is None else retries
+        with tracing.span(f"http.{self.name}") as span:
+            return self._call(fn, args, kwargs, retries, transient, span)
+
+    def _call(self, fn, args, kwargs, retries, transient, span):
+        for attempt in range(retries + 1):
+            if span is not None:
+                span.attrs["attempts"] = attempt + 1
+            start = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except transient as e:
+                elapsed = time.perf_counter() - start
+                self.latency.observe(elapsed * 1000)
+                self.errors += 1
+                metrics.upstream_call(self.name, "error", elapsed)
+                if attempt < retries:
+                    self._sleep_before_retry(attempt)
+                    continue
+                self.breaker.record_failure()
+                raise UpstreamError(f"{self.name} failed: {e}") from e
+            except Exception:
+                self.breaker.release()
+                raise
+            elapsed = time.perf_counter() - start
+            self.latency.observe(elapsed * 1000)
+            metrics.upstream_call(self.name, "success", elapsed)
+            self.breaker.record_success()
+            return result
+
+    def request(self, method, url, **kwargs):
+        """Pooled HTTP request; retries connection errors and 429/5xx responses."""
+        kwargs.setdefault("timeout", self.timeout)
+
+        def send():
+            r = self.session.request(method, url, **kwargs)
+            if r.status_code in RETRY_STATUSES:
+                raise UpstreamError(f"HTTP {r.status_code}")
+            return r
+
+        return self.call(send, transient=TRANSPORT_ERRORS)
+
+    def post_json(self, url, body, **kwargs):
+        return self.request("POST", url, json=body, **kwargs).json()
+
+    def stats(self):
+        return {
+            "state": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "errors": self.errors,
+            "rejected": self.rejected,
+            "latency": self.latency.snapshot(),
+        }
+
+
+_upstreams = {}
+_upstreams_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    # Fresh sessions (and breakers) in a forked worker; pooled connections stay with the parent
+    global _upstreams_lock
+    _upstreams.clear()
+    _upstreams_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_upstream(name):
+    with _upstreams_lock:
+        if name not in _upstreams:
+            _upstreams[name] = Upstream(name)
+        return _upstreams[name]
+
+
+def stats():
+    with _upstreams_lock:
+        upstreams = dict(_upstreams)
+    return {name: u.stats() for name, u in upstreams.items()}
@@ -0,0 +1,47 @@
+# app/services/lang_packs.py
+"""
+Per-language UI string packs for /lang/<lang>.
+
+static/lang/lang.json is split into one pack per language when it is loaded
+(and again whenever the file changes). Each pack is kept as ready-to-send
+JSON bytes with gzip and, if the brotli module is installed, brotli variants,
+so a request only picks a representation and writes it.
+"""
+import json
+
+from config import BASE_DIR
+from services.file_cache import FileCache
+from services.precompressed import Precompressed
+
+LANG_FILE = BASE_DIR / "static" / "lang" / "lang.json"
+DEFAULT_LANG = "english"
+
+
+class LangPack(Precompressed):
+    def __init__(self, lang, data):
+        self.lang = lang
+        body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        super().__init__(body, lang)
+
+
+def _build(path):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return {lang: LangPack(lang, strings) for lang, strings in data.items() if isinstance(strings, dict)}
+
+
+_packs = FileCache(LANG_FILE, _build)
+
+
+def get_pack(lang):
+    """Pack for lang, the English pack for unknown languages, or None."""
+    packs = _packs.get()
+    return packs.get(lang) or packs.get(DEFAULT_LANG)
+
+
+def preload():
+    _packs.get()
+
+
+def respond(pack):
+    return pack.respond("application/json", "public, max-age=300, stale-while-revalidate=86400")
@@ -0,0 +1,158 @@
+# app/services/metadata_cache.py
+"""
+Per-hospital cache of departments and doctors for the /meta endpoints.
+
+Each hospital's snapshot is loaded once, indexed by id and department, and
+stamped with a version hash of its content. Rows are kept as the immutable
+Department/Doctor records of services.records. The hash is the ETag, so browsers
+and nginx revalidate with a 304 instead of downloading the lists again.
+
+Snapshots are dropped when a SessionLocal session commits changes to
+Department or Doctor rows of that hospital (admin edits and other ORM writes),
+and in any case after METADATA_CACHE_TTL seconds so writes made by other
+worker processes or by bulk_import.py are picked up.
+"""
+import json
+import time
+import hashlib
+import threading
+
+from flask import Response, request, session
+from sqlalchemy import event
+
+import json_provider
+import metrics
+from config import settings
+from config_db import SessionLocal, DATABASE_URL
+from models import Department, Doctor
+from services import records
+from tenant import canonical_hospital_id, get_current_hospital_id
+
+_lock = threading.Lock()
+_snapshots = {}  # hospital_id -> MetadataSnapshot
+
+
+class MetadataSnapshot:
+    def __init__(self, hospital_id, departments, doctors):
+        """departments/doctors are the data_service dicts; the hash is taken from them."""
+        payload = json.dumps([departments, doctors], sort_keys=True, default=str)
+        self.version = hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+        self.hospital_id = hospital_id
+        self.departments = tuple(records.Department.from_dict(d) for d in departments)
+        self.doctors = tuple(records.Doctor.from_dict(d) for d in doctors)
+        self.departments_by_id = {str(d.id): d for d in self.departments}
+        self.doctors_by_id = {str(d.id): d for d in self.doctors}
+        by_department = {}
+        for doc in self.doctors:
+            by_department.setdefault(str(doc.department_id), []).append(doc)
+        self.doctors_by_department = {k: tuple(v) for k, v in by_department.items()}
+        self.loaded_at = time.monotonic()
+        self._bodies = {}
+
+    @property
+    def expired(self):
+        return time.monotonic() - self.loaded_at > settings.METADATA_CACHE_TTL
+
+    def body(self, key, value):
+        """JSON bytes for a response, serialized once per snapshot."""
+        if key not in self._bodies:
+            metrics.cache_lookup("response_body", False)
+            self._bodies[key] = json_provider.dumps_bytes(value)
+        else:
+            metrics.cache_lookup("response_body", True)
+        return self._bodies[key]
+
+
+def _load(hospital_id):
+    if DATABASE_URL.startswith("postgresql"):
+        from services import data_service_db as ds
+        return ds.list_departments(hospital_id=hospital_id), ds.list_doctors(None, hospital_id=hospital_id)
+    # SQLite development setup serves the JSON data
+    from services import data_service_json as json_ds
+    return json_ds.list_departments(), json_ds.list_doctors(None)
+
+
+def get(hospital_id=None):
+    """Current snapshot for a hospital, loading it if missing or expired."""
+    hospital_id = canonical_hospital_id(hospital_id) or settings.DEFAULT_HOSPITAL_ID
+    snap = _snapshots.get(hospital_id)
+    if snap is not None and not snap.expired:
+        metrics.cache_lookup("metadata", True)
+        return snap
+    metrics.cache_lookup("metadata", False)
+    departments, doctors = _load(hospital_id)
+    snap = MetadataSnapshot(hospital_id, departments, doctors)
+    with _lock:
+        _snapshots[hospital_id] = snap
+    return snap
+
+
+def invalidate(hospital_id=None):
+    """Drop one hospital's snapshot, or every snapshot when hospital_id is None."""
+    with _lock:
+        if hospital_id is None:
+            _snapshots.clear()
+        else:
+            _snapshots.pop(canonical_hospital_id(hospital_id), None)
+
+
+def respond(snap, key, value, status=200):
+    """JSON response with the snapshot's ETag; 304 when the client is current."""
+    etag = f"meta-{snap.version}"
+    if status == 200 and request.if_none_match.contains(etag):
+        resp = Response(status=304)
+    else:
+        resp = Response(snap.body(key, value), status=status, mimetype="application/json")
+    resp.set_etag(etag)
+    # Logged-in callers may be scoped to a hospital the URL doesn't show
+    scope = "private" if request.headers.get("Authorization") or session.get("hospital_id") else "public"
+    resp.headers["Cache-Control"] = (
+        f"{scope}, max-age={settings.METADATA_MAX_AGE}, "
+        f"stale-while-revalidate={settings.METADATA_STALE_WHILE_REVALIDATE}"
+    )
+    return resp
+
+
+# --- Invalidation on commit ---
+_WATCHED = (Department, Doctor)
+_ALL = object()
+
+
+def _mark(db_session, hospital_id):
+    changed = db_session.info.setdefault("metadata_changed", set())
+    changed.add(_ALL if hospital_id is None else hospital_id)
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _record_changes(db_session, flush_context):
+    for obj in list(db_session.new) + list(db_session.dirty) + list(db_session.deleted):
+        if isinstance(obj, _WATCHED):
+            _mark(db_session, getattr(obj, "hospital_id", None))
+
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _record_bulk_changes(execute_state):
+    # query.update()/delete() and update()/delete() statements skip the flush
+    if not (execute_state.is_update or execute_state.is_delete):
+        return
+    mapper = execute_state.bind_mapper
+    if mapper is not None and mapper.class_ in _WATCHED:
+        _mark(execute_state.session, get_current_hospital_id())
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _invalidate_committed(db_session):
+    changed = db_session.info.pop("metadata_changed", None)
+    if not changed:
+        return
+    if _ALL in changed:
+        invalidate()
+    else:
+        for hospital_id in changed:
+            invalidate(hospital_id)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_changes(db_session):
+    db_session.info.pop("metadata_changed", None)
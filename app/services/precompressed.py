@@ -0,0 +1,47 @@
+# app/services/precompressed.py
+import gzip
+import hashlib
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+
+class Precompressed:
+    """A response body kept ready to send as identity, gzip and brotli.
+
+    Compression happens once when the object is built; serving only picks the
+    representation the client accepts. Each representation has its own strong
+    ETag derived from the content and `tag`.
+    """
+
+    def __init__(self, body, tag):
+        digest = hashlib.sha256(body).hexdigest()[:16]
+        self.variants = {"identity": (body, f"{tag}-{digest}")}
+        self.variants["gzip"] = (gzip.compress(body, compresslevel=9, mtime=0), f"{tag}-{digest}-gz")
+        if brotli is not None:
+            self.variants["br"] = (brotli.compress(body, quality=11), f"{tag}-{digest}-br")
+
+    def choose(self, accept_encodings):
+        """Best encoding the client accepts, preferring the smallest."""
+        for encoding in ("br", "gzip"):
+            if encoding in self.variants and accept_encodings[encoding] > 0:
+                return encoding
+        return "identity"
+
+    def respond(self, mimetype, cache_control):
+        encoding = self.choose(request.accept_encodings)
+        body, etag = self.variants[encoding]
+        if request.if_none_match.contains(etag):
+            resp = Response(status=304)
+        else:
+            resp = Response(body, mimetype=mimetype)
+            if encoding != "identity":
+                resp.headers["Content-Encoding"] = encoding
+        resp.set_etag(etag)
+        resp.headers["Vary"] = "Accept-Encoding"
+        resp.headers["Cache-Control"] = cache_control
+        return resp
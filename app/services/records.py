@@ -0,0 +1,179 @@
+# app/services/records.py
+"""
+Immutable records for the hospital metadata every worker keeps in memory.
+
+The query engine (services.ai), the /meta snapshot cache and the slip
+generator all hold the same departments and doctors, once per hospital.
+As plain dicts every doctor costs a hash table per row and per translated
+name; these classes use __slots__ (no per-instance __dict__), tuples instead
+of lists, and interned strings, so repeated names and day lists are stored
+once.
+
+Records are frozen, so a snapshot can be shared between threads without
+copying. to_dict() gives the JSON shape the API has always returned, and
+json_provider encodes records through it.
+"""
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import NamedTuple
+
+# Language names and codes the data files and callers use -> LocalizedText field
+_LANG_FIELDS = {
+    "en": "en", "english": "en",
+    "hi": "hi", "hindi": "hi",
+    "mr": "mr", "marathi": "mr",
+}
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+@dataclass(frozen=True, slots=True)
+class LocalizedText:
+    """A value in English, Hindi and Marathi; None where a translation is missing."""
+    en: str | None = None
+    hi: str | None = None
+    mr: str | None = None
+
+    @classmethod
+    def of(cls, value):
+        """From a {"en"/"english": ...} dict, or a plain string used for every language."""
+        if isinstance(value, LocalizedText) or value is None:
+            return value
+        if isinstance(value, dict):
+            fields = {}
+            for key, text in value.items():
+                field = _LANG_FIELDS.get(key.lower())
+                if field:
+                    fields[field] = _intern(text)
+            return cls(**fields)
+        text = _intern(str(value))
+        return cls(text, text, text)
+
+    def pick(self, lang="english"):
+        """Text for a language name or code, falling back to English."""
+        field = _LANG_FIELDS.get(lang.lower(), "en")
+        text = getattr(self, field)
+        if text is None:
+            text = self.en
+        return text or ""
+
+    def to_dict(self):
+        return {"en": self.en, "hi": self.hi, "mr": self.mr}
+
+
+def pick(value, lang="english"):
+    """Text of a LocalizedText or plain value, like ai.pick_lang for dicts."""
+    if isinstance(value, LocalizedText):
+        return value.pick(lang)
+    return value or ""
+
+
+@dataclass(frozen=True, slots=True)
+class Doctor:
+    id: str | None
+    name: LocalizedText
+    department_id: str | None = None
+    education: LocalizedText | str | None = None
+    experience: str | None = None
+    fees: float | None = None
+    available_days: tuple = ()
+    start_time: str | None = None
+    end_time: str | None = None
+    photo: str | None = None
+    timings: LocalizedText | None = None
+
+    @classmethod
+    def from_dict(cls, d):
+        """From a data_service doctor dict or a doctor in hospital_info.json."""
+        days = d.get("available_days") or ()
+        if isinstance(days, str):
+            days = [day.strip() for day in days.split(",") if day.strip()]
+        education = d.get("education", d.get("qualification"))
+        return cls(
+            id=_intern(d.get("id")),
+            name=LocalizedText.of(d.get("name", "")),
+            department_id=_intern(d.get("department_id")),
+            education=LocalizedText.of(education) if isinstance(education, dict) else _intern(education),
+            experience=_intern(d.get("experience")),
+            fees=d.get("fees"),
+            available_days=tuple(_intern(day) for day in days),
+            start_time=_intern(d.get("start_time")),
+            end_time=_intern(d.get("end_time")),
+            photo=d.get("photo"),
+            timings=LocalizedText.of(d.get("timings")),
+        )
+
+    def to_dict(self):
+        d = {
+            "id": self.id,
+            "department_id": self.department_id,
+            "name": self.name,
+            "education": self.education,
+            "experience": self.experience,
+            "fees": self.fees,
+            "available_days": list(self.available_days),
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "photo": self.photo,
+        }
+        if self.timings is not None:
+            d["timings"] = self.timings
+        return d
+
+
+@dataclass(frozen=True, slots=True)
+class Department:
+    id: str | None
+    name: LocalizedText
+    fees: float | None = None
+    doctors: tuple = ()  # Doctor records, for data that nests them (hospital_info.json)
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(
+            id=_intern(d.get("id")),
+            name=LocalizedText.of(d.get("name", "")),
+            fees=d.get("fees"),
+            doctors=tuple(Doctor.from_dict(doc) for doc in d.get("doctors", ())),
+        )
+
+    @property
+    def key(self):
+        """English name; what the query engine and its synonym tables key on."""
+        return self.name.pick("english")
+
+    def to_dict(self):
+        return {"id": self.id, "name": self.name}
+
+
+@dataclass(frozen=True, slots=True)
+class Slot:
+    value: str    # HH:MM, what bookings store
+    display: str  # 12-hour clock for the UI
+
+    def to_dict(self):
+        return {"value": self.value, "display": self.display}
+
+
+@lru_cache(maxsize=64)
+def slot_grid(start="10:00", end="17:00", minutes=15):
+    """Every slot from start up to end; shared by all doctors with the same hours."""
+    cur = datetime.strptime(start, "%H:%M")
+    stop = datetime.strptime(end, "%H:%M")
+    slots = []
+    while cur < stop:
+        slots.append(Slot(cur.strftime("%H:%M"), cur.strftime("%I:%M %p")))
+        cur += timedelta(minutes=minutes)
+    return tuple(slots)
+
+
+class IndexEntry(NamedTuple):
+    """One spelling of a doctor's name in the query engine's doctor index."""
+    match_key: str
+    dept_key: str
+    dept: Department
+    doc: Doctor
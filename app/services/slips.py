@@ -1,44 +1,63 @@
 import io
 import pathlib
-import qrcode
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.lib.styles import ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
-from reportlab.lib.units import inch
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.lib.enums import TA_CENTER, TA_LEFT
-from reportlab import rl_config
+import threading
 
+import tracing
+import metrics
 from config import BASE_DIR
 
-# --- Ensure ReportLab uses UTF-8 ---
-rl_config.warnOnMissingFontGlyphs = 0
-rl_config.defaultEncoding = "utf-8"
+# reportlab, qrcode and the font are loaded with the first slip (or by
+# preload() in the gunicorn master), not at import: they are the slowest
+# imports in the app and most requests never render a PDF.
 
-# --- Font Registration with Devanagari Support ---
+# --- Font with Devanagari Support ---
 NOTO_SANS_FONT_NAME = "NotoSansDevanagari"
-NOTO_SANS_REGISTERED = False
-
-try:
-    devanagari_font_path = BASE_DIR / "static" / "fonts" / "NotoSansDevanagari-Regular.ttf"
-    fallback_font_path = BASE_DIR / "static" / "fonts" / "NotoSans-Regular.ttf"
-
-    if devanagari_font_path.exists():
-        pdfmetrics.registerFont(TTFont(NOTO_SANS_FONT_NAME, str(devanagari_font_path), subfontIndex=0, validate=True))
-        NOTO_SANS_REGISTERED = True
-        print(f"DEBUG: Registered {devanagari_font_path}")
-    elif fallback_font_path.exists():
-        pdfmetrics.registerFont(TTFont("NotoSans", str(fallback_font_path), subfontIndex=0, validate=True))
-        NOTO_SANS_FONT_NAME = "NotoSans"
-        NOTO_SANS_REGISTERED = True
-        print(f"DEBUG: Registered fallback {fallback_font_path}")
-    else:
-        print("DEBUG: No NotoSans font found. Devanagari may not render properly.")
-
-except Exception as e:
-    print(f"DEBUG: Error registering fonts: {e}")
+_devanagari_font_path = BASE_DIR / "static" / "fonts" / "NotoSansDevanagari-Regular.ttf"
+_fallback_font_path = BASE_DIR / "static" / "fonts" / "NotoSans-Regular.ttf"
+
+if _devanagari_font_path.exists():
+    _font_path = _devanagari_font_path
+elif _fallback_font_path.exists():
+    _font_path = _fallback_font_path
+    NOTO_SANS_FONT_NAME = "NotoSans"
+else:
+    _font_path = None
+
+# True once the font is registered; assumed from the file until then
+NOTO_SANS_REGISTERED = _font_path is not None
+
+_pdf_lock = threading.Lock()
+_pdf_ready = False
+
+
+def preload():
+    """Import reportlab and qrcode and register the font; later calls are free."""
+    global _pdf_ready, NOTO_SANS_REGISTERED
+    if _pdf_ready:
+        return
+    with _pdf_lock:
+        if _pdf_ready:
+            return
+        import qrcode  # noqa: F401  (imported here so the first slip doesn't pay for it)
+        import reportlab.platypus  # noqa: F401
+        from reportlab import rl_config
+        from reportlab.pdfbase import pdfmetrics
+        from reportlab.pdfbase.ttfonts import TTFont
+
+        # --- Ensure ReportLab uses UTF-8 ---
+        rl_config.warnOnMissingFontGlyphs = 0
+        rl_config.defaultEncoding = "utf-8"
+
+        if _font_path is None:
+            print("DEBUG: No NotoSans font found. Devanagari may not render properly.")
+        else:
+            try:
+                pdfmetrics.registerFont(TTFont(NOTO_SANS_FONT_NAME, str(_font_path), subfontIndex=0, validate=True))
+                print(f"DEBUG: Registered {_font_path}")
+            except Exception as e:
+                NOTO_SANS_REGISTERED = False
+                print(f"DEBUG: Error registering fonts: {e}")
+        _pdf_ready = True
 
 
 # --- Helper Function for Devanagari Digits ---
@@ -92,7 +111,18 @@ def format_time_with_lang(time_str, lang="en"):
 
 
 # --- PDF Generation Function ---
+@tracing.traced("slip_pdf")
+@metrics.slip_render
 def generate_pdf_for_appointment(appt, lang="en"):
+    preload()
+    import qrcode
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib import colors
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
+    from reportlab.lib.units import inch
+    from reportlab.lib.enums import TA_CENTER, TA_LEFT
+
     slip_dir = pathlib.Path(BASE_DIR) / "data" / "slips"
     slip_dir.mkdir(parents=True, exist_ok=True)
 
@@ -100,12 +130,14 @@ def generate_pdf_for_appointment(appt, lang="en"):
     slip_path = slip_dir / f"{appt_id_str}.pdf"
 
     # --- Get doctor & department localized ---
-    from services import data_service_json as ds
-    dept_info = next((d for d in ds.list_departments() if d["id"] == appt.get("department_id")), None)
-    doc_info = next((d for d in ds.list_doctors(None) if d["id"] == appt.get("doctor_id")), None)
-
-    dept_display = dept_info["name"].get(lang, dept_info["name"]["en"]) if dept_info else appt.get("department", "")
-    doc_display = doc_info["name"].get(lang, doc_info["name"]["en"]) if doc_info else appt.get("doctor", "")
+    from services import metadata_cache
+    from tenant import get_current_hospital_id
+    meta = metadata_cache.get(appt.get("hospital_id") or get_current_hospital_id())
+    dept_info = meta.departments_by_id.get(str(appt.get("department_id")))
+    doc_info = meta.doctors_by_id.get(str(appt.get("doctor_id")))
+
+    dept_display = dept_info.name.pick(lang) if dept_info else appt.get("department", "")
+    doc_display = doc_info.name.pick(lang) if doc_info else appt.get("doctor", "")
 
     # --- Format date/time properly ---
     time_display = format_time_with_lang(appt.get("time", "00:00"), lang)
@@ -0,0 +1,140 @@
+# app/services/tts_cache.py
+"""
+Content-addressed cache of synthesized speech.
+
+Audio is stored on disk as <sha256>.mp3, where the digest covers the text,
+language and voice, so identical bot replies are only ever synthesized once
+and the file can be served with send_file and a far-future Cache-Control.
+The directory is capped at TTS_CACHE_MAX_MB; least recently used files go
+first.
+"""
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import metrics
+from config import settings
+from services.google_tts import synthesize
+
+CACHE_DIR = Path(settings.TTS_CACHE_DIR)
+
+_lock = threading.Lock()
+_index = None  # digest -> size, oldest first
+_total_bytes = 0
+
+
+def cache_key(text, lang, voice):
+    return hashlib.sha256(f"{lang}\0{voice}\0{text}".encode("utf-8")).hexdigest()
+
+
+def path_for(digest):
+    return CACHE_DIR / f"{digest}.mp3"
+
+
+def _load_index():
+    """Scan the cache directory once, ordered by last use (mtime)."""
+    global _index, _total_bytes
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    entries = []
+    for p in CACHE_DIR.glob("*.mp3"):
+        try:
+            st = p.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((st.st_mtime, p.stem, st.st_size))
+    entries.sort()
+    _index = OrderedDict((digest, size) for _, digest, size in entries)
+    _total_bytes = sum(_index.values())
+
+
+def _touch(digest):
+    with _lock:
+        if _index is None:
+            _load_index()
+        if digest in _index:
+            _index.move_to_end(digest)
+    try:
+        os.utime(path_for(digest))
+    except FileNotFoundError:
+        pass
+
+
+def _store(digest, audio):
+    global _total_bytes
+    path = path_for(digest)
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(audio)
+    os.replace(tmp, path)  # atomic, so readers never see a partial file
+
+    with _lock:
+        if _index is None:
+            _load_index()
+        _total_bytes += len(audio) - _index.pop(digest, 0)
+        _index[digest] = len(audio)
+        max_bytes = settings.TTS_CACHE_MAX_MB * 1024 * 1024
+        while len(_index) > 1 and _total_bytes > max_bytes:
+            old, size = _index.popitem(last=False)
+            _total_bytes -= size
+            try:
+                path_for(old).unlink()
+            except FileNotFoundError:
+                pass
+
+
+def get_or_synthesize(text, lang="en-IN", voice="en-IN-Wavenet-D"):
+    """Return (digest, mp3 bytes), synthesizing and storing on a miss."""
+    digest = cache_key(text, lang, voice)
+    try:
+        with open(path_for(digest), "rb") as f:
+            audio = f.read()
+        _touch(digest)
+        metrics.cache_lookup("tts", True)
+        return digest, audio
+    except FileNotFoundError:
+        metrics.cache_lookup("tts", False)
+    audio = synthesize(text, lang=lang, voice=voice)
+    _store(digest, audio)
+    return digest, audio
+
+
+def synthesize_cached(text, lang="en-IN", voice="en-IN-Wavenet-D"):
+    """Drop-in for google_tts.synthesize that goes through the cache."""
+    return get_or_synthesize(text, lang=lang, voice=voice)[1]
+
+
+def precompute(items):
+    """Synthesize every (text, lang, voice) not cached yet; returns how many were new."""
+    created = 0
+    for text, lang, voice in items:
+        if not text or path_for(cache_key(text, lang, voice)).is_file():
+            continue
+        try:
+            get_or_synthesize(text, lang=lang, voice=voice)
+            created += 1
+        except Exception as e:
+            print(f"[TTS cache] Precompute failed for {text[:40]!r}: {e}")
+            break  # upstream is down or misconfigured; try again next build
+    return created
+
+
+def precompute_async(items):
+    """Run precompute on a daemon thread so building a knowledge base stays fast."""
+    if not settings.TTS_PRECOMPUTE:
+        return None
+    items = list(items)
+    if not items:
+        return None
+    t = threading.Thread(target=precompute, args=(items,), name="tts-precompute", daemon=True)
+    t.start()
+    return t
+
+
+def stats():
+    with _lock:
+        if _index is None:
+            _load_index()
+        return {"files": len(_index), "bytes": _total_bytes, "max_bytes": settings.TTS_CACHE_MAX_MB * 1024 * 1024}
@@ -0,0 +1,223 @@
+# app/services/voice_pipeline.py
+import os
+import re
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import tracing
+from config import settings
+from services import tts_cache
+
+logger = logging.getLogger(__name__)
+
+# Wavenet voice per STT/TTS language code
+VOICE_MAP = {
+    "en-IN": "en-IN-Wavenet-D",
+    "hi-IN": "hi-IN-Wavenet-A",
+    "mr-IN": "mr-IN-Wavenet-A"
+}
+
+
+# STT/TTS language code → language name used by the query engine
+VOICE_LANG_NAMES = {
+    "en": "english",
+    "hi": "hindi",
+    "mr": "marathi",
+}
+
+# Language name → STT/TTS language code
+TTS_LANG_CODES = {
+    "english": "en-IN",
+    "hindi": "hi-IN",
+    "marathi": "mr-IN",
+}
+
+# Played while the answer is being worked out
+ACKNOWLEDGEMENTS = {
+    "english": "One moment please.",
+    "hindi": "कृपया एक क्षण रुकें।",
+    "marathi": "कृपया एक क्षण थांबा.",
+}
+
+SPEECH_LABELS = {
+    "english": {
+        "address": "Address", "phone": "Phone", "opd": "OPD timings", "emergency": "Emergency",
+        "visiting": "Visiting hours", "departments": "Our departments are", "fees": "consultation fee",
+        "rupees": "rupees", "available": "available", "symptom": "For {symptom}, please visit {department}.",
+        "doctors_in": "Doctors in {department}",
+    },
+    "hindi": {
+        "address": "पता", "phone": "फोन", "opd": "ओपीडी समय", "emergency": "आपातकालीन",
+        "visiting": "मुलाकात का समय", "departments": "हमारे विभाग हैं", "fees": "परामर्श शुल्क",
+        "rupees": "रुपये", "available": "उपलब्ध", "symptom": "{symptom} के लिए कृपया {department} विभाग में जाएँ।",
+        "doctors_in": "{department} के डॉक्टर",
+    },
+    "marathi": {
+        "address": "पत्ता", "phone": "फोन", "opd": "ओपीडी वेळ", "emergency": "आपत्कालीन",
+        "visiting": "भेटीची वेळ", "departments": "आमचे विभाग आहेत", "fees": "सल्ला शुल्क",
+        "rupees": "रुपये", "available": "उपलब्ध", "symptom": "{symptom} साठी कृपया {department} विभागात जा.",
+        "doctors_in": "{department} मधील डॉक्टर",
+    },
+}
+
+_DEVANAGARI = re.compile(r"[\u0900-\u097F]")
+
+_executor = None
+
+
+def voice_for(lang):
+    return VOICE_MAP.get(lang, "en-IN-Wavenet-D")
+
+
+def language_name(lang):
+    """'hi-IN' → 'hindi'."""
+    return VOICE_LANG_NAMES.get((lang or "en").split("-")[0].lower(), "english")
+
+
+def _reset_after_fork():
+    # The pool's threads don't exist in a forked child; start a new pool on first use
+    global _executor
+    _executor = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def executor():
+    """Shared worker pool for the I/O-bound voice stages (TTS, translation)."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.VOICE_WORKERS, thread_name_prefix="voice")
+    return _executor
+
+
+def acknowledgement_audio(lang, lang_name):
+    """MP3 for the short acknowledgement (served from the TTS cache after the first time)."""
+    return tts_cache.synthesize_cached(ACKNOWLEDGEMENTS[lang_name], lang=lang, voice=voice_for(lang))
+
+
+def needs_translation(text, lang_name):
+    """Hindi/Marathi text without any Devanagari is still in English."""
+    return lang_name != "english" and bool(text) and not _DEVANAGARI.search(text)
+
+
+def render_speech(answer, lang_name="english"):
+    """Turn a localized /queries answer into sentences to be spoken."""
+    labels = SPEECH_LABELS.get(lang_name, SPEECH_LABELS["english"])
+    kind = answer.get("type")
+    sentences = []
+
+    def doctor_sentences(doctors):
+        for d in doctors:
+            line = d.get("name", "")
+            if d.get("timings"):
+                line += f", {labels['available']} {d['timings']}"
+            if d.get("fees"):
+                line += f", {labels['fees']} {d['fees']} {labels['rupees']}"
+            sentences.append(line + ".")
+
+    if kind == "contact":
+        sentences.append(f"{answer.get('name', '')}.")
+        sentences.append(f"{labels['address']}: {answer.get('address', '')}.")
+        sentences.append(f"{labels['phone']}: {answer.get('phone', '')}.")
+    elif kind == "timings":
+        sentences.append(f"{labels['opd']}: {answer.get('opd', '')}.")
+        sentences.append(f"{labels['emergency']}: {answer.get('emergency', '')}.")
+        sentences.append(f"{labels['visiting']}: {answer.get('visiting', '')}.")
+    elif kind == "departments":
+        sentences.append(f"{labels['departments']}: {', '.join(answer.get('departments', []))}.")
+    elif kind == "doctors":
+        if answer.get("department") and answer["department"] != "All":
+            sentences.append(labels["doctors_in"].format(department=answer["department"]) + ".")
+        doctor_sentences(answer.get("doctors", []))
+    elif kind == "symptom":
+        sentences.append(labels["symptom"].format(symptom=answer.get("symptom", ""), department=answer.get("department", "")))
+        doctor_sentences(answer.get("doctors", []))
+    elif kind == "services":
+        for name, desc in answer.get("services", {}).items():
+            sentences.append(f"{desc}." if desc else f"{name}.")
+    elif kind == "process":
+        sentences.extend(f"{step}".rstrip(".।") + "." for step in answer.get("steps", []))
+    else:
+        sentences.append(str(answer.get("answer", "")))
+    return [s for s in sentences if s.strip(" .:")]
+
+
+def iter_upload_chunks(file_storage, chunk_size=None):
+    """Read an uploaded file in chunks straight from the request stream."""
+    chunk_size = chunk_size or settings.VOICE_UPLOAD_CHUNK_BYTES
+    stream = file_storage.stream
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+class StageTimer:
+    """Wall-clock timings for the stages of one voice turn.
+
+    Usage:
+        timer = StageTimer()
+        with timer("stt"):
+            ...
+        if settings.TRACE_SERVER_TIMING:
+            response.headers["Server-Timing"] = timer.server_timing()
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+        # Stages may finish on pool threads; keep the request's trace at hand
+        self.trace = tracing.current()
+
+    @contextmanager
+    def __call__(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000)
+
+    def record(self, name, ms):
+        self.stages[name] = self.stages.get(name, 0.0) + ms
+        if self.trace is not None:
+            self.trace.record(f"voice.{name}", ms)
+
+    def total_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def server_timing(self):
+        parts = [f"{name};dur={ms:.1f}" for name, ms in self.stages.items()]
+        parts.append(f"total;dur={self.total_ms():.1f}")
+        return ", ".join(parts)
+
+    def log(self, label="voice"):
+        stages = " ".join(f"{name}={ms:.1f}ms" for name, ms in self.stages.items())
+        logger.info("%s timings %s total=%.1fms", label, stages, self.total_ms())
+
+
+def precompute_static_speech(kb):
+    """Queue TTS for every fixed answer of a knowledge base, in all languages."""
+    from services.ai import localize_answer
+
+    items = []
+    for lang_name, lang in TTS_LANG_CODES.items():
+        voice = voice_for(lang)
+        items.append((ACKNOWLEDGEMENTS[lang_name], lang, voice))
+        for answer in kb.static_answers(lang_name):
+            for sentence in render_speech(localize_answer(answer, lang_name), lang_name):
+                # Sentences that would be machine-translated at reply time won't match
+                if not needs_translation(sentence, lang_name):
+                    items.append((sentence, lang, voice))
+    return tts_cache.precompute_async(dict.fromkeys(items))
+
+
+def speech_digests(answer, lang_name="english"):
+    """TTS cache digests for a localized answer, one per spoken sentence."""
+    lang = TTS_LANG_CODES.get(lang_name, "en-IN")
+    voice = voice_for(lang)
+    sentences = render_speech(answer, lang_name)
+    return list(executor().map(lambda s: tts_cache.get_or_synthesize(s, lang=lang, voice=voice)[0], sentences))
@@ -0,0 +1,75 @@
+# app/services/widget_bootstrap.py
+"""
+Per-hospital widget bootstrap served at /widget/<hospital_id>/embed.js.
+
+Host pages only download a ~2 KB script with the hospital's widget config
+inlined; it draws the chat button and loads the full widget (the fingerprinted
+widget.js bundle) the first time the button is clicked or hovered. The full
+widget takes the inlined config instead of calling the widget config API.
+
+Rendered bootstraps are kept per hospital and origin with their compressed
+variants, and re-rendered only when the config or the widget bundle changes.
+"""
+import json
+import threading
+from collections import OrderedDict
+
+from flask import render_template, request
+
+import metrics
+from config import settings
+from services import assets
+from services.precompressed import Precompressed
+
+MAX_BOOTSTRAPS = 500
+
+_lock = threading.Lock()
+_bootstraps = OrderedDict()  # (hospital_id, origin) -> (source, Precompressed)
+
+
+def _client_config(widget_config, origin):
+    """The widget's own option names, with URLs made absolute for host pages."""
+    return {
+        "hospitalId": widget_config["hospital_id"],
+        "name": widget_config["name"],
+        "logoUrl": origin + widget_config["logo_url"],
+        "primaryColor": widget_config["primary_color"],
+        "secondaryColor": widget_config["secondary_color"],
+        "features": widget_config["features"],
+        "apiBaseUrl": origin + "/api/v1",
+        "widgetUrl": origin + "/widget",
+        "preloaded": True,
+    }
+
+
+def get(hospital_id, widget_config):
+    """Rendered bootstrap for a hospital, from cache while its inputs are unchanged."""
+    origin = request.host_url.rstrip("/")
+    config = _client_config(widget_config, origin)
+    widget_src = origin + assets.asset_urls("widget.js")[0]
+    source = json.dumps([config, widget_src], sort_keys=True)
+
+    key = (hospital_id, origin)
+    cached = _bootstraps.get(key)
+    if cached is not None and cached[0] == source:
+        metrics.cache_lookup("response_body", True)
+        return cached[1]
+    metrics.cache_lookup("response_body", False)
+
+    body = render_template("widget/bootstrap.js", config=config, widget_src=widget_src)
+    boot = Precompressed(body.encode("utf-8"), "widget")
+    with _lock:
+        _bootstraps[key] = (source, boot)
+        _bootstraps.move_to_end(key)
+        # Hospital ids come from the URL; don't let unknown ones pile up
+        while len(_bootstraps) > MAX_BOOTSTRAPS:
+            _bootstraps.popitem(last=False)
+    return boot
+
+
+def respond(boot):
+    return boot.respond(
+        "application/javascript",
+        f"public, max-age={settings.WIDGET_BOOTSTRAP_MAX_AGE}, "
+        f"stale-while-revalidate={settings.WIDGET_BOOTSTRAP_STALE_WHILE_REVALIDATE}",
+    )
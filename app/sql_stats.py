@@ -0,0 +1,219 @@
+# app/sql_stats.py
+"""
+SQL statement fingerprints, per-request query counts and N+1 detection.
+
+Every statement the engine runs is reduced to a fingerprint: literals and
+bind parameters become ?, IN lists collapse to IN (?...), whitespace is
+normalized, so the same query with different values counts as one.
+Per fingerprint the process keeps executions and total time (served at
+/admin/sql), and Prometheus gets the same as counters (metrics.py).
+
+Within a request, a fingerprint executed more than SQL_N_PLUS_ONE_THRESHOLD
+times is flagged as an N+1 pattern: a per-row query in a loop, e.g. looking
+up each appointment's doctor name separately. Flagged requests are logged
+on the "sql" logger and counted in sql_n_plus_one_total{endpoint,fingerprint}.
+Statements slower than SQL_SLOW_MS are logged as well.
+
+With SQL_STATS_HEADER (on in development) responses carry
+
+    X-SQL-Queries: count=14; time_ms=9.8; n_plus_one=3f9c1a2b7d4e:12
+"""
+import re
+import time
+import hashlib
+import logging
+import threading
+from contextvars import ContextVar
+
+from flask import g, request
+from sqlalchemy import event
+
+import metrics
+from config import settings
+
+logger = logging.getLogger("sql")
+
+_current = ContextVar("sql_stats", default=None)
+
+_lock = threading.Lock()
+_totals = {}        # fingerprint -> Fingerprint, for this process
+_fingerprints = {}  # raw statement -> (fingerprint, normalized); statements repeat verbatim
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_PARAMS = re.compile(r"%\(\w+\)s|%s|:\w+|\$\d+|\?")
+_NUMBERS = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.I)
+_VALUES_LIST = re.compile(r"\bVALUES\s*\(\s*\?(?:\s*,\s*\?)*\s*\)(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))*", re.I)
+_SPACES = re.compile(r"\s+")
+
+
+def normalize(statement):
+    """The statement with literals, parameters and list lengths taken out."""
+    s = _COMMENTS.sub(" ", statement)
+    s = _STRINGS.sub("?", s)
+    s = _PARAMS.sub("?", s)
+    s = _NUMBERS.sub("?", s)
+    s = _IN_LIST.sub("IN (?...)", s)
+    s = _VALUES_LIST.sub("VALUES (?...)", s)
+    return _SPACES.sub(" ", s).strip()
+
+
+def fingerprint(statement):
+    """(12-hex-digit id, normalized text) of a statement."""
+    cached = _fingerprints.get(statement)
+    if cached is None:
+        text = normalize(statement)
+        cached = (hashlib.sha1(text.encode("utf-8")).hexdigest()[:12], text)
+        if len(_fingerprints) < settings.SQL_FINGERPRINT_MAX:
+            _fingerprints[statement] = cached
+    return cached
+
+
+class Fingerprint:
+    __slots__ = ("id", "statement", "count", "total_ms", "max_ms")
+
+    def __init__(self, fp_id, statement):
+        self.id = fp_id
+        self.statement = statement
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms):
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def to_dict(self):
+        return {
+            "fingerprint": self.id,
+            "statement": self.statement[:settings.SQL_STATEMENT_MAX_CHARS],
+            "count": self.count,
+            "total_ms": round(self.total_ms, 2),
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 2),
+        }
+
+
+class RequestStats:
+    """Statements of one request, by fingerprint."""
+
+    def __init__(self):
+        self.by_fingerprint = {}
+        self.count = 0
+        self.total_ms = 0.0
+
+    def add(self, fp_id, text, ms):
+        entry = self.by_fingerprint.get(fp_id)
+        if entry is None:
+            entry = self.by_fingerprint[fp_id] = Fingerprint(fp_id, text)
+        entry.add(ms)
+        self.count += 1
+        self.total_ms += ms
+
+    def repeated(self, threshold):
+        """Fingerprints run more than `threshold` times, most executed first."""
+        hits = [e for e in self.by_fingerprint.values() if e.count > threshold]
+        return sorted(hits, key=lambda e: e.count, reverse=True)
+
+
+def current():
+    """The active request's RequestStats, or None."""
+    return _current.get()
+
+
+# --- Engine events ---
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("sql_stats_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("sql_stats_start")
+    if not starts:
+        return
+    ms = (time.perf_counter() - starts.pop()) * 1000
+    fp_id, text = fingerprint(statement)
+
+    with _lock:
+        entry = _totals.get(fp_id)
+        if entry is None and len(_totals) < settings.SQL_FINGERPRINT_MAX:
+            entry = _totals[fp_id] = Fingerprint(fp_id, text)
+        if entry is not None:
+            entry.add(ms)
+    if entry is not None:  # keeps the fingerprint label set bounded too
+        metrics.sql_statement(fp_id, ms / 1000)
+
+    stats = _current.get()
+    if stats is not None:
+        stats.add(fp_id, text, ms)
+    if settings.SQL_SLOW_MS and ms >= settings.SQL_SLOW_MS:
+        logger.warning("Slow SQL %.1fms [%s] %s", ms, fp_id, text[:settings.SQL_STATEMENT_MAX_CHARS])
+
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("sql_stats_start"):
+        conn.info["sql_stats_start"].pop()
+
+
+# --- Requests ---
+def _begin_request():
+    g._sql_stats_token = _current.set(RequestStats())
+
+
+def _add_header(response):
+    stats = _current.get()
+    if stats is None:
+        return response
+    repeated = stats.repeated(settings.SQL_N_PLUS_ONE_THRESHOLD)
+    g._sql_stats_repeated = repeated
+    if settings.SQL_STATS_HEADER:
+        value = f"count={stats.count}; time_ms={stats.total_ms:.1f}"
+        if repeated:
+            value += "; n_plus_one=" + ",".join(f"{e.id}:{e.count}" for e in repeated)
+        response.headers["X-SQL-Queries"] = value
+    return response
+
+
+def _end_request(exc=None):
+    token = g.pop("_sql_stats_token", None)
+    if token is None:
+        return
+    stats = _current.get()
+    _current.reset(token)
+    if stats is None or not stats.count:
+        return
+    endpoint = request.endpoint or "unmatched"
+    repeated = g.pop("_sql_stats_repeated", None)
+    if repeated is None:
+        repeated = stats.repeated(settings.SQL_N_PLUS_ONE_THRESHOLD)
+    metrics.sql_request(endpoint, stats.count, [e.id for e in repeated])
+    for e in repeated:
+        logger.warning(
+            "Possible N+1: %s %s ran [%s] %d times (%.1fms): %s",
+            request.method, request.path, e.id, e.count, e.total_ms,
+            e.statement[:settings.SQL_STATEMENT_MAX_CHARS],
+        )
+
+
+def top(limit=50, order="total_ms"):
+    """This process's fingerprints, most expensive first."""
+    with _lock:
+        entries = [e.to_dict() for e in _totals.values()]
+    if order not in ("total_ms", "count", "mean_ms", "max_ms"):
+        order = "total_ms"
+    entries.sort(key=lambda e: e[order], reverse=True)
+    return entries[:limit]
+
+
+def init_app(app, engine):
+    if not settings.SQL_STATS_ENABLED:
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+    app.before_request(_begin_request)
+    app.after_request(_add_header)
+    app.teardown_request(_end_request)
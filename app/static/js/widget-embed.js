@@ -38,6 +38,8 @@
         }
 
         async loadHospitalConfig() {
+            // The embed.js bootstrap already inlined the hospital's config
+            if (this.config.preloaded) return;
             try {
                 const response = await fetch(`${this.config.apiBaseUrl}/hospitals/${this.config.hospitalId}/widget/config`);
                 const data = await response.json();
@@ -651,6 +653,16 @@
 
     // Auto-initialize widget
     function initializeWidget() {
+        // Loaded on demand by the /widget/<id>/embed.js bootstrap
+        const bootstrap = window.hospitalChatBootstrap;
+        if (bootstrap && bootstrap.config) {
+            if (window.hospitalChatWidget) return;
+            window.hospitalChatWidget = new HospitalChatWidget(bootstrap.config);
+            if (bootstrap.open) window.hospitalChatWidget.openChat();
+            if (bootstrap.onReady) bootstrap.onReady(window.hospitalChatWidget);
+            return;
+        }
+
         // Get hospital ID from script src or data attribute
         const scripts = document.getElementsByTagName('script');
         let hospitalId = null;
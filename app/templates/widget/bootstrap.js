@@ -0,0 +1,76 @@
+/**
+ * Hospital Chat Widget Bootstrap ({{ config.hospitalId }})
+ * Draws the chat button and loads the full widget when it is first used.
+ */
+(function() {
+    'use strict';
+
+    if (window.hospitalChatBootstrap) return;
+
+    var config = {{ config|tojson }};
+    var widgetSrc = {{ widget_src|tojson }};
+    var button = null;
+    var requested = false;
+
+    window.hospitalChatBootstrap = {
+        config: config,
+        open: true,
+        onReady: function() {
+            if (button) button.remove();
+        }
+    };
+
+    function loadWidget() {
+        if (requested) return;
+        requested = true;
+        button.style.opacity = '0.7';
+        var script = document.createElement('script');
+        script.src = widgetSrc;
+        script.async = true;
+        script.onerror = function() {
+            requested = false;
+            button.style.opacity = '1';
+        };
+        document.head.appendChild(script);
+    }
+
+    function prefetchWidget() {
+        var link = document.createElement('link');
+        link.rel = 'prefetch';
+        link.as = 'script';
+        link.href = widgetSrc;
+        document.head.appendChild(link);
+    }
+
+    function init() {
+        // Same data attributes the full widget reads
+        var holder = document.getElementById('hospital-chat-widget');
+        if (holder) {
+            ['position', 'size', 'primaryColor', 'secondaryColor'].forEach(function(key) {
+                if (holder.dataset[key]) config[key] = holder.dataset[key];
+            });
+        }
+
+        var edges = (config.position || 'bottom-right').split('-');
+        button = document.createElement('button');
+        button.type = 'button';
+        button.id = 'hospital-chat-bootstrap';
+        button.setAttribute('aria-label', 'Chat with ' + config.name);
+        button.textContent = '💬';
+        button.style.cssText = 'position:fixed;' + edges[0] + ':20px;' + edges[1] + ':20px;' +
+            'z-index:999999;width:60px;height:60px;border:0;border-radius:50%;cursor:pointer;' +
+            'font-size:24px;color:#fff;box-shadow:0 4px 20px rgba(0,0,0,0.15);' +
+            'background:linear-gradient(135deg,' + config.primaryColor + ' 0%,' + config.secondaryColor + ' 100%);';
+        button.addEventListener('click', loadWidget);
+        // The user is about to click; start fetching the widget in the background
+        button.addEventListener('mouseenter', prefetchWidget, { once: true });
+        button.addEventListener('focus', prefetchWidget, { once: true });
+        document.body.appendChild(button);
+    }
+
+    if (document.readyState === 'loading') {
+        document.addEventListener('DOMContentLoaded', init);
+    } else {
+        init();
+    }
+})();
@@ -0,0 +1,132 @@
+# app/tenant.py
+"""
+Tenant (hospital) scoping.
+
+The hospital for a request is resolved once in a before_request hook and kept
+in a context variable. While it is set, every ORM query, UPDATE and DELETE
+issued through SessionLocal against a tenant model is filtered on
+hospital_id, and new tenant rows are stamped with it on flush. Code running
+outside a request (scripts, migrations) has no tenant and sees all rows.
+"""
+from contextvars import ContextVar
+from contextlib import contextmanager
+
+import jwt
+from flask import request, session, g
+from sqlalchemy import event
+from sqlalchemy.orm import with_loader_criteria
+
+from config import settings
+from config_db import SessionLocal
+from models import Department, Doctor, Appointment, HospitalInfo
+
+TENANT_MODELS = (Department, Doctor, Appointment, HospitalInfo)
+
+# Older links and the v1 API use these ids for the default hospital
+HOSPITAL_ID_ALIASES = {
+    "xyz_hospital": "xyz",
+}
+
+_current_hospital_id = ContextVar("current_hospital_id", default=None)
+
+
+def canonical_hospital_id(hospital_id):
+    if not hospital_id:
+        return None
+    hospital_id = str(hospital_id).strip()
+    return HOSPITAL_ID_ALIASES.get(hospital_id, hospital_id)
+
+def get_current_hospital_id():
+    """Hospital id of the current request, or None outside a tenant scope."""
+    return _current_hospital_id.get()
+
+def set_current_hospital_id(hospital_id):
+    """Set the tenant for the current context; returns a token for reset."""
+    return _current_hospital_id.set(canonical_hospital_id(hospital_id))
+
+def id_in_use(db_session, model, row_id):
+    """True when any hospital has a model row with this id.
+
+    Department and doctor ids are global primary keys; the usual tenant
+    filter would hide another hospital's row and let the insert collide.
+    """
+    query = db_session.query(model.id).filter(model.id == row_id)
+    return query.execution_options(all_tenants=True).first() is not None
+
+@contextmanager
+def tenant_scope(hospital_id):
+    """Run a block (e.g. a background job) scoped to one hospital."""
+    token = set_current_hospital_id(hospital_id)
+    try:
+        yield
+    finally:
+        _current_hospital_id.reset(token)
+
+def _hospital_id_from_jwt():
+    auth = request.headers.get("Authorization", "")
+    if not auth.startswith("Bearer "):
+        return None
+    from api_routes import JWT_SECRET_KEY
+    try:
+        data = jwt.decode(auth[7:], JWT_SECRET_KEY, algorithms=["HS256"])
+        return data.get("hospital_id")
+    except jwt.PyJWTError:
+        return None
+
+def resolve_hospital_id():
+    """Work out the hospital for the current request.
+
+    Authenticated identities win over anything the client can put in the URL:
+    a valid JWT, then the admin login session, then the <hospital_id> path
+    segment or ?hospital_id= query parameter, then the configured default.
+    """
+    hospital_id = (
+        _hospital_id_from_jwt()
+        or session.get("hospital_id")
+        or (request.view_args or {}).get("hospital_id")
+        or request.args.get("hospital_id")
+        or settings.DEFAULT_HOSPITAL_ID
+    )
+    return canonical_hospital_id(hospital_id)
+
+def _begin_request():
+    hospital_id = resolve_hospital_id()
+    g.hospital_id = hospital_id
+    g._tenant_token = _current_hospital_id.set(hospital_id)
+
+def _end_request(exc=None):
+    token = g.pop("_tenant_token", None)
+    if token is not None:
+        _current_hospital_id.reset(token)
+
+def init_app(app):
+    app.before_request(_begin_request)
+    app.teardown_request(_end_request)
+
+
+# --- Automatic filter injection ---
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _inject_tenant_criteria(execute_state):
+    hospital_id = _current_hospital_id.get()
+    if hospital_id is None:
+        return
+    if not (execute_state.is_select or execute_state.is_update or execute_state.is_delete):
+        return
+    if execute_state.is_column_load or execute_state.is_relationship_load:
+        return
+    if execute_state.execution_options.get("all_tenants", False):
+        return
+    options = [
+        with_loader_criteria(model, lambda cls: cls.hospital_id == hospital_id, include_aliases=True)
+        for model in TENANT_MODELS
+    ]
+    execute_state.statement = execute_state.statement.options(*options)
+
+@event.listens_for(SessionLocal, "before_flush")
+def _stamp_new_rows(db_session, flush_context, instances):
+    hospital_id = _current_hospital_id.get()
+    if hospital_id is None:
+        return
+    for obj in db_session.new:
+        if isinstance(obj, TENANT_MODELS) and getattr(obj, "hospital_id", None) is None:
+            obj.hospital_id = hospital_id
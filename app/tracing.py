@@ -0,0 +1,424 @@
+# app/tracing.py
+"""
+Request tracing: request ids, timed spans and one structured log line per request.
+
+init_app() starts a trace for every request. Its id comes from an incoming
+X-Request-ID (or W3C traceparent) header, or is generated, and is sent back
+in X-Request-ID. Code marks the stages it wants timed with
+
+    with tracing.span("faq_match"):
+        ...
+
+or @tracing.traced("slip_pdf"). SQL statements (SQLAlchemy cursor events)
+and outbound API calls (services.http_client) are recorded as spans too.
+When the request ends, its spans are written as a single JSON object to the
+"tracing" logger, summed per stage into the Server-Timing header (in
+development, or with TRACE_SERVER_TIMING set), and, if
+TRACE_EXPORT_URL is set, posted in OTLP/HTTP JSON form to a collector (an
+OpenTelemetry collector, or trace_collector_stub.py locally) from a
+background thread.
+
+Routes that catch an exception and return an error response call
+tracing.record_error() so the traceback lands in the request's log line.
+
+Outside a request (startup, background threads) span() does nothing.
+"""
+import os
+import re
+import time
+import uuid
+import queue
+import logging
+import threading
+import traceback
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import g, got_request_exception, request
+from sqlalchemy import event
+
+import json_provider
+from config import settings
+
+logger = logging.getLogger("tracing")
+
+_current = ContextVar("trace", default=None)
+_parent_span = ContextVar("trace_parent_span", default=None)
+
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+_TRACEPARENT = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+_HEX32 = re.compile(r"^[0-9a-f]{32}$")
+
+# Requests not worth a log line; they still get an X-Request-ID
+_UNTRACED_ENDPOINTS = {"static", "static_dist"}
+
+
+def _span_id():
+    return os.urandom(8).hex()
+
+
+class Span:
+    __slots__ = ("span_id", "parent_id", "name", "start", "duration_ms", "attrs", "error")
+
+    def __init__(self, name, start, parent_id=None, attrs=None):
+        self.span_id = _span_id()
+        self.parent_id = parent_id
+        self.name = name
+        self.start = start  # time.perf_counter()
+        self.duration_ms = 0.0
+        self.attrs = attrs or {}
+        self.error = None
+
+
+class Trace:
+    """Spans of one request. Spans may be added from worker threads."""
+
+    def __init__(self, request_id, trace_id, parent_span_id=None):
+        self.request_id = request_id
+        self.trace_id = trace_id
+        self.root_id = _span_id()
+        self.parent_span_id = parent_span_id
+        self.started = time.perf_counter()
+        self.started_ns = time.time_ns()
+        self.spans = []
+        self.dropped = 0
+        self.error = None
+
+    def add(self, span):
+        if len(self.spans) < settings.TRACE_MAX_SPANS:
+            self.spans.append(span)
+        else:
+            self.dropped += 1
+
+    def record(self, name, ms, **attrs):
+        """Add an already measured stage, e.g. from a timer of its own."""
+        span = Span(name, time.perf_counter() - ms / 1000, self.root_id, attrs)
+        span.duration_ms = ms
+        self.add(span)
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def stage_totals(self):
+        """Milliseconds per span name, in first-seen order."""
+        totals = {}
+        for s in list(self.spans):
+            totals[s.name] = totals.get(s.name, 0.0) + s.duration_ms
+        return totals
+
+    def server_timing(self):
+        parts = [f"{name.replace('.', '_')};dur={ms:.1f}" for name, ms in self.stage_totals().items()]
+        parts.append(f"total;dur={self.elapsed_ms():.1f}")
+        return ", ".join(parts)
+
+    def _unix_ns(self, perf):
+        return self.started_ns + int((perf - self.started) * 1e9)
+
+
+def current():
+    """The active request's Trace, or None."""
+    return _current.get()
+
+
+def request_id():
+    trace = _current.get()
+    return trace.request_id if trace else None
+
+
+@contextmanager
+def span(name, **attrs):
+    """Time the enclosed block as a span of the current request."""
+    trace = _current.get()
+    if trace is None:
+        yield None
+        return
+    s = Span(name, time.perf_counter(), _parent_span.get() or trace.root_id, attrs)
+    token = _parent_span.set(s.span_id)
+    try:
+        yield s
+    except Exception as e:
+        s.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _parent_span.reset(token)
+        s.duration_ms = (time.perf_counter() - s.start) * 1000
+        trace.add(s)
+
+
+def record_error():
+    """Attach the exception being handled to the request's trace, for routes
+    that catch it and return an error response themselves."""
+    trace = _current.get()
+    if trace is not None:
+        trace.error = traceback.format_exc().strip()
+
+
+def traced(name):
+    """Decorator form of span()."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# --- Request lifecycle ---
+def _incoming_ids():
+    """(request_id, trace_id, parent_span_id) from the request headers."""
+    trace_id = parent = None
+    match = _TRACEPARENT.match(request.headers.get("traceparent", ""))
+    if match:
+        trace_id, parent = match.groups()
+
+    rid = request.headers.get("X-Request-ID", "")
+    if not _REQUEST_ID.match(rid):
+        rid = trace_id or uuid.uuid4().hex
+    if trace_id is None:
+        trace_id = rid if _HEX32.match(rid) else uuid.uuid4().hex
+    return rid, trace_id, parent
+
+
+def _begin_request():
+    rid, trace_id, parent = _incoming_ids()
+    trace = Trace(rid, trace_id, parent)
+    g._trace_token = _current.set(trace)
+
+
+def _add_headers(response):
+    trace = _current.get()
+    if trace is None:
+        return response
+    response.headers["X-Request-ID"] = trace.request_id
+    # Routes with a more specific timer (the voice pipeline) set their own
+    if settings.TRACE_SERVER_TIMING and "Server-Timing" not in response.headers:
+        response.headers["Server-Timing"] = trace.server_timing()
+    g._trace_status = response.status_code
+    return response
+
+
+def _record_exception(sender, exception, **extra):
+    trace = _current.get()
+    if trace is not None:
+        trace.error = "".join(traceback.format_exception(exception)).strip()
+
+
+def _end_request(exc=None):
+    token = g.pop("_trace_token", None)
+    if token is None:
+        return
+    trace = _current.get()
+    _current.reset(token)
+    if trace is None or request.endpoint in _UNTRACED_ENDPOINTS:
+        return
+    if exc is not None and trace.error is None:
+        trace.error = "".join(traceback.format_exception(exc)).strip()
+    duration = trace.elapsed_ms()
+    status = g.pop("_trace_status", 500 if exc is not None else None)
+    if duration >= settings.TRACE_LOG_MIN_MS or trace.error:
+        _log(trace, duration, status)
+    if _exporter is not None:
+        _exporter.submit(trace, duration, status, request.method, request.path, request.endpoint)
+
+
+def _log(trace, duration, status):
+    db = [s for s in trace.spans if s.name == "db"]
+    record = {
+        "request_id": trace.request_id,
+        "trace_id": trace.trace_id,
+        "method": request.method,
+        "path": request.path,
+        "endpoint": request.endpoint,
+        "status": status,
+        "hospital_id": g.get("hospital_id"),
+        "duration_ms": round(duration, 2),
+        "stages": {name: round(ms, 2) for name, ms in trace.stage_totals().items()},
+        "db_queries": len(db),
+        "spans": [
+            {
+                "name": s.name,
+                "start_ms": round((s.start - trace.started) * 1000, 2),
+                "duration_ms": round(s.duration_ms, 2),
+                **({"attrs": s.attrs} if s.attrs else {}),
+                **({"error": s.error} if s.error else {}),
+            }
+            for s in list(trace.spans)
+        ],
+    }
+    if trace.dropped:
+        record["spans_dropped"] = trace.dropped
+    if trace.error:
+        record["error"] = trace.error
+    line = json_provider.dumps_bytes(record).decode("utf-8")
+    # The JSON log format merges the fields in; the text format prints the line
+    logger.log(logging.ERROR if trace.error else logging.INFO, line, extra={"fields": record})
+
+
+# --- SQL statements ---
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("trace_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    trace = _current.get()
+    starts = conn.info.get("trace_query_start")
+    if trace is None or not starts:
+        return
+    start = starts.pop()
+    s = Span("db", start, _parent_span.get() or trace.root_id,
+             {"statement": statement[:settings.TRACE_SQL_MAX_CHARS]})
+    s.duration_ms = (time.perf_counter() - start) * 1000
+    trace.add(s)
+
+
+def _handle_db_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("trace_query_start"):
+        conn.info["trace_query_start"].pop()
+
+
+# --- Export ---
+def _otlp_attrs(attrs):
+    out = []
+    for key, value in attrs.items():
+        if isinstance(value, bool):
+            out.append({"key": key, "value": {"boolValue": value}})
+        elif isinstance(value, int):
+            out.append({"key": key, "value": {"intValue": str(value)}})
+        elif isinstance(value, float):
+            out.append({"key": key, "value": {"doubleValue": value}})
+        elif value is not None:
+            out.append({"key": key, "value": {"stringValue": str(value)}})
+    return out
+
+
+def _otlp_spans(trace, duration, status, method, path, endpoint):
+    root = {
+        "traceId": trace.trace_id,
+        "spanId": trace.root_id,
+        "name": f"{method} {endpoint or path}",
+        "kind": 2,  # SERVER
+        "startTimeUnixNano": str(trace.started_ns),
+        "endTimeUnixNano": str(trace.started_ns + int(duration * 1e6)),
+        "attributes": _otlp_attrs({
+            "http.method": method, "http.target": path, "http.status_code": status,
+            "request.id": trace.request_id,
+        }),
+        "status": {"code": 2, "message": trace.error.splitlines()[-1]} if trace.error else {"code": 0},
+    }
+    if trace.parent_span_id:
+        root["parentSpanId"] = trace.parent_span_id
+    spans = [root]
+    for s in list(trace.spans):
+        start_ns = trace._unix_ns(s.start)
+        spans.append({
+            "traceId": trace.trace_id,
+            "spanId": s.span_id,
+            "parentSpanId": s.parent_id,
+            "name": s.name,
+            "kind": 3 if s.name == "db" or s.name.startswith("http.") else 1,  # CLIENT / INTERNAL
+            "startTimeUnixNano": str(start_ns),
+            "endTimeUnixNano": str(start_ns + int(s.duration_ms * 1e6)),
+            "attributes": _otlp_attrs(s.attrs),
+            "status": {"code": 2, "message": s.error} if s.error else {"code": 0},
+        })
+    return spans
+
+
+class _Exporter:
+    """Posts finished traces to TRACE_EXPORT_URL in batches, off the request path.
+
+    The queue is bounded; when the collector can't keep up, traces are dropped
+    rather than held in memory or slowing requests down.
+    """
+
+    def __init__(self, url):
+        from services.http_client import Upstream
+        self.url = url
+        self.upstream = Upstream("trace_export", timeout=(1, 3), retries=0)
+        self.queue = queue.Queue(maxsize=settings.TRACE_EXPORT_QUEUE)
+        self.dropped = 0
+        self.exported = 0
+        self.thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _ensure_thread(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            if self._pid is not None:
+                # Forked from the process that built this (gunicorn preload_app):
+                # its thread and queue were not inherited in a usable state
+                self.queue = queue.Queue(maxsize=settings.TRACE_EXPORT_QUEUE)
+            self.thread = threading.Thread(target=self._run, name="trace-export", daemon=True)
+            self._pid = os.getpid()
+            self.thread.start()
+
+    def submit(self, trace, *request_info):
+        self._ensure_thread()
+        try:
+            self.queue.put_nowait((trace, request_info))
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + settings.TRACE_EXPORT_INTERVAL
+            while len(batch) < settings.TRACE_EXPORT_BATCH:
+                try:
+                    batch.append(self.queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            self._send(batch)
+
+    def _send(self, batch):
+        spans = []
+        for trace, request_info in batch:
+            spans.extend(_otlp_spans(trace, *request_info))
+        payload = {"resourceSpans": [{
+            "resource": {"attributes": _otlp_attrs({"service.name": settings.TRACE_SERVICE_NAME})},
+            "scopeSpans": [{"scope": {"name": "tracing"}, "spans": spans}],
+        }]}
+        try:
+            self.upstream.request("POST", self.url, data=json_provider.dumps_bytes(payload),
+                                  headers={"Content-Type": "application/json"})
+            self.exported += len(batch)
+        except Exception as e:
+            self.dropped += len(batch)
+            print(f"[TRACE] Export to {self.url} failed: {e}")
+
+
+_exporter = None
+
+
+def stats():
+    return {
+        "enabled": settings.TRACE_ENABLED,
+        "export_url": settings.TRACE_EXPORT_URL or None,
+        "exported": _exporter.exported if _exporter else 0,
+        "export_dropped": _exporter.dropped if _exporter else 0,
+    }
+
+
+def init_app(app, engine):
+    global _exporter
+    if not settings.TRACE_ENABLED:
+        return
+    app.before_request(_begin_request)
+    app.after_request(_add_headers)
+    app.teardown_request(_end_request)
+    got_request_exception.connect(_record_exception, app)
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_db_error)
+
+    if settings.TRACE_EXPORT_URL and _exporter is None:
+        _exporter = _Exporter(settings.TRACE_EXPORT_URL)
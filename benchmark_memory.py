@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Metadata Memory Benchmark
+Measures how much memory one tenant's departments and doctors take in a
+worker, as parsed JSON dicts (how the query engine and /meta cache used to
+keep them) and as the services.records instances they are kept as now.
+
+Per tenant this covers what both copies hold: the departments with their
+doctors and the doctor name index of the query engine, and the department
+and doctor lists of the /meta snapshot. Tenants are generated with distinct
+names so nothing is shared between them except what interning shares.
+
+Usage:
+    python benchmark_memory.py [--tenants 50] [--departments 20] [--doctors 10]
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(ROOT, "app")
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
+
+
+def tenant_json(t, departments, doctors):
+    """hospital_info.json-style departments and data_service-style rows, as JSON text."""
+    depts, meta_depts, meta_docs = [], [], []
+    for d in range(departments):
+        dept_name = {"english": f"Department {t}-{d}", "hindi": f"विभाग {t}-{d}", "marathi": f"विभाग {t}-{d}"}
+        docs = []
+        for i in range(doctors):
+            doc_id = f"dr_{t}_{d}_{i}"
+            name = {"english": f"Dr. Name {t}-{d}-{i}", "hindi": f"डॉ. नाम {t}-{d}-{i}", "marathi": f"डॉ. नाम {t}-{d}-{i}"}
+            docs.append({
+                "name": name,
+                "qualification": "MBBS, MD",
+                "experience": f"{i + 3} years",
+                "fees": 400 + 50 * d,
+                "timings": {"english": "10:00 AM - 2:00 PM", "hindi": "सुबह 10 बजे - दोपहर 2 बजे",
+                            "marathi": "सकाळी १० - दुपारी २"},
+            })
+            meta_docs.append({
+                "id": doc_id, "department_id": f"dept_{t}_{d}",
+                "name": {"en": name["english"], "hi": name["hindi"], "mr": name["marathi"]},
+                "education": "MBBS, MD", "experience": f"{i + 3} years", "fees": 400.0 + 50 * d,
+                "available_days": DAYS[:5], "start_time": "10:00", "end_time": "17:00", "photo": None,
+            })
+        depts.append({"name": dept_name, "head": docs[0]["name"], "fees": 400 + 50 * d, "doctors": docs})
+        meta_depts.append({"id": f"dept_{t}_{d}",
+                           "name": {"en": dept_name["english"], "hi": dept_name["hindi"], "mr": dept_name["marathi"]}})
+    return json.dumps([depts, meta_depts, meta_docs], ensure_ascii=False)
+
+
+def as_dicts(text, ai):
+    """The parsed JSON as kept before, with the old dict-per-entry doctor index."""
+    depts, meta_depts, meta_docs = json.loads(text)
+    index = []
+    for dept in depts:
+        dept_key = ai.pick_lang(dept["name"], "english")
+        for doc in dept["doctors"]:
+            names = list(doc["name"].values())
+            for n in set(names + [ai._clean_doctor_name(n) for n in names]):
+                index.append({"match_key": ai._clean_doctor_name(n), "dept_key": dept_key, "dept": dept, "doc": doc})
+    return depts, index, meta_depts, meta_docs
+
+
+def as_records(text, ai, records):
+    """The same data as services.records instances."""
+    depts, meta_depts, meta_docs = json.loads(text)
+    depts = tuple(records.Department.from_dict(d) for d in depts)
+    index = []
+    for dept in depts:
+        for doc in dept.doctors:
+            names = [n for n in (doc.name.en, doc.name.hi, doc.name.mr) if n is not None]
+            for n in set(names + [ai._clean_doctor_name(n) for n in names]):
+                index.append(records.IndexEntry(ai._clean_doctor_name(n), dept.key, dept, doc))
+    return (depts, tuple(index),
+            tuple(records.Department.from_dict(d) for d in meta_depts),
+            tuple(records.Doctor.from_dict(d) for d in meta_docs))
+
+
+def measure(build, texts):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = [build(text) for text in texts]
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del kept
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tenants", type=int, default=50)
+    parser.add_argument("--departments", type=int, default=20)
+    parser.add_argument("--doctors", type=int, default=10, help="doctors per department")
+    args = parser.parse_args()
+
+    os.chdir(APP_DIR)
+    sys.path.insert(0, APP_DIR)
+    from services import ai, records
+
+    texts = [tenant_json(t, args.departments, args.doctors) for t in range(args.tenants)]
+    dict_bytes = measure(lambda text: as_dicts(text, ai), texts)
+    record_bytes = measure(lambda text: as_records(text, ai, records), texts)
+
+    doctors = args.departments * args.doctors
+    print(f"{args.tenants} tenants x {args.departments} departments x {args.doctors} doctors ({doctors} per tenant)")
+    print(f"{'':<10}{'per tenant':>14}{'per doctor':>14}")
+    for label, size in (("dicts", dict_bytes), ("records", record_bytes)):
+        per_tenant = size / args.tenants
+        print(f"{label:<10}{per_tenant / 1024:>11.1f} KB{per_tenant / doctors:>12.0f} B")
+    print(f"Reduction: {100 * (1 - record_bytes / dict_bytes):.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Voice Turn Benchmark
+Runs /api/voice end to end against voice_stub_server.py with simulated STT/TTS
+latency and reports per-stage timings, time to first audio byte and total
+turn time.
+
+Usage:
+    python benchmark_voice.py [--turns 20] [--lang en-IN] [--stt-ms 300] [--tts-ms 150]
+"""
+import argparse
+import io
+import os
+import statistics
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(ROOT, "app")
+
+
+def start_stub(port, stt_ms, tts_ms):
+    os.environ["STUB_STT_DELAY_MS"] = str(stt_ms)
+    os.environ["STUB_TTS_DELAY_MS"] = str(tts_ms)
+    sys.path.insert(0, ROOT)
+    import voice_stub_server
+    from http.server import ThreadingHTTPServer
+
+    voice_stub_server.STT_DELAY = stt_ms / 1000
+    voice_stub_server.TTS_DELAY = tts_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", port), voice_stub_server.StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def parse_server_timing(header):
+    stages = {}
+    for part in (header or "").split(","):
+        name, _, dur = part.strip().partition(";dur=")
+        if dur:
+            stages[name] = float(dur)
+    return stages
+
+
+def pct(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark a /api/voice turn with stubbed services")
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--lang", default="en-IN")
+    parser.add_argument("--stt-ms", type=float, default=300)
+    parser.add_argument("--tts-ms", type=float, default=150)
+    parser.add_argument("--port", type=int, default=8099)
+    args = parser.parse_args()
+
+    stub = start_stub(args.port, args.stt_ms, args.tts_ms)
+    os.environ["GOOGLE_STT_URL"] = f"http://127.0.0.1:{args.port}/v1/speech:recognize"
+    os.environ["GOOGLE_TTS_URL"] = f"http://127.0.0.1:{args.port}/v1/text:synthesize"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("TRACE_SERVER_TIMING", "True")  # the per-stage numbers come from this header
+
+    os.chdir(APP_DIR)
+    sys.path.insert(0, APP_DIR)
+    from app import app
+
+    client = app.test_client()
+    audio = b"\x00\x01" * 16000  # one second of 16kHz LINEAR16
+    rows = []
+    print(f"🎙️  {args.turns} voice turns, lang={args.lang}, stub STT {args.stt_ms:.0f}ms, TTS {args.tts_ms:.0f}ms/sentence")
+
+    for _ in range(args.turns):
+        start = time.perf_counter()
+        resp = client.post(
+            "/api/voice",
+            base_url="https://localhost",
+            data={"lang": args.lang, "audio": (io.BytesIO(audio), "turn.wav")},
+            content_type="multipart/form-data",
+            buffered=False,
+        )
+        headers_ms = (time.perf_counter() - start) * 1000
+        chunks = resp.iter_encoded()
+        first = next(chunks, b"")
+        first_ms = (time.perf_counter() - start) * 1000
+        size = len(first) + sum(len(c) for c in chunks)
+        total_ms = (time.perf_counter() - start) * 1000
+        resp.close()
+
+        if resp.status_code != 200:
+            print(f"❌ HTTP {resp.status_code}")
+            continue
+        row = parse_server_timing(resp.headers.get("Server-Timing"))
+        row.update({"headers": headers_ms, "first_audio": first_ms, "turn_total": total_ms, "bytes": size})
+        rows.append(row)
+
+    stub.shutdown()
+    if not rows:
+        print("❌ No successful turns")
+        sys.exit(1)
+
+    print(f"\n{'stage':<16}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}")
+    for name in rows[0]:
+        if name == "bytes":
+            continue
+        values = [r[name] for r in rows if name in r]
+        print(f"{name:<16}{pct(values, 0.5):>10.1f}{pct(values, 0.95):>10.1f}{statistics.mean(values):>10.1f}")
+
+    serial = args.stt_ms + args.tts_ms * 2  # acknowledgement + at least one sentence, back to back
+    print(f"\n📊 Median time to first audio: {pct([r['first_audio'] for r in rows], 0.5):.1f}ms "
+          f"(serial STT+TTS lower bound would be ≥ {serial:.0f}ms)")
+    print(f"📊 Median full turn: {pct([r['turn_total'] for r in rows], 0.5):.1f}ms, {rows[0]['bytes']} audio bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Static Asset Build
+Bundles the per-page JS/CSS listed in app/services/assets.py, minifies them,
+writes content-hashed files with gzip/brotli siblings to app/static/dist/ and
+subsets the Devanagari font to the characters the app actually shows.
+
+Usage:
+    python build_assets.py [--no-minify] [--no-fonts]
+
+Optional tools, used when installed:
+    rjsmin / rcssmin   JS and CSS minification (CSS falls back to a simple
+                       comment/whitespace stripper, JS to plain concatenation)
+    brotli             .br variants next to the .gz ones
+    fonttools          Devanagari subset as woff2 (skipped otherwise)
+
+nginx serves the .gz files directly with `gzip_static on`; without nginx the
+app's /static/dist/ route picks the .br/.gz variant itself.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(ROOT, "app")
+sys.path.insert(0, APP_DIR)
+
+from services.assets import BUNDLES, DIST_DIR, STATIC_DIR  # noqa: E402
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+FONT_DIR = STATIC_DIR / "fonts"
+# Weights used by the UI: regular text and bold headings/buttons
+FONT_WEIGHTS = {400: "NotoSansDevanagari-Regular.ttf", 700: "NotoSansDevanagari-Bold.ttf"}
+# Same family name as the pages' primary font, so browsers use the subset for
+# Devanagari code points only and keep Inter/system fonts for Latin text
+FONT_FAMILY = "Inter"
+DEVANAGARI_RANGES = [(0x0900, 0x097F), (0x1CD0, 0x1CFF), (0xA8E0, 0xA8FF)]
+# Joiners, rupee sign and the dotted circle used for stray combining marks
+FONT_EXTRA = [0x200C, 0x200D, 0x20B9, 0x25CC]
+UNICODE_RANGE = "U+0900-097F, U+1CD0-1CFF, U+200C-200D, U+20B9, U+25CC, U+A8E0-A8FF"
+
+IMPORT_RE = re.compile(r"""@import\s+(?:url\()?\s*['"]?([^'")\s]+)['"]?\s*\)?\s*;""")
+
+
+def fingerprint(name, data):
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:10]}{ext}"
+
+
+def write_variants(filename, data, compress=True):
+    path = DIST_DIR / filename
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    sizes = {"raw": len(data)}
+    if compress:
+        gz = gzip.compress(data, compresslevel=9, mtime=0)
+        (DIST_DIR / f"{filename}.gz").write_bytes(gz)
+        sizes["gz"] = len(gz)
+        if brotli is not None:
+            br = brotli.compress(data, quality=11)
+            (DIST_DIR / f"{filename}.br").write_bytes(br)
+            sizes["br"] = len(br)
+    return sizes
+
+
+# --- Minification ---
+def minify_css(text):
+    try:
+        import rcssmin
+        return rcssmin.cssmin(text)
+    except ImportError:
+        pass
+    text = re.sub(r"/\*.*?\*/", "", text, flags=re.S)
+    text = re.sub(r"\s+", " ", text)
+    # Only around characters where whitespace never matters in CSS
+    text = re.sub(r"\s*([{};,>])\s*", r"\1", text)
+    text = re.sub(r":\s+", ":", text)
+    return text.replace(";}", "}").strip()
+
+
+def minify_js(text):
+    try:
+        import rjsmin
+        return rjsmin.jsmin(text)
+    except ImportError:
+        return text
+
+
+def read_css(rel_path):
+    """CSS source with local @imports inlined where they appear."""
+    path = STATIC_DIR / rel_path
+    text = path.read_text(encoding="utf-8")
+
+    def inline(match):
+        target = match.group(1)
+        if "//" in target:
+            return match.group(0)  # remote stylesheet; leave it to the browser
+        return read_css(os.path.normpath(os.path.join(os.path.dirname(rel_path), target)))
+
+    return IMPORT_RE.sub(inline, text)
+
+
+def build_bundle(name, sources, minify):
+    parts = []
+    for src in sources:
+        if not (STATIC_DIR / src).is_file():
+            print(f"   ⚠️  {name}: {src} not found, skipped")
+            continue
+        if name.endswith(".css"):
+            parts.append(read_css(src))
+        else:
+            # Separate files so a missing trailing semicolon can't join statements
+            parts.append((STATIC_DIR / src).read_text(encoding="utf-8").rstrip() + "\n;")
+    text = "\n".join(parts)
+    if minify:
+        text = minify_css(text) if name.endswith(".css") else minify_js(text)
+    return text.encode("utf-8")
+
+
+# --- Font subsetting ---
+def used_devanagari():
+    """Devanagari characters in UI strings, hospital data, templates and scripts."""
+    app = STATIC_DIR.parent
+    files = [STATIC_DIR / "lang" / "lang.json"]
+    for folder, pattern in ((app / "data", "*.json"), (app / "data" / "hospitals", "*.json"),
+                            (app / "templates", "**/*.html"), (STATIC_DIR / "js", "*.js"),
+                            (app / "services", "*.py")):
+        files.extend(folder.glob(pattern))
+    chars = set(FONT_EXTRA)
+    for path in files:
+        try:
+            text = path.read_text(encoding="utf-8")
+        except (OSError, UnicodeDecodeError):
+            continue
+        for ch in set(text):
+            cp = ord(ch)
+            if any(lo <= cp <= hi for lo, hi in DEVANAGARI_RANGES):
+                chars.add(cp)
+    return chars
+
+
+def build_fonts(manifest):
+    try:
+        from fontTools import subset
+    except ImportError:
+        print("   ⚠️  fonttools not installed, Devanagari subset skipped")
+        return
+    if brotli is None:
+        print("   ⚠️  brotli not installed (needed for woff2), Devanagari subset skipped")
+        return
+
+    logging.getLogger("fontTools").setLevel(logging.WARNING)
+    unicodes = sorted(used_devanagari())
+    options = subset.Options()
+    options.flavor = "woff2"
+    options.layout_features = ["*"]  # conjuncts and matras come from GSUB/GPOS
+    options.hinting = False
+    options.desubroutinize = True
+
+    rules = []
+    for weight, filename in FONT_WEIGHTS.items():
+        source = FONT_DIR / filename
+        if not source.is_file():
+            print(f"   ⚠️  {filename} not found, skipped")
+            continue
+        font = subset.load_font(str(source), options)
+        subsetter = subset.Subsetter(options)
+        subsetter.populate(unicodes=unicodes)
+        subsetter.subset(font)
+        out = DIST_DIR / "fonts" / "tmp.woff2"
+        out.parent.mkdir(parents=True, exist_ok=True)
+        subset.save_font(font, str(out), options)
+        data = out.read_bytes()
+        out.unlink()
+
+        hashed = fingerprint(f"fonts/noto-sans-devanagari-{weight}.woff2", data)
+        write_variants(hashed, data, compress=False)
+        print(f"   🔤 {hashed}: {source.stat().st_size // 1024} KB -> {len(data) // 1024} KB ({len(unicodes)} chars)")
+        rules.append(
+            "@font-face{font-family:'%s';font-style:normal;font-weight:%d;font-display:swap;"
+            "src:url(%s) format('woff2');unicode-range:%s}" % (FONT_FAMILY, weight, hashed, UNICODE_RANGE)
+        )
+
+    if rules:
+        css = "\n".join(rules).encode("utf-8")
+        hashed = fingerprint("devanagari.css", css)
+        write_variants(hashed, css)
+        manifest["devanagari.css"] = hashed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build fingerprinted, precompressed static bundles")
+    parser.add_argument("--no-minify", action="store_true", help="concatenate only")
+    parser.add_argument("--no-fonts", action="store_true", help="skip the Devanagari font subset")
+    args = parser.parse_args()
+
+    print(f"📦 Building assets into {DIST_DIR}")
+    if DIST_DIR.exists():
+        shutil.rmtree(DIST_DIR)
+    DIST_DIR.mkdir(parents=True)
+
+    manifest = {}
+    total_src = total_gz = 0
+    for name, sources in BUNDLES.items():
+        data = build_bundle(name, sources, minify=not args.no_minify)
+        hashed = fingerprint(name, data)
+        sizes = write_variants(hashed, data)
+        manifest[name] = hashed
+        src_size = sum((STATIC_DIR / s).stat().st_size for s in sources if (STATIC_DIR / s).is_file())
+        total_src += src_size
+        total_gz += sizes["gz"]
+        br = f", br {sizes['br'] // 1024} KB" if "br" in sizes else ""
+        print(f"   ✅ {hashed}: {src_size // 1024} KB -> {sizes['raw'] // 1024} KB, gz {sizes['gz'] // 1024} KB{br}")
+
+    if not args.no_fonts:
+        build_fonts(manifest)
+
+    # Written last: the app switches to the bundles once this file appears
+    with open(DIST_DIR / "manifest.json", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    print(f"\n📊 {len(BUNDLES)} bundles: {total_src // 1024} KB of sources -> {total_gz // 1024} KB gzipped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# gunicorn.conf.py
+"""
+Gunicorn configuration for Hospital Chat Assistant.
+
+Used by Procfile, Dockerfile, render.yaml and run.sh:
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+WORKER_CLASS=sync (default) runs one request per worker process.
+WORKER_CLASS=gevent runs each worker as an event loop with cooperative
+greenlets: sockets (requests to Google, Postgres via psycogreen) yield while
+waiting, so a single process can keep hundreds of I/O-bound chat, meta and
+voice requests in flight. Size DB_POOL_SIZE / DB_MAX_OVERFLOW to match.
+
+With PROMETHEUS_MULTIPROC_DIR set, workers write their metrics to that
+directory and /metrics reports the sum over all workers.
+
+With preload_app (GUNICORN_PRELOAD, on by default for sync workers) the
+master imports the app once and warms the knowledge bases, metadata and PDF
+stack (app.warm_caches); workers fork with all of it in memory, shared
+copy-on-write, and start serving without re-importing anything. The engine,
+HTTP sessions, voice thread pool, log and trace threads are reset in each
+child (os.register_at_fork / per-process checks in those modules). gevent
+workers default to no preload: gevent has to monkey-patch before the app's
+imports run.
+"""
+import os
+import sys
+import glob
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+worker_class = os.getenv("WORKER_CLASS", "sync")
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+keepalive = 2
+max_requests = 1000
+max_requests_jitter = 100
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-") or None  # empty disables access logs
+errorlog = "-"
+
+if worker_class == "gevent":
+    # Concurrent greenlets per worker process
+    worker_connections = int(os.getenv("GEVENT_WORKER_CONNECTIONS", "1000"))
+
+preload_app = os.getenv("GUNICORN_PRELOAD", str(worker_class == "sync")).lower() == "true"
+
+
+def on_starting(server):
+    # Values left over from a previous run would be added to this one's
+    multiproc_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if multiproc_dir:
+        os.makedirs(multiproc_dir, exist_ok=True)
+        for path in glob.glob(os.path.join(multiproc_dir, "*.db")):
+            os.remove(path)
+
+
+def when_ready(server):
+    # Still in the master, before the first fork
+    flask_app = sys.modules.get("app") if server.cfg.preload_app else None
+    if flask_app is not None and hasattr(flask_app, "warm_caches"):
+        try:
+            seconds = flask_app.warm_caches()
+            server.log.info("Caches warmed in the master in %.2fs", seconds)
+        except Exception as e:
+            server.log.warning("Warming caches failed, workers will build them: %s", e)
+
+
+def child_exit(server, worker):
+    # Drop the dead worker's live gauges (pool usage, slips in progress)
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        try:
+            from prometheus_client import multiprocess
+            multiprocess.mark_process_dead(worker.pid)
+        except ImportError:
+            pass
+
+
+def post_worker_init(worker):
+    # The gevent worker has monkey-patched sockets by now; psycopg2 talks to
+    # libpq directly, so it needs its own wait callback to yield to the hub.
+    if worker_class == "gevent":
+        try:
+            from psycogreen.gevent import patch_psycopg
+            patch_psycopg()
+            worker.log.info("psycopg2 patched for gevent")
+        except ImportError:
+            worker.log.warning("psycogreen/psycopg2 not installed; database calls will block the gevent worker")
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Load Test: sync vs gevent workers
+Starts the app under gunicorn in each worker mode (gunicorn.conf.py) with
+Google STT/TTS replaced by voice_stub_server.py, fires concurrent chat, meta
+and voice requests and compares throughput and latency.
+
+Usage:
+    python load_test.py [--mode both|sync|gevent] [--concurrency 200] [--requests 2000]
+                        [--workers 2] [--stub-delay-ms 200] [--endpoints queries,meta,voice]
+
+Against an already running server (no gunicorn started):
+    python load_test.py --url http://localhost:5000
+"""
+import argparse
+import io
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+# Talisman redirects plain HTTP; behave like a TLS-terminating proxy
+HEADERS = {"X-Forwarded-Proto": "https"}
+AUDIO = b"\x00\x01" * 8000
+
+_local = threading.local()
+
+
+def session():
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+        _local.session.headers.update(HEADERS)
+    return _local.session
+
+
+def hit_queries(base):
+    return session().post(f"{base}/queries", json={"question": "what are the timings", "lang": "english"}, timeout=60)
+
+
+def hit_meta(base):
+    return session().get(f"{base}/meta/departments", timeout=60)
+
+
+def hit_voice(base):
+    files = {"audio": ("turn.wav", io.BytesIO(AUDIO), "audio/wav")}
+    return session().post(f"{base}/api/voice", data={"lang": "en-IN"}, files=files, timeout=60)
+
+
+ENDPOINTS = {"queries": hit_queries, "meta": hit_meta, "voice": hit_voice}
+
+
+def wait_for(url, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{url}/health", headers=HEADERS, timeout=2).status_code == 200:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    return False
+
+
+def run_load(base, endpoints, total, concurrency):
+    calls = [ENDPOINTS[endpoints[i % len(endpoints)]] for i in range(total)]
+    latencies, errors = [], 0
+
+    def one(fn):
+        start = time.perf_counter()
+        try:
+            ok = fn(base).status_code < 500
+        except requests.RequestException:
+            ok = False
+        return ok, (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for ok, ms in pool.map(one, calls):
+            latencies.append(ms)
+            errors += 0 if ok else 1
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "rps": total / elapsed,
+        "p50": latencies[len(latencies) // 2],
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+        "p99": latencies[int(len(latencies) * 0.99) - 1],
+        "mean": statistics.mean(latencies),
+    }
+
+
+def start_gunicorn(mode, port, workers, stub_port, cache_dir):
+    env = dict(os.environ)
+    env.update({
+        "WORKER_CLASS": mode,
+        "WEB_CONCURRENCY": str(workers),
+        "PORT": str(port),
+        "GUNICORN_ACCESS_LOG": "",
+        "LOG_LEVEL": "WARNING",
+        "GOOGLE_STT_URL": f"http://127.0.0.1:{stub_port}/v1/speech:recognize",
+        "GOOGLE_TTS_URL": f"http://127.0.0.1:{stub_port}/v1/text:synthesize",
+        "TTS_CACHE_DIR": cache_dir,
+        "TTS_PRECOMPUTE": "False",
+        "DB_POOL_SIZE": env.get("DB_POOL_SIZE", "20" if mode == "gevent" else "5"),
+    })
+    return subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:application"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def print_result(label, r):
+    print(f"{label:<8}{r['rps']:>9.1f}{r['p50']:>10.1f}{r['p95']:>10.1f}{r['p99']:>10.1f}{r['errors']:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare sync and gevent gunicorn workers under concurrent load")
+    parser.add_argument("--mode", choices=["both", "sync", "gevent"], default="both")
+    parser.add_argument("--url", help="test a running server instead of starting gunicorn")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--stub-port", type=int, default=8099)
+    parser.add_argument("--stub-delay-ms", type=int, default=200)
+    parser.add_argument("--endpoints", default="queries,meta,voice")
+    args = parser.parse_args()
+    endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip() in ENDPOINTS]
+
+    print(f"🚦 {args.requests} requests, concurrency {args.concurrency}, endpoints {', '.join(endpoints)}")
+
+    if args.url:
+        print(f"\n{'mode':<8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+        print_result("server", run_load(args.url.rstrip("/"), endpoints, args.requests, args.concurrency))
+        return
+
+    stub_env = dict(os.environ, STUB_STT_DELAY_MS=str(args.stub_delay_ms), STUB_TTS_DELAY_MS=str(args.stub_delay_ms))
+    stub = subprocess.Popen([sys.executable, "voice_stub_server.py", str(args.stub_port)], cwd=ROOT, env=stub_env,
+                            stdout=subprocess.DEVNULL)
+    modes = ["sync", "gevent"] if args.mode == "both" else [args.mode]
+    results = {}
+    try:
+        for mode in modes:
+            with tempfile.TemporaryDirectory() as cache_dir:
+                proc = start_gunicorn(mode, args.port, args.workers, args.stub_port, cache_dir)
+                try:
+                    base = f"http://127.0.0.1:{args.port}"
+                    if not wait_for(base):
+                        print(f"❌ {mode}: server did not start")
+                        continue
+                    print(f"   {mode}: {args.workers} workers up, running...")
+                    run_load(base, endpoints, min(50, args.requests), 10)  # warm-up
+                    results[mode] = run_load(base, endpoints, args.requests, args.concurrency)
+                finally:
+                    proc.terminate()
+                    proc.wait(timeout=30)
+    finally:
+        stub.terminate()
+
+    print(f"\n{'mode':<8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for mode, r in results.items():
+        print_result(mode, r)
+    if "sync" in results and "gevent" in results:
+        print(f"\n📊 gevent throughput: {results['gevent']['rps'] / results['sync']['rps']:.1f}x sync")
+
+
+if __name__ == "__main__":
+    main()
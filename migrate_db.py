@@ -12,9 +12,44 @@ if app_dir not in sys.path:
     sys.path.insert(0, app_dir)
 
 try:
-    from app.config_db import engine
+    from config_db import engine
     from sqlalchemy import text, inspect
     
+    DEFAULT_HOSPITAL_ID = os.getenv("DEFAULT_HOSPITAL_ID", "xyz")
+    
+    # table -> composite indexes leading on hospital_id (see app/models.py)
+    TENANT_INDEXES = {
+        "departments": {"ix_departments_hospital_id": "hospital_id, id"},
+        "doctors": {"ix_doctors_hospital_department": "hospital_id, department_id"},
+        "appointments": {
+            "ix_appointments_hospital_phone": "hospital_id, phone",
+            "ix_appointments_hospital_doctor_date": "hospital_id, doctor_id, date",
+            "ix_appointments_hospital_status": "hospital_id, status",
+        },
+        "hospital_info": {"ix_hospital_info_hospital_id": "hospital_id"},
+    }
+    
+    def migrate_tenant_columns(conn, inspector, tables):
+        """Add hospital_id to tenant tables, backfill existing rows with the
+        default hospital and create the tenant-leading indexes."""
+        for table, indexes in TENANT_INDEXES.items():
+            if table not in tables:
+                continue
+            columns = [col['name'] for col in inspector.get_columns(table)]
+            if 'hospital_id' not in columns:
+                print(f"🏥 Adding hospital_id column to {table} table...")
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN hospital_id VARCHAR(255)"))
+            conn.execute(
+                text(f"UPDATE {table} SET hospital_id = :hid WHERE hospital_id IS NULL"),
+                {"hid": DEFAULT_HOSPITAL_ID}
+            )
+            existing = {ix['name'] for ix in inspector.get_indexes(table)}
+            for name, cols in indexes.items():
+                if name not in existing:
+                    conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({cols})"))
+            conn.commit()
+            print(f"✅ {table} is tenant-scoped")
+    
     def migrate_database():
         """Run database migrations"""
         print("🔄 Starting database migration...")
@@ -40,6 +75,8 @@ try:
                 else:
                     print("✅ Photo column already exists")
                 
+                migrate_tenant_columns(conn, inspector, tables)
+                
                 print("🎉 Database migration completed successfully")
                 return True
                 
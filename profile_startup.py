@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Startup Profile
+Shows where a worker's cold start goes: imports by package and by module
+(from python -X importtime), the app's own import-time work, cache warming
+and the first request.
+
+Usage:
+    python profile_startup.py [--top 25] [--no-warm]
+
+Runs in a fresh interpreter with the current environment, so set
+DATABASE_URL etc. as for the server. Times vary with disk cache; run it
+twice and read the second result.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Executed in the child: import the app the way gunicorn does, then time
+# warm_caches() and one request
+CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import wsgi
+t1 = time.perf_counter()
+heavy = [m for m in ("reportlab", "qrcode", "deep_translator", "google.cloud.speech") if m in sys.modules]
+warm = None
+if WARM:
+    warm = sys.modules["app"].warm_caches()
+t2 = time.perf_counter()
+client = wsgi.application.test_client()
+response = client.post("/queries", json={"question": "timings", "lang": "english"},
+                       base_url="https://localhost")
+t3 = time.perf_counter()
+print("@@" + json.dumps({
+    "import_s": t1 - t0, "warm_s": warm, "first_request_s": t3 - t2,
+    "status": response.status_code, "heavy_modules_loaded": heavy,
+}))
+"""
+
+
+def parse_importtime(stderr):
+    """[(module, self_us, cumulative_us)] from -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "self [us]" in line:
+            continue
+        self_us, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative)))
+    return rows
+
+
+def package_of(module):
+    return module.split(".")[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time breakdown of a worker cold start")
+    parser.add_argument("--top", type=int, default=25, help="modules to list")
+    parser.add_argument("--no-warm", action="store_true", help="skip warm_caches()")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault("LOG_FILE", "")
+    code = f"WARM = {not args.no_warm}\n" + CHILD
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    result_line = next((l for l in proc.stdout.splitlines() if l.startswith("@@")), None)
+    if proc.returncode != 0 or result_line is None:
+        print(proc.stdout[-2000:])
+        print(proc.stderr[-4000:])
+        sys.exit(f"❌ Child process failed ({proc.returncode})")
+    result = json.loads(result_line[2:])
+    rows = parse_importtime(proc.stderr)
+
+    total_us = sum(r[1] for r in rows)
+    by_package = {}
+    for name, self_us, _ in rows:
+        by_package[package_of(name)] = by_package.get(package_of(name), 0) + self_us
+
+    print(f"🚀 Startup profile ({len(rows)} modules imported)")
+    print(f"   import wsgi:    {result['import_s'] * 1000:8.1f} ms  (sum of module self times {total_us / 1000:.1f} ms)")
+    if result["warm_s"] is not None:
+        print(f"   warm_caches():  {result['warm_s'] * 1000:8.1f} ms")
+    print(f"   first request:  {result['first_request_s'] * 1000:8.1f} ms  (status {result['status']})")
+    heavy = result["heavy_modules_loaded"]
+    print(f"   heavy optional modules imported by wsgi: {', '.join(heavy) if heavy else 'none'}")
+
+    print(f"\n📦 Packages by self time")
+    for package, us in sorted(by_package.items(), key=lambda kv: kv[1], reverse=True)[:args.top]:
+        print(f"   {us / 1000:8.1f} ms  {us / total_us:6.1%}  {package}")
+
+    print(f"\n🔍 App modules by cumulative time")
+    app_modules = set()
+    for name in os.listdir(os.path.join(ROOT, "app")):
+        if name.endswith(".py"):
+            app_modules.add(name[:-3])
+    app_modules.add("services")
+    own = [r for r in rows if package_of(r[0]) in app_modules or r[0] == "wsgi"]
+    for name, self_us, cumulative in sorted(own, key=lambda r: r[2], reverse=True)[:args.top]:
+        print(f"   {cumulative / 1000:8.1f} ms  (self {self_us / 1000:6.1f})  {name}")
+
+
+if __name__ == "__main__":
+    main()
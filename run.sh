@@ -58,13 +58,6 @@ echo "Port: ${PORT:-5000}"
 if [ "${FLASK_ENV}" = "development" ]; then
     python app/app.py
 else
-    gunicorn --bind 0.0.0.0:${PORT:-5000} \
-             --workers 4 \
-             --timeout 120 \
-             --keep-alive 2 \
-             --max-requests 1000 \
-             --max-requests-jitter 100 \
-             --access-logfile - \
-             --error-logfile - \
-             app.app:app
+    # WORKER_CLASS=gevent switches to the async serving mode
+    gunicorn -c gunicorn.conf.py wsgi:application
 fi
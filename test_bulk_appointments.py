@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Bulk Appointment Update Test
+Checks that the bulk status / mark-viewed APIs only touch the appointments
+they were asked to: a misspelt or empty filter must be rejected instead of
+turning into an UPDATE of every appointment of the hospital. Also checks that
+bulk_import never hands one hospital's department to another.
+
+Runs against a throwaway SQLite database:
+    python test_bulk_appointments.py      (or: python -m pytest test_bulk_appointments.py)
+"""
+import csv
+import os
+import sys
+import tempfile
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app")
+_db_dir = tempfile.mkdtemp(prefix="bulk_appts_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ.setdefault("LOG_FILE", "")
+sys.path.insert(0, APP_DIR)
+
+import bulk_import  # noqa: E402
+from config_db import engine, SessionLocal  # noqa: E402
+from models import Appointment, Department  # noqa: E402
+from services import data_service_db as ds  # noqa: E402
+from tenant import tenant_scope  # noqa: E402
+
+HOSPITAL_ID = "xyz"
+# doctors uses ARRAY, which SQLite lacks, so only the tables under test are created
+Appointment.__table__.create(engine, checkfirst=True)
+Department.__table__.create(engine, checkfirst=True)
+
+
+def _seed():
+    with tenant_scope(HOSPITAL_ID):
+        session = SessionLocal()
+        try:
+            session.query(Appointment).delete()
+            for i, status in enumerate(["pending", "pending", "booked"]):
+                session.add(Appointment(
+                    hospital_id=HOSPITAL_ID, name=f"Patient {i}", phone=f"90000000{i:02}",
+                    department_id="1", doctor_id="1", date="2026-10-20", time=f"1{i}:00",
+                    status=status, viewed_by_admin=False,
+                ))
+            session.commit()
+        finally:
+            session.close()
+
+
+def _snapshot():
+    with tenant_scope(HOSPITAL_ID):
+        session = SessionLocal()
+        try:
+            return sorted((a.id, a.status, bool(a.viewed_by_admin)) for a in session.query(Appointment))
+        finally:
+            session.close()
+
+
+def _expect_rejected(fn, **kwargs):
+    try:
+        fn(**kwargs)
+    except ValueError:
+        return
+    raise AssertionError(f"{fn.__name__}({kwargs}) was not rejected")
+
+
+def test_junk_filters_touch_zero_rows():
+    _seed()
+    before = _snapshot()
+    with tenant_scope(HOSPITAL_ID):
+        for filters in ({"stauts": "pending"}, {"status": ""}, {"status": None, "date": ""}, {}):
+            _expect_rejected(ds.bulk_update_appointment_status, new_status="cancelled",
+                             filters=filters, enforce_transitions=False)
+            _expect_rejected(ds.bulk_update_appointment_status, new_status="cancelled", filters=filters)
+            _expect_rejected(ds.bulk_mark_appointments_viewed, filters=filters)
+        _expect_rejected(ds.bulk_update_appointment_status, new_status="cancelled", ids=[],
+                         enforce_transitions=False)
+    assert _snapshot() == before
+
+
+def test_filters_select_only_matching_rows():
+    _seed()
+    with tenant_scope(HOSPITAL_ID):
+        result = ds.bulk_update_appointment_status("confirmed", filters={"status": "pending"})
+        viewed = ds.bulk_mark_appointments_viewed(filters={"status": "booked"})
+    assert len(result["updated"]) == 2
+    assert len(viewed) == 1
+    statuses = sorted(status for _, status, _ in _snapshot())
+    assert statuses == ["booked", "confirmed", "confirmed"]
+
+
+def test_import_does_not_take_over_other_hospitals_rows():
+    rejects = os.path.join(_db_dir, "departments.rejects.csv")
+    first = bulk_import.import_rows("departments", [{"id": "1", "name_en": "Cardio A"}],
+                                    hospital_id="hospA", verbose=False)
+    second = bulk_import.import_rows("departments", [{"id": "1", "name_en": "Ortho B"}, {"id": "2", "name_en": "ENT B"}],
+                                     hospital_id="hospB", rejects_path=rejects, verbose=False)
+    again = bulk_import.import_rows("departments", [{"id": "1", "name_en": "Cardiology A"}],
+                                    hospital_id="hospA", verbose=False)
+    assert (first["loaded"], second["loaded"], second["rejected"], again["loaded"]) == (1, 1, 1, 1)
+
+    session = SessionLocal()
+    try:
+        rows = sorted((d.id, d.hospital_id, d.name_en) for d in session.query(Department))
+    finally:
+        session.close()
+    assert rows == [("1", "hospA", "Cardiology A"), ("2", "hospB", "ENT B")], rows
+    with open(rejects, newline="", encoding="utf-8") as f:
+        errors = [r["_error"] for r in csv.DictReader(f)]
+    assert errors == ["id '1' belongs to another hospital"], errors
+
+
+if __name__ == "__main__":
+    failed = 0
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            try:
+                test()
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failed += 1
+                print(f"❌ {name}: {e}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Cold Start Budget Test
+Checks that a worker comes up within the documented budget (DEPLOYMENT.md,
+"Worker Startup"):
+
+    fresh worker       import wsgi + first /queries response    COLD_START_BUDGET_MS (1500)
+    preloaded worker   fork from a warmed master + first /queries PRELOAD_START_BUDGET_MS (150)
+
+and that the heavy optional dependencies (reportlab, qrcode, deep_translator,
+google.cloud.speech) are not imported until a feature needs them.
+
+Usage:
+    python test_cold_start.py [--runs 5]
+
+Each run is a fresh interpreter; the median is compared with the budget.
+Exits non-zero when a check fails.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+HEAVY_MODULES = ("reportlab", "qrcode", "deep_translator", "google.cloud.speech")
+
+QUERY = {"question": "What are the visiting hours?", "lang": "english"}
+
+FRESH = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import wsgi
+heavy = [m for m in HEAVY if m in sys.modules]
+response = wsgi.application.test_client().post("/queries", json=QUERY, base_url="https://localhost")
+print("@@" + json.dumps({"ms": (time.perf_counter() - t0) * 1000, "status": response.status_code, "heavy": heavy}))
+"""
+
+# What gunicorn does with preload_app: import and warm once, then fork
+PRELOADED = r"""
+import json, os, sys, time
+import wsgi
+sys.modules["app"].warm_caches()
+read_fd, write_fd = os.pipe()
+t0 = time.perf_counter()
+pid = os.fork()
+if pid == 0:
+    response = wsgi.application.test_client().post("/queries", json=QUERY, base_url="https://localhost")
+    os.write(write_fd, json.dumps({"ms": (time.perf_counter() - t0) * 1000, "status": response.status_code}).encode())
+    os._exit(0)
+os.waitpid(pid, 0)
+print("@@" + os.read(read_fd, 4096).decode())
+"""
+
+
+def run(code):
+    env = dict(os.environ)
+    env.setdefault("LOG_FILE", "")
+    env.setdefault("LOG_LEVEL", "WARNING")
+    prelude = f"HEAVY = {HEAVY_MODULES!r}\nQUERY = {QUERY!r}\n"
+    proc = subprocess.run([sys.executable, "-c", prelude + code], cwd=ROOT, env=env, capture_output=True, text=True)
+    line = next((l for l in proc.stdout.splitlines() if l.startswith("@@")), None)
+    if proc.returncode != 0 or line is None:
+        print(proc.stdout[-2000:])
+        print(proc.stderr[-4000:])
+        raise RuntimeError(f"child process failed ({proc.returncode})")
+    return json.loads(line[2:])
+
+
+def check(name, results, budget_ms):
+    ms = statistics.median(r["ms"] for r in results)
+    statuses = {r["status"] for r in results}
+    ok = ms <= budget_ms and statuses == {200}
+    print(f"{'✅' if ok else '❌'} {name}: median {ms:.0f} ms over {len(results)} runs "
+          f"(budget {budget_ms} ms, min {min(r['ms'] for r in results):.0f}, status {sorted(statuses)})")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker cold start budget")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    cold_budget = int(os.getenv("COLD_START_BUDGET_MS", "1500"))
+    preload_budget = int(os.getenv("PRELOAD_START_BUDGET_MS", "150"))
+
+    print("🧊 Cold start budget test")
+    fresh = [run(FRESH) for _ in range(args.runs)]
+    preloaded = [run(PRELOADED) for _ in range(args.runs)]
+
+    results = [
+        check("Fresh worker", fresh, cold_budget),
+        check("Preloaded worker", preloaded, preload_budget),
+    ]
+
+    heavy = sorted({m for r in fresh for m in r["heavy"]})
+    if heavy:
+        print(f"❌ Imported at startup, should be lazy: {', '.join(heavy)}")
+    else:
+        print(f"✅ Not imported at startup: {', '.join(HEAVY_MODULES)}")
+    results.append(not heavy)
+
+    passed = sum(results)
+    print(f"\n📊 {passed}/{len(results)} checks passed")
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
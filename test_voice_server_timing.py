@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Voice Server-Timing Test
+Checks that /api/voice only sends its per-stage Server-Timing header when
+TRACE_SERVER_TIMING is on (development by default), so stage names do not
+leak in production responses.
+
+Runs against voice_stub_server.py and a throwaway SQLite database:
+    python test_voice_server_timing.py      (or: python -m pytest test_voice_server_timing.py)
+"""
+import io
+import os
+import sys
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(ROOT, "app")
+_db_dir = tempfile.mkdtemp(prefix="voice_timing_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ.setdefault("LOG_FILE", "")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ["FLASK_ENV"] = "production"
+os.environ.pop("TRACE_SERVER_TIMING", None)
+
+sys.path.insert(0, ROOT)
+import voice_stub_server  # noqa: E402
+
+_stub = ThreadingHTTPServer(("127.0.0.1", 0), voice_stub_server.StubHandler)
+threading.Thread(target=_stub.serve_forever, daemon=True).start()
+_stub_url = f"http://127.0.0.1:{_stub.server_address[1]}"
+os.environ["GOOGLE_STT_URL"] = f"{_stub_url}/v1/speech:recognize"
+os.environ["GOOGLE_TTS_URL"] = f"{_stub_url}/v1/text:synthesize"
+
+os.chdir(APP_DIR)
+sys.path.insert(0, APP_DIR)
+from app import app  # noqa: E402
+from config import settings  # noqa: E402
+
+
+def _voice_turn():
+    response = app.test_client().post(
+        "/api/voice",
+        base_url="https://localhost",
+        data={"lang": "en-IN", "audio": (io.BytesIO(b"\x00\x01" * 1600), "turn.wav")},
+        content_type="multipart/form-data",
+    )
+    response.get_data()  # drain the stream
+    assert response.status_code == 200, response.status_code
+    return response
+
+
+def test_no_server_timing_in_production():
+    assert settings.TRACE_SERVER_TIMING is False
+    assert "Server-Timing" not in _voice_turn().headers
+
+
+def test_server_timing_when_enabled():
+    settings.TRACE_SERVER_TIMING = True
+    try:
+        header = _voice_turn().headers.get("Server-Timing", "")
+    finally:
+        settings.TRACE_SERVER_TIMING = False
+    assert "stt;dur=" in header and "total;dur=" in header, header
+
+
+if __name__ == "__main__":
+    failed = 0
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            try:
+                test()
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failed += 1
+                print(f"❌ {name}: {e}")
+    sys.exit(1 if failed else 0)
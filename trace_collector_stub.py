@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Trace Collector Stub
+Stands in for an OpenTelemetry collector's OTLP/HTTP receiver so request
+traces can be looked at locally. Every trace received is printed as one
+line per request with its slowest spans, and optionally appended as JSON to
+a file.
+
+Usage:
+    python trace_collector_stub.py [port] [--out traces.jsonl]
+
+    export TRACE_EXPORT_URL=http://127.0.0.1:4318/v1/traces
+
+Environment:
+    STUB_VERBOSE        also print the HTTP access log
+"""
+import argparse
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_out_lock = threading.Lock()
+OUT_FILE = None
+TOP_SPANS = 5
+
+
+def _attr(span, key):
+    for a in span.get("attributes", []):
+        if a["key"] == key:
+            return next(iter(a["value"].values()))
+    return None
+
+
+def _ms(span):
+    return (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e6
+
+
+def summarize(spans):
+    """Group spans by trace and print a line for each request."""
+    traces = {}
+    for span in spans:
+        traces.setdefault(span["traceId"], []).append(span)
+    for trace_id, group in traces.items():
+        root = next((s for s in group if s.get("kind") == 2), group[0])
+        children = sorted((s for s in group if s is not root), key=_ms, reverse=True)
+        db = [s for s in children if s["name"] == "db"]
+        slowest = ", ".join(f"{s['name']}={_ms(s):.1f}ms" for s in children[:TOP_SPANS])
+        error = " ERROR" if root.get("status", {}).get("code") == 2 else ""
+        print(f"{_attr(root, 'request.id')} {root['name']} {_attr(root, 'http.status_code')} "
+              f"{_ms(root):.1f}ms db={len(db)}{error} | {slowest}")
+
+
+class CollectorHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            data = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self.send_response(400)
+            self.end_headers()
+            return
+
+        spans = [span
+                 for resource in data.get("resourceSpans", [])
+                 for scope in resource.get("scopeSpans", [])
+                 for span in scope.get("spans", [])]
+        summarize(spans)
+        if OUT_FILE:
+            with _out_lock, open(OUT_FILE, "a", encoding="utf-8") as f:
+                f.write(json.dumps(data) + "\n")
+
+        body = b"{}"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        if os.getenv("STUB_VERBOSE"):
+            super().log_message(fmt, *args)
+
+
+def main():
+    global OUT_FILE
+    parser = argparse.ArgumentParser(description="Local OTLP/HTTP trace receiver")
+    parser.add_argument("port", nargs="?", type=int, default=4318)
+    parser.add_argument("--out", help="append received payloads to this JSON-lines file")
+    args = parser.parse_args()
+    OUT_FILE = args.out
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), CollectorHandler)
+    print(f"🔭 Trace collector stub on http://127.0.0.1:{args.port}/v1/traces")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Voice Stub Server
+Stands in for the Google Speech-to-Text and Text-to-Speech REST APIs so the
+voice pipeline can be exercised locally without API keys.
+
+Usage:
+    python voice_stub_server.py [port]
+
+    export GOOGLE_STT_URL=http://localhost:8099/v1/speech:recognize
+    export GOOGLE_TTS_URL=http://localhost:8099/v1/text:synthesize
+
+Environment:
+    STUB_TRANSCRIPT     transcript returned for every recognize call
+    STUB_STT_DELAY_MS   simulated recognize latency
+    STUB_TTS_DELAY_MS   simulated synthesize latency (per call)
+"""
+import base64
+import json
+import os
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TRANSCRIPT = os.getenv("STUB_TRANSCRIPT", "what are the hospital timings")
+STT_DELAY = float(os.getenv("STUB_STT_DELAY_MS", "0")) / 1000
+TTS_DELAY = float(os.getenv("STUB_TTS_DELAY_MS", "0")) / 1000
+
+# MPEG-1 Layer III frame header (128 kbps, 44.1 kHz); payload is just the text
+MP3_FRAME_HEADER = b"\xff\xfb\x90\x64"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            data = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return self._send_json({"error": "invalid json"}, 400)
+
+        path = self.path.split("?", 1)[0]
+        if path.endswith("speech:recognize"):
+            time.sleep(STT_DELAY)
+            if not data.get("audio", {}).get("content"):
+                return self._send_json({})
+            return self._send_json({"results": [{"alternatives": [{"transcript": TRANSCRIPT, "confidence": 0.99}]}]})
+
+        if path.endswith("text:synthesize"):
+            time.sleep(TTS_DELAY)
+            text = data.get("input", {}).get("text", "")
+            audio = MP3_FRAME_HEADER + text.encode("utf-8")
+            return self._send_json({"audioContent": base64.b64encode(audio).decode("ascii")})
+
+        self._send_json({"error": "not found"}, 404)
+
+    def log_message(self, fmt, *args):
+        if os.getenv("STUB_VERBOSE"):
+            super().log_message(fmt, *args)
+
+
+def main():
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8099
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    print(f"🎙️  Voice stub server on http://127.0.0.1:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()